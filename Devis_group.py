@@ -15,6 +15,14 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
 
+import instantane_elements as ie
+from catalogue_materiaux import CatalogueMateriaux, signature_projet
+import cache_elements
+
+# Attributs lus : 1 traitement, 2 prestation, 3/16 groupe et sous-groupe,
+# 7/8/9/10/15 prix calculés par le script 3, 13 taux de chute
+ATTRIBUTS_LUS = (1, 2, 3, 7, 8, 9, 10, 13, 15, 16)
+
 class DevisGroupeInterface:
     def __init__(self):
         self.root = tk.Tk()
@@ -38,6 +46,7 @@ class DevisGroupeInterface:
         self.groupes_detectes = 0
         self.ventilation_data = {}
         self.details_par_groupe = {}
+        self.catalogue = CatalogueMateriaux(mc, uc.get_project_number(), signature_projet(uc))
         
         self.setup_ui()
         
@@ -176,14 +185,11 @@ class DevisGroupeInterface:
         self.update_status("🛑 Arrêt en cours...")
         
     def safe_float(self, val, default=0.0):
-        try:
-            return float(str(val).replace('%', '').replace(',', '.'))
-        except (ValueError, TypeError):
-            return default
+        return ie.nombre(val, default)
 
     def get_prix_matiere(self, eid, mat_name):
         prix_att = self.safe_float(ac.get_user_attribute(eid, 6))
-        return prix_att if prix_att > 0 else self.safe_float(mc.get_price(mc.get_material_id(mat_name)))
+        return prix_att if prix_att > 0 else self.catalogue.prix(mat_name)
 
     def run_generation(self):
         """Fonction principale de génération"""
@@ -248,7 +254,27 @@ class DevisGroupeInterface:
             'prestations': defaultdict(lambda: {'qte': 0, 'prix': 0})
         })
         
-        for i, eid in enumerate(self.element_ids):
+        # Instantané : matériau, cotes, attributs et SKU lus en une passe
+        erreurs = []
+        inst = ie.instantane(self.element_ids, ac, gc, attributs=ATTRIBUTS_LUS, sku=True,
+                             projet=uc.get_project_number(), erreurs=erreurs)
+        for eid, e in erreurs:
+            self.log(f"❌ Erreur pour l'élément {eid} : {e}")
+        # Surface de face de référence pour les seules prestations « _S », en un balayage
+        plan = {'surface_reference': [eid for i, eid in enumerate(inst.eids) if inst.attribut(2, i).endswith("_S")]}
+        erreurs = []
+        cache = cache_elements.ouvrir(uc)  # surfaces déjà mesurées par le calcul des prix
+        try:
+            inst.lire_geometrie(gc, plan, erreurs, cache)
+        finally:
+            if cache is not None: cache.fermer()
+        for eid, e in erreurs:
+            self.log(f"❌ Erreur pour l'élément {eid} : {e}")
+        # Colonnes numériques : chaque texte distinct converti une seule fois
+        prix_matiere, prix_achat, prix_faconnage, prix_traitement, prix_prestation, taux = (
+            inst.nombres(n) for n in (8, 15, 9, 7, 10, 13))
+        
+        for i, eid in enumerate(inst.eids):
             if self.should_stop:
                 break
                 
@@ -258,29 +284,29 @@ class DevisGroupeInterface:
                     self.update_status(f"⚙️ Analyse élément {i+1}/{len(self.element_ids)}...")
                 
                 # NOUVEAU : Utiliser attributs 3 et 16 pour le groupement
-                groupe_principal = ac.get_user_attribute(eid, 3) or "Non défini"
-                sous_groupe = ac.get_user_attribute(eid, 16) or "Non défini"
+                groupe_principal = inst.attribut(3, i) or "Non défini"
+                sous_groupe = inst.attribut(16, i) or "Non défini"
                 groupe_complet = f"{groupe_principal} | {sous_groupe}"
                 
                 # OPTIMISATION : Lire directement les prix déjà calculés dans les attributs
-                prix_matiere_piece = self.safe_float(ac.get_user_attribute(eid, 8))  # Attribut 8 : Prix matière pièce
-                prix_achat_piece = self.safe_float(ac.get_user_attribute(eid, 15))   # Attribut 15 : Prix achat
-                prix_faconnage_piece = self.safe_float(ac.get_user_attribute(eid, 9))   # Attribut 9 : Prix façonnage
-                prix_traitement_piece = self.safe_float(ac.get_user_attribute(eid, 7))  # Attribut 7 : Prix traitement
-                prix_prestation_piece = self.safe_float(ac.get_user_attribute(eid, 10)) # Attribut 10 : Prix prestation
+                prix_matiere_piece = prix_matiere[i]  # Attribut 8 : Prix matière pièce
+                prix_achat_piece = prix_achat[i]   # Attribut 15 : Prix achat
+                prix_faconnage_piece = prix_faconnage[i]   # Attribut 9 : Prix façonnage
+                prix_traitement_piece = prix_traitement[i]  # Attribut 7 : Prix traitement
+                prix_prestation_piece = prix_prestation[i] # Attribut 10 : Prix prestation
                 
                 # Récupération des données spécifiques pour le détail
-                mat_name = ac.get_element_material_name(eid).strip()
-                traitement_code = (ac.get_user_attribute(eid, 1) or "").strip()
-                sku_faconnage = (ac.get_sku(eid) or "").strip()
-                presta_code = (ac.get_user_attribute(eid, 2) or "").strip()
+                mat_name = inst.materiau(i)
+                traitement_code = inst.attribut(1, i)
+                sku_faconnage = inst.sku_de(i)
+                presta_code = inst.attribut(2, i)
                 
                 # Calcul des quantités pour les statistiques
-                taux_chute = self.safe_float(ac.get_user_attribute(eid, 13)) / 100.0 if ac.get_user_attribute(eid, 13) else 0.0
-                longueur_utile = gc.get_length(eid)
+                taux_chute = taux[i] / 100.0
+                longueur_utile = inst.longueur[i]
                 longueur_utile_m = longueur_utile / 1000
-                largeur_brute = round(gc.get_list_width(eid))
-                hauteur_brute = round(gc.get_list_height(eid))
+                largeur_brute = inst.largeur[i]
+                hauteur_brute = inst.hauteur[i]
                 
                 # Quantités selon type de matériau
                 if mat_name.endswith("_L"):
@@ -302,7 +328,7 @@ class DevisGroupeInterface:
                 volume_presta = 0.0
                 if presta_code:
                     if presta_code.endswith("_S"):
-                        surface_presta = gc.get_element_reference_face_area(eid) / 1_000_000
+                        surface_presta = inst.mesure('surface_reference', i, 0.0) / 1_000_000
                         qte_presta = surface_presta
                         unite_presta = "m²"
                     else:
@@ -18,6 +18,14 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
 
+import instantane_elements as ie
+from catalogue_materiaux import CatalogueMateriaux, signature_projet
+import cache_elements
+
+# Attributs lus : 1 traitement, 2 prestation ; 12 n° de barre, 13 taux de chute (écrits par l'optimisation, relus à chaque calcul)
+ATTRIBUTS_LUS = (1, 2)
+ATTRIBUTS_OPTIMISATION = (12, 13)
+
 class ConfigurateurPrixInterface:
     def __init__(self):
         self.root = tk.Tk()
@@ -38,6 +46,8 @@ class ConfigurateurPrixInterface:
         
         # Variables
         self.element_ids = []
+        self.instantane = None
+        self.catalogue = CatalogueMateriaux(mc, uc.get_project_number(), signature_projet(uc))
         self.materiaux_detectes = {}
         self.config_materiaux = {}
         self.should_stop = False
@@ -169,18 +179,11 @@ class ConfigurateurPrixInterface:
             self.log(f"📊 Analyse de {len(self.element_ids)} élément(s)")
             
             # Détection des matériaux
-            materiaux_stats = defaultdict(lambda: {'count': 0, 'exemple_id': None})
-            
-            for eid in self.element_ids:
-                try:
-                    mat_name = ac.get_element_material_name(eid).strip()
-                    materiaux_stats[mat_name]['count'] += 1
-                    if materiaux_stats[mat_name]['exemple_id'] is None:
-                        materiaux_stats[mat_name]['exemple_id'] = eid
-                except Exception:
-                    continue
-            
-            self.materiaux_detectes = dict(materiaux_stats)
+            self.capturer_instantane()
+            materiaux_stats = {mat_name: {'count': len(indices), 'exemple_id': self.instantane.eids[indices[0]]}
+                               for mat_name, indices in self.instantane.par_materiau().items()}
+            
+            self.materiaux_detectes = materiaux_stats
             self.log(f"✅ {len(self.materiaux_detectes)} matériau(x) détecté(s)")
             
             # Créer l'interface de configuration
@@ -446,6 +449,39 @@ class ConfigurateurPrixInterface:
             self.log(f"❌ Erreur validation : {e}")
             messagebox.showerror("Erreur", f"Erreur lors de la validation :\n{e}")
     
+    def capturer_instantane(self):
+        """Instantané de la sélection : matériau, cotes et attributs lus une fois pour l'exécution"""
+        erreurs = []
+        self.instantane = ie.instantane(self.element_ids, ac, gc, attributs=ATTRIBUTS_LUS, sku=True,
+                                        projet=uc.get_project_number(), erreurs=erreurs)
+        for eid, e in erreurs:
+            self.log(f"❌ Erreur élément {eid}: {e}")
+    
+    def relire_optimisation(self):
+        """Relit n° de barre et taux de chute : l'optimisation a pu les écrire depuis l'analyse"""
+        erreurs = []
+        self.instantane.lire_attributs(ac, ATTRIBUTS_OPTIMISATION, erreurs=erreurs, rafraichir=True)
+        for eid, e in erreurs:
+            self.log(f"❌ Erreur élément {eid}: {e}")
+    
+    def lire_mesures(self):
+        """Surface de face de référence, seule mesure Cadwork du calcul : pour les prestations « _S » tarifées des matériaux qui les facturent"""
+        inst = self.instantane
+        plan = defaultdict(list)
+        for i, eid in enumerate(inst.eids):
+            presta_code = inst.attribut(2, i)
+            if self.config_materiaux.get(inst.materiau(i), {}).get('prestation', False) \
+                    and presta_code in self.prix_prestation and presta_code.endswith("_S"):
+                plan['surface_reference'].append(eid)
+        erreurs = []
+        cache = cache_elements.ouvrir(uc)  # mesures des éléments inchangés depuis le dernier calcul
+        try:
+            inst.lire_geometrie(gc, plan, erreurs, cache)
+        finally:
+            if cache is not None: cache.fermer()
+        for eid, e in erreurs:
+            self.log(f"❌ Erreur élément {eid}: {e}")
+    
     def calculate_prices(self):
         """Lance le calcul des prix avec la configuration validée"""
         if not self.config_validee:
@@ -456,6 +492,7 @@ class ConfigurateurPrixInterface:
             self.log("🚀 Calcul des prix en cours...")
             
             # Vérification de l'optimisation pour les matériaux configurés
+            self.relire_optimisation()
             elements_non_optimises = self.verifier_optimisation()
             
             if elements_non_optimises:
@@ -485,15 +522,16 @@ class ConfigurateurPrixInterface:
         """Vérifie l'optimisation selon la configuration"""
         elements_non_optimises = []
         
-        for eid in self.element_ids:
+        inst = self.instantane
+        for k, eid in enumerate(inst.eids):
             try:
-                mat_name = ac.get_element_material_name(eid).strip()
+                mat_name = inst.materiau(k)
                 config = self.config_materiaux.get(mat_name, {})
                 
                 # Si le matériau doit être optimisé
                 if config.get('optimiser', False):
-                    num_barre = ac.get_user_attribute(eid, 12)
-                    taux_chute = ac.get_user_attribute(eid, 13)
+                    num_barre = inst.attribut(12, k)
+                    taux_chute = inst.attribut(13, k)
                     
                     num_barre_vide = not num_barre or str(num_barre).strip() == ""
                     taux_chute_vide = not taux_chute or str(taux_chute).strip() == ""
@@ -510,10 +548,7 @@ class ConfigurateurPrixInterface:
         return elements_non_optimises
     
     def safe_float(self, val, default=0.0):
-        try:
-            return float(str(val).replace('%', '').replace(',', '.'))
-        except (ValueError, TypeError):
-            return default
+        return ie.nombre(val, default)
     
     def calculate_all_prices(self):
         """Calcule les prix pour toutes les pièces selon la configuration"""
@@ -535,28 +570,29 @@ class ConfigurateurPrixInterface:
         total_surface_chute = 0
         total_longueur_chute = 0
         
-        for i, eid in enumerate(self.element_ids):
+        inst = self.instantane
+        self.lire_mesures()
+        for i, eid in enumerate(inst.eids):
             try:
                 # Configuration du matériau
-                mat_name = ac.get_element_material_name(eid).strip()
+                mat_name = inst.materiau(i)
                 config = self.config_materiaux.get(mat_name, {})
                 
-                # Données géométriques
-                largeur = round(gc.get_list_width(eid))
-                hauteur = round(gc.get_list_height(eid))
-                longueur_mm = gc.get_length(eid)
+                # Données géométriques (instantané, mm entiers)
+                largeur = inst.largeur[i]
+                hauteur = inst.hauteur[i]
+                longueur_mm = inst.longueur[i]
                 longueur_m = longueur_mm / 1000
                 section_str = f"{largeur}x{hauteur}"
                 
                 # Prix unitaire matière
-                mat_id = mc.get_material_id(mat_name)
-                prix_u = self.safe_float(mc.get_price(mat_id))
+                prix_u = self.catalogue.prix(mat_name)
                 recap_prix_unitaire_materiaux[mat_name] = prix_u
                 
                 # Taux de chute selon configuration
                 if config.get('optimiser', False):
-                    taux_chute = self.safe_float(ac.get_user_attribute(eid, 13)) / 100.0
-                    num_barre = ac.get_user_attribute(eid, 12) or "N/A"
+                    taux_chute = inst.nombres(13)[i] / 100.0
+                    num_barre = inst.attribut(12, i) or "N/A"
                 else:
                     taux_chute = 0.0
                     num_barre = "N/A"
@@ -597,7 +633,7 @@ class ConfigurateurPrixInterface:
                 # Traitement selon configuration
                 prix_trait_piece = 0.0
                 if config.get('traitement', False):
-                    traitement_code = ac.get_user_attribute(eid, 1)
+                    traitement_code = inst.attribut(1, i)
                     if traitement_code and traitement_code.strip() in self.prix_traitement:
                         tarif = self.prix_traitement[traitement_code.strip()]
                         # Volume pour traitement (toujours en m³)
@@ -608,7 +644,7 @@ class ConfigurateurPrixInterface:
                 # Façonnage selon configuration
                 prix_fac = 0.0
                 if config.get('faconnage', False):
-                    sku = ac.get_sku(eid)
+                    sku = inst.sku_de(i)
                     if sku and sku.strip() in self.prix_faconnage:
                         prix_f = self.prix_faconnage[sku.strip()]
                         if sku.strip().endswith("_L"):
@@ -622,11 +658,11 @@ class ConfigurateurPrixInterface:
                 # Prestation selon configuration
                 prix_presta = 0.0
                 if config.get('prestation', False):
-                    presta_code = ac.get_user_attribute(eid, 2)
+                    presta_code = inst.attribut(2, i)
                     if presta_code and presta_code.strip() in self.prix_prestation:
                         prix_p = self.prix_prestation[presta_code.strip()]
                         if presta_code.strip().endswith("_S"):
-                            surface_presta = gc.get_element_reference_face_area(eid) / 1_000_000
+                            surface_presta = inst.mesure('surface_reference', i, 0.0) / 1_000_000
                             qty_p = surface_presta
                         else:
                             qty_p = largeur * hauteur * longueur_mm / 1_000_000_000
@@ -0,0 +1,90 @@
+"""
+Cache persistant des mesures d'éléments — sqlite (stdlib), sans dépendance Cadwork.
+
+Clé : fichier .3d et eid. Chaque entrée porte l'empreinte de l'élément
+(`Instantane.empreinte` : matériau, longueur, largeur et hauteur de liste en
+mm) et ses mesures coûteuses (volumes, surfaces, longueur de liste, voir
+`instantane_elements.MESURES`). À la réouverture d'un projet, un élément dont
+l'empreinte n'a pas changé reprend ses mesures sans appel Cadwork ; les autres
+sont remesurés. Les contrôleurs exposés n'ont pas de compteur de
+modification : un usinage qui ne change ni matériau ni cotes n'est pas
+détecté (`vider` pour repartir de zéro).
+Au-delà de `max_entrees`, tous projets confondus, les éléments les moins
+récemment utilisés sont évincés.
+"""
+import json
+import os
+import sqlite3
+import time
+
+CHEMIN_DEFAUT = os.path.join(os.path.expanduser("~"), ".optimisation_scierie", "cache_elements.sqlite")
+LOT = 500  # eids par requête IN (limite de paramètres sqlite)
+
+def fichier_projet(uc) -> str:
+    """Chemin du .3d ouvert (clé des éléments), "" si indisponible."""
+    try:
+        return uc.get_3d_file_path() or ""
+    except Exception:
+        return ""
+
+def ouvrir(uc, chemin: str = CHEMIN_DEFAUT):
+    """Cache du projet ouvert ; None sans fichier .3d (éléments non identifiables) ou si la base est inaccessible."""
+    projet = fichier_projet(uc)
+    if not projet:
+        return None
+    try:
+        return CacheElements(projet, chemin)
+    except (OSError, sqlite3.Error):
+        return None
+
+class CacheElements:
+    """Cache LRU sur disque d'un projet ; toute erreur sqlite est traitée comme un défaut de cache."""
+
+    def __init__(self, projet: str, chemin: str = CHEMIN_DEFAUT, max_entrees: int = 200_000):
+        self.projet, self.chemin, self.max_entrees = projet, chemin, max_entrees
+        self.succes = self.echecs = 0
+        os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+        self.cnx = sqlite3.connect(chemin)
+        self.cnx.execute("""CREATE TABLE IF NOT EXISTS elements (projet TEXT NOT NULL, eid INTEGER NOT NULL,
+            empreinte TEXT NOT NULL, mesures TEXT NOT NULL, acces REAL NOT NULL, PRIMARY KEY (projet, eid))""")
+        self.cnx.execute("CREATE INDEX IF NOT EXISTS elements_acces ON elements (acces)")
+        self.cnx.commit()
+
+    def lire(self, eids) -> dict:
+        """{eid: (empreinte, {mesure: valeur})} des éléments en cache ; leur accès est rafraîchi."""
+        eids = list(eids)
+        trouves = {}
+        try:
+            for i in range(0, len(eids), LOT):
+                lot = eids[i:i + LOT]
+                for eid, emp, mesures in self.cnx.execute(
+                        f"SELECT eid, empreinte, mesures FROM elements WHERE projet = ? AND eid IN ({','.join('?' * len(lot))})",
+                        (self.projet, *lot)):
+                    trouves[eid] = (emp, json.loads(mesures))
+            maintenant = time.time()
+            self.cnx.executemany("UPDATE elements SET acces = ? WHERE projet = ? AND eid = ?",
+                                 [(maintenant, self.projet, eid) for eid in trouves])
+            self.cnx.commit()
+        except sqlite3.Error:
+            return {}
+        return trouves
+
+    def ecrire(self, lignes):
+        """`lignes` = [(eid, empreinte, {mesure: valeur})] ; remplace les entrées existantes."""
+        maintenant = time.time()
+        try:
+            self.cnx.executemany("INSERT OR REPLACE INTO elements VALUES (?, ?, ?, ?, ?)",
+                                 [(self.projet, eid, emp, json.dumps(mesures), maintenant) for eid, emp, mesures in lignes])
+            n = self.cnx.execute("SELECT COUNT(*) FROM elements").fetchone()[0]
+            if n > self.max_entrees:
+                self.cnx.execute("DELETE FROM elements WHERE rowid IN (SELECT rowid FROM elements ORDER BY acces LIMIT ?)",
+                                 (n - self.max_entrees,))
+            self.cnx.commit()
+        except sqlite3.Error:
+            pass
+
+    def vider(self):
+        self.cnx.execute("DELETE FROM elements"); self.cnx.commit()
+
+    def fermer(self):
+        self.cnx.close()
@@ -0,0 +1,79 @@
+"""
+Cache persistant des plans de découpe — sqlite (stdlib), sans dépendance Cadwork.
+
+Clé : empreinte de la demande d'une section (longueurs triées, longueurs de
+stock, marge, algorithme, paramètres). Le budget de temps n'y entre que pour
+les calculs qui en dépendent, et sous sa valeur configurée pour le matériau :
+la part de chaque section varie avec le reste du projet. Valeur : le plan sous forme de motifs
+(composition, multiplicité), indépendante de l'ordre des pièces ; il est
+re-développé sur les indices de la tâche à la lecture.
+Au-delà de `max_entrees`, les entrées les moins récemment utilisées sont évincées.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import moteur_decoupe as md
+
+CHEMIN_DEFAUT = os.path.join(os.path.expanduser("~"), ".optimisation_scierie", "cache_plans.sqlite")
+DETERMINISTES = ('premier', 'glouton')  # résultat indépendant du budget de temps
+
+def empreinte(longueurs, stocks, marge_coupe, algorithme, **parametres) -> str:
+    """Empreinte sha256 d'une demande de section (insensible à l'ordre des pièces)."""
+    donnees = [sorted(longueurs), sorted(set(stocks)), marge_coupe, algorithme, sorted(parametres.items())]
+    return hashlib.sha256(json.dumps(donnees, default=repr).encode('utf-8')).hexdigest()
+
+def empreinte_tache(tache) -> str:
+    # la réduction des motifs est bornée dans le temps : le budget compte aussi avec elle
+    budget = None if tache.algorithme in DETERMINISTES and not tache.reduction_motifs else round(tache.budget, 3)
+    return empreinte(tache.longueurs, tache.stocks, tache.marge_coupe, tache.algorithme,
+                     budget=budget, compresse=tache.compresse, max_longueurs=tache.max_longueurs,
+                     couts=sorted((tache.couts or {}).items()), reduction_motifs=tache.reduction_motifs)
+
+class CachePlans:
+    """Cache LRU sur disque ; toute erreur sqlite est traitée comme un défaut de cache."""
+
+    def __init__(self, chemin: str = CHEMIN_DEFAUT, max_entrees: int = 2000):
+        self.chemin, self.max_entrees = chemin, max_entrees
+        self.succes = self.echecs = 0
+        os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+        self.cnx = sqlite3.connect(chemin)
+        self.cnx.execute("CREATE TABLE IF NOT EXISTS plans (cle TEXT PRIMARY KEY, motifs TEXT NOT NULL, acces REAL NOT NULL)")
+        self.cnx.commit()
+
+    def lire(self, tache):
+        """Plan de la tâche (liste de barres, ou de motifs si compressée), None si absent."""
+        cle = empreinte_tache(tache)
+        try:
+            ligne = self.cnx.execute("SELECT motifs FROM plans WHERE cle = ?", (cle,)).fetchone()
+            if ligne is None:
+                self.echecs += 1
+                return None
+            self.cnx.execute("UPDATE plans SET acces = ? WHERE cle = ?", (time.time(), cle))
+            self.cnx.commit()
+        except sqlite3.Error:
+            self.echecs += 1
+            return None
+        motifs = [(tuple((L, n) for L, n in composition), mult) for composition, mult in json.loads(ligne[0])]
+        self.succes += 1
+        return motifs if tache.compresse else md.developper_motifs(tache.longueurs, motifs)
+
+    def ecrire(self, tache, plan):
+        motifs = plan if tache.compresse else md.motifs_depuis_plan(tache.longueurs, plan)
+        try:
+            self.cnx.execute("INSERT OR REPLACE INTO plans VALUES (?, ?, ?)",
+                             (empreinte_tache(tache), json.dumps(motifs), time.time()))
+            exces = self.cnx.execute("SELECT COUNT(*) FROM plans").fetchone()[0] - self.max_entrees
+            if exces > 0:
+                self.cnx.execute("DELETE FROM plans WHERE cle IN (SELECT cle FROM plans ORDER BY acces LIMIT ?)", (exces,))
+            self.cnx.commit()
+        except sqlite3.Error:
+            pass
+
+    def vider(self):
+        self.cnx.execute("DELETE FROM plans"); self.cnx.commit()
+
+    def fermer(self):
+        self.cnx.close()
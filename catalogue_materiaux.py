@@ -0,0 +1,101 @@
+"""
+Catalogue des matériaux — sqlite (stdlib), sans import Cadwork.
+
+Un matériau est résolu une seule fois par exécution (n°, prix, unité, poids
+via le contrôleur matériaux passé en argument) au lieu d'une fois par
+élément. Les valeurs sont aussi conservées sur disque par projet avec une
+signature des définitions (chemin et date du fichier .3d, `signature_projet`) :
+une signature différente invalide les entrées du projet. La base matériaux
+pouvant changer sans que le .3d soit enregistré, n° et prix sont relus à
+chaque exécution : une entrée disque n'est reprise (unité, poids) que s'ils
+sont inchangés. Sans signature, le catalogue ne vit que le temps de l'exécution.
+"""
+import os
+import sqlite3
+from typing import NamedTuple
+
+from instantane_elements import nombre
+
+CHEMIN_DEFAUT = os.path.join(os.path.expanduser("~"), ".optimisation_scierie", "catalogue_materiaux.sqlite")
+
+class Materiau(NamedTuple):
+    id: int
+    prix: float
+    unite: str    # unité Cadwork brute ("" si non renseignée) ; l'heuristique sur le nom reste aux scripts
+    poids: float
+
+def _optionnel(mc, methode, mat_id):
+    # champ absent de certaines versions de l'API : None plutôt qu'une erreur
+    try:
+        return getattr(mc, methode)(mat_id) if hasattr(mc, methode) else None
+    except Exception:
+        return None
+
+def signature_projet(uc) -> str:
+    """Chemin et date de modification du .3d ouvert, "" si indisponibles."""
+    try:
+        chemin = uc.get_3d_file_path()
+        return f"{chemin}|{os.path.getmtime(chemin):.0f}"
+    except Exception:
+        return ""
+
+class CatalogueMateriaux:
+    """Mémo par exécution + cache persistant ; toute erreur sqlite est traitée comme un défaut de cache."""
+
+    def __init__(self, mc, projet: str = "", signature: str = "", chemin: str = CHEMIN_DEFAUT):
+        self.mc, self.projet, self.signature = mc, projet, signature
+        self.memo = {}
+        self.disque = {}  # entrées persistées, à confirmer par le n° et le prix lus dans l'exécution
+        self.appels = 0  # matériaux résolus entièrement par l'API pendant l'exécution
+        self.cnx = None
+        if not signature:
+            return
+        try:
+            os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+            self.cnx = sqlite3.connect(chemin)
+            self.cnx.execute("""CREATE TABLE IF NOT EXISTS materiaux (projet TEXT NOT NULL, nom TEXT NOT NULL,
+                signature TEXT NOT NULL, id INTEGER, prix REAL, unite TEXT, poids REAL, PRIMARY KEY (projet, nom))""")
+            self.cnx.execute("DELETE FROM materiaux WHERE projet = ? AND signature <> ?", (projet, signature))
+            self.cnx.commit()
+            for nom, *valeurs in self.cnx.execute("SELECT nom, id, prix, unite, poids FROM materiaux WHERE projet = ?", (projet,)):
+                self.disque[nom] = Materiau(*valeurs)
+        except (OSError, sqlite3.Error):
+            self.cnx = None
+
+    def get(self, nom: str) -> Materiau:
+        """Fiche du matériau ; les erreurs de l'API (matériau inconnu) sont propagées et rien n'est mémorisé."""
+        if nom in self.memo:
+            return self.memo[nom]
+        mc = self.mc
+        mat_id = mc.get_material_id(nom)
+        prix = nombre(mc.get_price(mat_id))
+        fiche = self.disque.get(nom)
+        if fiche is not None and (fiche.id, fiche.prix) == (mat_id, prix):
+            self.memo[nom] = fiche
+            return fiche
+        fiche = Materiau(mat_id, prix, str(_optionnel(mc, 'get_unit', mat_id) or ""), nombre(_optionnel(mc, 'get_weight', mat_id)))
+        self.memo[nom] = fiche; self.appels += 1
+        if self.cnx is not None:
+            try:
+                self.cnx.execute("INSERT OR REPLACE INTO materiaux VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (self.projet, nom, self.signature, *fiche))
+                self.cnx.commit()
+            except sqlite3.Error:
+                pass
+        return fiche
+
+    def id(self, nom: str) -> int:
+        return self.get(nom).id
+
+    def prix(self, nom: str) -> float:
+        return self.get(nom).prix
+
+    def unite(self, nom: str) -> str:
+        return self.get(nom).unite
+
+    def poids(self, nom: str) -> float:
+        return self.get(nom).poids
+
+    def fermer(self):
+        if self.cnx is not None:
+            self.cnx.close(); self.cnx = None
@@ -16,6 +16,9 @@ from tkinter import ttk, scrolledtext, messagebox, simpledialog
 import threading
 import json
 
+import instantane_elements as ie
+from catalogue_materiaux import CatalogueMateriaux, signature_projet
+
 class ConfigurateurDevisInterface:
     def __init__(self):
         self.root = tk.Tk()
@@ -25,6 +28,8 @@ class ConfigurateurDevisInterface:
         
         # Variables principales
         self.element_ids = []
+        self.instantane = None
+        self.catalogue = CatalogueMateriaux(mc, uc.get_project_number(), signature_projet(uc))
         self.materiaux_detectes = {}  # {material_name: {'count': int, 'exemple_id': int, 'prix_cadwork': float}}
         self.config_vars = {}  # Variables Tkinter pour chaque matériau
         self.should_stop = False
@@ -201,20 +206,15 @@ class ConfigurateurDevisInterface:
             self.project_info_label.config(text=f"Erreur lecture projet: {e}")
             
     def safe_float(self, val, default=0.0):
-        """Conversion sécurisée en float"""
-        try:
-            return float(str(val).replace(',', '.').replace('%', ''))
-        except (ValueError, TypeError):
-            return default
+        """Conversion sécurisée en float (règle commune, `instantane_elements.nombre`)"""
+        return ie.nombre(val, default)
             
     def get_material_unit_auto(self, material_name):
         """Détecte automatiquement l'unité d'un matériau avec logique affinée"""
         try:
-            mat_id = mc.get_material_id(material_name)
-            if hasattr(mc, 'get_unit'):
-                unit = mc.get_unit(mat_id)
-                if unit:
-                    return unit.lower()
+            unit = self.catalogue.unite(material_name)
+            if unit:
+                return unit.lower()
         except Exception:
             pass
         
@@ -243,9 +243,7 @@ class ConfigurateurDevisInterface:
     def get_cadwork_material_price(self, material_name):
         """Récupère le prix depuis les matériaux Cadwork"""
         try:
-            mat_id = mc.get_material_id(material_name)
-            prix = self.safe_float(mc.get_price(mat_id))
-            return prix
+            return self.catalogue.prix(material_name)
         except Exception as e:
             self.log(f"⚠️ Impossible de récupérer le prix pour {material_name}: {e}")
             return 0.0
@@ -263,23 +261,19 @@ class ConfigurateurDevisInterface:
                 
             self.log(f"📊 Analyse de {len(self.element_ids)} élément(s)")
             
-            # Détection des matériaux
-            materiaux_stats = defaultdict(lambda: {'count': 0, 'exemple_id': None, 'prix_cadwork': 0.0})
+            # Détection des matériaux (instantané partagé avec les scripts suivants)
+            erreurs = []
+            self.instantane = ie.instantane(self.element_ids, ac, gc, projet=uc.get_project_number(), erreurs=erreurs)
+            for eid, e in erreurs:
+                self.log(f"⚠️ Erreur élément {eid}: {e}")
             
-            for eid in self.element_ids:
-                try:
-                    mat_name = ac.get_element_material_name(eid).strip()
-                    if mat_name:
-                        materiaux_stats[mat_name]['count'] += 1
-                        if materiaux_stats[mat_name]['exemple_id'] is None:
-                            materiaux_stats[mat_name]['exemple_id'] = eid
-                            # Récupération du prix Cadwork
-                            materiaux_stats[mat_name]['prix_cadwork'] = self.get_cadwork_material_price(mat_name)
-                except Exception as e:
-                    self.log(f"⚠️ Erreur élément {eid}: {e}")
-                    continue
+            materiaux_stats = {}
+            for mat_name, indices in self.instantane.par_materiau().items():
+                if mat_name:
+                    materiaux_stats[mat_name] = {'count': len(indices), 'exemple_id': self.instantane.eids[indices[0]],
+                                                 'prix_cadwork': self.get_cadwork_material_price(mat_name)}
             
-            self.materiaux_detectes = dict(materiaux_stats)
+            self.materiaux_detectes = materiaux_stats
             self.log(f"✅ {len(self.materiaux_detectes)} matériau(x) détecté(s)")
             
             # Création de l'interface de configuration
@@ -298,19 +292,23 @@ class ConfigurateurDevisInterface:
             self.log(f"❌ Erreur lors de l'analyse : {e}")
             messagebox.showerror("Erreur", f"Erreur lors de l'analyse :\n{e}")
     
+    def eids_par_materiau(self):
+        """{matériau: [eids]} d'après l'instantané de l'analyse"""
+        return {mat: [self.instantane.eids[k] for k in indices]
+                for mat, indices in self.instantane.par_materiau().items()}
+    
     def save_material_prices_to_attributes(self):
         """Sauvegarde les prix matière dans l'attribut 19 de tous les éléments"""
         try:
             self.log("💾 Sauvegarde des prix matière dans les attributs Cadwork...")
             
-            for eid in self.element_ids:
+            for mat_name, eids in self.eids_par_materiau().items():
                 try:
-                    mat_name = ac.get_element_material_name(eid).strip()
                     if mat_name in self.materiaux_detectes:
                         prix_cadwork = self.materiaux_detectes[mat_name]['prix_cadwork']
-                        ac.set_user_attribute([eid], 19, str(prix_cadwork))
+                        ac.set_user_attribute(eids, 19, str(prix_cadwork))
                 except Exception as e:
-                    self.log(f"⚠️ Erreur sauvegarde prix élément {eid}: {e}")
+                    self.log(f"⚠️ Erreur sauvegarde prix {mat_name}: {e}")
                     
             self.log("✅ Prix matière sauvegardés dans attribut 19")
             
@@ -837,9 +835,9 @@ class ConfigurateurDevisInterface:
         try:
             self.log("💾 Sauvegarde configuration dans attributs Cadwork...")
             
-            for eid in self.element_ids:
+            # Un appel par matériau et par attribut (tous les éléments du matériau à la fois)
+            for mat_name, eids in self.eids_par_materiau().items():
                 try:
-                    mat_name = ac.get_element_material_name(eid).strip()
                     if mat_name not in self.config_vars:
                         continue
                     
@@ -847,33 +845,33 @@ class ConfigurateurDevisInterface:
                     
                     # Attribut 4: Unité matériau
                     unite = config['unite'].get()
-                    ac.set_user_attribute([eid], 4, unite)
+                    ac.set_user_attribute(eids, 4, unite)
                     
                     # Attribut 5: À optimiser (1/0)
                     optimiser = "1" if config['optimiser'].get() else "0"
-                    ac.set_user_attribute([eid], 5, optimiser)
+                    ac.set_user_attribute(eids, 5, optimiser)
                     
                     # Attribut 6: Type optimisation
                     type_opti = config['type_opti'].get()
-                    ac.set_user_attribute([eid], 6, type_opti)
+                    ac.set_user_attribute(eids, 6, type_opti)
                     
                     # Attribut 14: Méthode calcul (conversion nom → code)
                     methode_display = config['methode_calcul'].get()
                     methode_code = self.get_methode_code(methode_display)
-                    ac.set_user_attribute([eid], 14, methode_code)
+                    ac.set_user_attribute(eids, 14, methode_code)
                     
                     # Attribut 17: Taux chute manuel (défaut 0%)
-                    ac.set_user_attribute([eid], 17, "0.0")
+                    ac.set_user_attribute(eids, 17, "0.0")
                     
                     # Attribut 18: Coût traitement chutes (défaut 0€)
-                    ac.set_user_attribute([eid], 18, "0.0")
+                    ac.set_user_attribute(eids, 18, "0.0")
                     
                     # Attribut 19: Prix matière (déjà fait dans save_material_prices_to_attributes)
                     prix_unitaire = self.safe_float(config['prix_unitaire'].get())
-                    ac.set_user_attribute([eid], 19, str(prix_unitaire))
+                    ac.set_user_attribute(eids, 19, str(prix_unitaire))
                     
                 except Exception as e:
-                    self.log(f"⚠️ Erreur sauvegarde élément {eid}: {e}")
+                    self.log(f"⚠️ Erreur sauvegarde {mat_name}: {e}")
                     
             self.log("✅ Configuration sauvegardée dans les attributs Cadwork")
             
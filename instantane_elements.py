@@ -0,0 +1,226 @@
+"""
+Instantané colonnaire des éléments — stdlib, sans import Cadwork.
+
+Chaque champ d'une sélection est lu une seule fois par exécution (un appel
+API par élément et par champ) et rangé en colonnes compactes : eid, n° de
+matériau (noms internés), longueur / largeur / hauteur en mm entiers,
+attributs utilisateur (textes internés) et SKU. Les scripts lisent ensuite
+des tableaux en O(1) au lieu de refaire les appels Cadwork synchrones.
+
+L'instantané ne vit que le temps de l'exécution : chaque script refait la
+passe de base (les éléments ont pu être modifiés entre deux scripts), seules
+les mesures coûteuses sont reprises d'une exécution à l'autre, sous contrôle
+de l'empreinte de chaque élément (`cache_elements`).
+Les contrôleurs `ac` / `gc` sont passés en argument.
+
+Attributs : chaque étape déclare les numéros (1 à 30) qu'elle lit ; ils sont
+lus en une passe, mémorisés pour l'exécution (`lire_attributs` ne relit pas
+un attribut déjà présent) et `nombres` en donne la colonne numérique, chaque
+texte distinct n'étant converti qu'une fois (`nombre`).
+
+Mesures coûteuses (volumes, surfaces, longueur de liste) : hors de la passe de
+base, elles sont lues à la demande par `lire_geometrie` selon un plan
+{mesure: eids} établi par chaque script d'après la configuration des
+matériaux, en un seul balayage de la sélection.
+"""
+import array
+import math
+
+NUMEROS_ATTRIBUTS = range(1, 31)
+# mesure -> méthode du contrôleur géométrie
+MESURES = {'longueur_liste': 'get_list_length', 'volume_physique': 'get_actual_physical_volume',
+           'volume': 'get_volume', 'volume_liste': 'get_list_volume',
+           'surface_face_avant': 'get_area_of_front_face', 'surface_reference': 'get_element_reference_face_area'}
+
+def nombre(val, defaut: float = 0.0) -> float:
+    """Règle commune des scripts : « 12,5 % », « 1 234.5 » -> float ; vide ou illisible -> `defaut`."""
+    if val is None:
+        return defaut
+    if isinstance(val, (int, float)):
+        return float(val)
+    try:
+        s = str(val).replace('\u00A0', '').replace(' ', '').replace('%', '').replace(',', '.')
+        return float(s) if s else defaut
+    except ValueError:
+        return defaut
+
+class Instantane:
+    """
+    Colonnes d'une sélection ; l'indice k désigne le k-ième élément.
+    `attributs` = {n° d'attribut: colonne d'indices dans `textes`}, `textes[0]` = "".
+    """
+
+    def __init__(self, eids, materiaux, id_materiau, longueur, largeur, hauteur, attributs=None, sku=None,
+                 textes=None, projet: str = ""):
+        self.eids, self.materiaux, self.id_materiau = eids, materiaux, id_materiau
+        self.longueur, self.largeur, self.hauteur = longueur, largeur, hauteur
+        self.attributs, self.sku = attributs or {}, sku
+        self.textes = textes if textes is not None else [""]
+        self.projet = projet
+        self._index = None
+        self._ids_textes = None
+        self._nombres = {}
+        self.geometrie = {}  # mesure -> array('d'), NaN = non mesuré
+
+    def __len__(self):
+        return len(self.eids)
+
+    def index(self, eid) -> int:
+        if self._index is None:
+            self._index = {e: k for k, e in enumerate(self.eids)}
+        return self._index[eid]
+
+    def materiau(self, k: int) -> str:
+        return self.materiaux[self.id_materiau[k]]
+
+    def attribut(self, n: int, k: int) -> str:
+        return self.textes[self.attributs[n][k]]
+
+    def sku_de(self, k: int) -> str:
+        return self.textes[self.sku[k]] if self.sku is not None else ""
+
+    def nombres(self, n: int):
+        """Colonne numérique de l'attribut n (0.0 si vide), mémorisée."""
+        if n not in self._nombres:
+            valeurs = {}
+            for t in set(self.attributs[n]):
+                valeurs[t] = nombre(self.textes[t])
+            self._nombres[n] = array.array('d', (valeurs[t] for t in self.attributs[n]))
+        return self._nombres[n]
+
+    def lire_attributs(self, ac, attributs=(), sku: bool = False, erreurs: list = None, rafraichir: bool = False):
+        """
+        Lecture groupée : une passe sur la sélection pour les attributs
+        demandés absents de l'instantané (et le SKU). Un attribut illisible vaut "".
+        Avec `rafraichir`, les attributs demandés sont relus même s'ils sont présents
+        (valeurs réécrites par un autre script depuis la capture).
+        """
+        manquants = [n for n in dict.fromkeys(attributs) if rafraichir or n not in self.attributs]
+        hors = [n for n in manquants if n not in NUMEROS_ATTRIBUTS]
+        if hors:
+            raise ValueError(f"Attributs utilisateur hors 1-30: {hors}")
+        sku = sku and self.sku is None
+        if not manquants and not sku:
+            return
+        if self._ids_textes is None:
+            self.textes = list(self.textes)
+            self._ids_textes = {t: i for i, t in enumerate(self.textes)}
+        def interner(s):
+            s = (s or "").strip()
+            if s not in self._ids_textes:
+                self._ids_textes[s] = len(self.textes); self.textes.append(s)
+            return self._ids_textes[s]
+        colonnes = {n: array.array('I') for n in manquants}
+        col_sku = array.array('I') if sku else None
+        for eid in self.eids:
+            for n in manquants:
+                try:
+                    colonnes[n].append(interner(ac.get_user_attribute(eid, n)))
+                except Exception as e:
+                    colonnes[n].append(0)
+                    if erreurs is not None: erreurs.append((eid, f"attribut {n}: {e}"))
+            if sku:
+                try:
+                    col_sku.append(interner(ac.get_sku(eid)))
+                except Exception as e:
+                    col_sku.append(0)
+                    if erreurs is not None: erreurs.append((eid, f"SKU: {e}"))
+        self.attributs = {**self.attributs, **colonnes}
+        if sku: self.sku = col_sku
+
+    def empreinte(self, k: int) -> str:
+        """Empreinte de changement de l'élément k (matériau et cotes), clé de validité du cache d'éléments."""
+        return f"{self.materiau(k)}|{self.longueur[k]}|{self.largeur[k]}|{self.hauteur[k]}"
+
+    def lire_geometrie(self, gc, plan, erreurs: list = None, cache=None) -> int:
+        """
+        Balayage unique de la sélection : chaque élément ne reçoit que les appels
+        des mesures que `plan` ({mesure: eids}) lui attribue. Mesure déjà lue ou
+        absente de l'API : pas d'appel. Avec `cache` (`cache_elements.CacheElements`),
+        un élément d'empreinte inchangée reprend ses mesures en cache, les nouvelles
+        mesures y sont enregistrées. Retourne le nombre d'appels.
+        """
+        par_element = {}
+        for mesure, eids in plan.items():
+            if mesure not in MESURES:
+                raise ValueError(f"Mesure inconnue: {mesure}")
+            if not hasattr(gc, MESURES[mesure]):
+                continue
+            col = self.geometrie.setdefault(mesure, array.array('d', [math.nan]) * len(self))
+            for eid in eids:
+                k = self.index(eid)
+                if math.isnan(col[k]):
+                    par_element.setdefault(k, []).append(mesure)
+        en_cache = {}
+        if cache is not None and par_element:
+            for eid, (emp, mesures) in cache.lire(self.eids[k] for k in par_element).items():
+                k = self.index(eid)
+                if emp != self.empreinte(k):
+                    continue  # élément modifié : remesuré, ancienne entrée remplacée
+                en_cache[k] = mesures
+                for mesure in [m for m in par_element[k] if m in mesures]:
+                    self.geometrie[mesure][k] = mesures[mesure]; par_element[k].remove(mesure)
+            cache.succes += sum(1 for k in par_element if not par_element[k])
+            cache.echecs += sum(1 for k in par_element if par_element[k])
+        appels, a_ecrire = 0, []
+        for k in sorted(par_element):
+            if not par_element[k]:
+                continue
+            eid = self.eids[k]
+            for mesure in par_element[k]:
+                appels += 1
+                try:
+                    self.geometrie[mesure][k] = float(getattr(gc, MESURES[mesure])(eid))
+                except Exception as e:
+                    if erreurs is not None: erreurs.append((eid, f"{mesure}: {e}"))
+            a_ecrire.append((eid, self.empreinte(k), {**en_cache.get(k, {}), **self.mesures(k)}))
+        if cache is not None and a_ecrire:
+            cache.ecrire(a_ecrire)
+        return appels
+
+    def mesure(self, mesure: str, k: int, defaut=None):
+        """Mesure lue par `lire_geometrie`, `defaut` si non mesurée."""
+        col = self.geometrie.get(mesure)
+        return defaut if col is None or math.isnan(col[k]) else col[k]
+
+    def mesures(self, k: int) -> dict:
+        return {m: col[k] for m, col in self.geometrie.items() if not math.isnan(col[k])}
+
+    def par_materiau(self):
+        """{nom du matériau: [indices]} dans l'ordre de la sélection."""
+        groupes = {}
+        for k, m in enumerate(self.id_materiau):
+            groupes.setdefault(self.materiaux[m], []).append(k)
+        return groupes
+
+# =========================================================
+# Capture
+# =========================================================
+
+def _mm(val) -> int:
+    try:
+        return int(round(float(val)))
+    except (TypeError, ValueError):
+        return 0
+
+def instantane(eids, ac, gc, attributs=(), sku: bool = False, projet: str = "", erreurs: list = None) -> Instantane:
+    """
+    Une passe sur la sélection : matériau, longueur (`gc.get_length`), largeur et
+    hauteur de liste ; puis lecture groupée des attributs demandés et du SKU.
+    Un élément illisible est omis et noté dans `erreurs` [(eid, message)].
+    """
+    ids_materiaux = {}
+    col_eids, col_mat = array.array('q'), array.array('I')
+    col_L, col_l, col_h = array.array('i'), array.array('i'), array.array('i')
+    for eid in eids:
+        try:
+            mat = (ac.get_element_material_name(eid) or "").strip()
+            ligne = (_mm(gc.get_length(eid)), _mm(gc.get_list_width(eid)), _mm(gc.get_list_height(eid)))
+        except Exception as e:
+            if erreurs is not None: erreurs.append((eid, str(e)))
+            continue
+        col_eids.append(eid); col_mat.append(ids_materiaux.setdefault(mat, len(ids_materiaux)))
+        col_L.append(ligne[0]); col_l.append(ligne[1]); col_h.append(ligne[2])
+    inst = Instantane(col_eids, list(ids_materiaux), col_mat, col_L, col_l, col_h, projet=projet)
+    inst.lire_attributs(ac, attributs, sku, erreurs)
+    return inst
@@ -0,0 +1,1214 @@
+"""
+Moteur de découpe 1D (barres) — sans dépendance Cadwork.
+
+Les longueurs sont en mm. Un plan est une liste de barres, chaque barre étant
+la liste des indices (dans la liste des longueurs fournie) des pièces qu'elle
+contient, dans l'ordre de découpe.
+
+Représentation compressée : les pièces identiques forment des lignes de
+demande (longueur, quantité) et un plan est une liste de motifs
+(composition, multiplicité), la composition étant ((longueur, nb), ...).
+Les indices ne sont attribués qu'au développement (`developper_motifs`).
+"""
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import List, NamedTuple, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # repli : ensembles de bits sur les entiers Python
+    np = None
+
+# =========================================================
+# Outils
+# =========================================================
+
+def longueur_occupee(longueurs_pieces: Sequence[float], marge_coupe: float) -> float:
+    """Longueur consommée par une barre : pièces + (n-1) traits de coupe."""
+    nb = len(longueurs_pieces)
+    return sum(longueurs_pieces) + ((nb - 1) * marge_coupe if nb > 1 else 0)
+
+def longueur_stock(occ: float, stocks_tries: Sequence[float]) -> float:
+    """Plus petite longueur commerciale >= occ (la plus grande si aucune ne suffit)."""
+    k = bisect_left(stocks_tries, occ)
+    return stocks_tries[k] if k < len(stocks_tries) else stocks_tries[-1]
+
+def cout_stock(L: float, couts: dict = None) -> float:
+    """Coût d'achat d'une barre de longueur L ; sans tarif, sa longueur."""
+    return couts[L] if couts else L
+
+def elaguer_stocks(longueurs_barres: Sequence[float], couts: dict = None) -> List[float]:
+    """
+    Longueurs de stock triées, privées de celles qu'une longueur supérieure
+    égale ou bat en coût : les coûts croissent alors avec la longueur et la plus
+    petite longueur qui contient une barre (`longueur_stock`) est aussi la moins chère.
+    """
+    stocks = sorted(set(longueurs_barres))
+    if not couts:
+        return stocks
+    retenues, cout_min = [], float('inf')
+    for L in reversed(stocks):
+        if couts[L] < cout_min:
+            retenues.append(L); cout_min = couts[L]
+    return retenues[::-1]
+
+# =========================================================
+# Best Fit Decreasing
+# =========================================================
+
+def first_fit_decreasing(longueurs: Sequence[float], longueurs_barres: Sequence[float],
+                         marge_coupe: float) -> List[List[int]]:
+    """First Fit Decreasing : chaque pièce va dans la première barre ouverte où elle tient (stock maxi)."""
+    L_max = max(longueurs_barres)
+    barres: List[List[int]] = []
+    occupations: List[float] = []
+    for i in sorted(range(len(longueurs)), key=lambda i: longueurs[i], reverse=True):
+        for b, occ in enumerate(occupations):
+            if occ + longueurs[i] <= L_max:
+                barres[b].append(i); occupations[b] += longueurs[i] + marge_coupe
+                break
+        else:
+            barres.append([i]); occupations.append(longueurs[i] + marge_coupe)
+    return barres
+
+def best_fit_decreasing(longueurs: Sequence[float], longueurs_barres: Sequence[float],
+                        marge_coupe: float) -> List[List[int]]:
+    """
+    Best Fit Decreasing avec occupation incrémentale.
+    Une pièce va dans la barre ouverte qui minimise la perte
+    (plus petite longueur commerciale >= occupation - occupation), à égalité
+    la plus ancienne ; sinon une nouvelle barre est ouverte.
+
+    Pour chaque longueur commerciale L, la meilleure barre est celle de plus
+    forte occupation <= L - pièce : on la trouve par bisection dans un index
+    des barres trié par occupation, soit O(K log n) par pièce.
+    """
+    stocks = sorted(set(longueurs_barres))
+    ordre = sorted(range(len(longueurs)), key=lambda i: longueurs[i], reverse=True)
+
+    barres: List[List[int]] = []
+    sommes: List[float] = []             # somme des longueurs (sans marge) par barre
+    occupations: List[float] = []        # somme + nb * marge (place pour la coupe suivante)
+    index: List[Tuple[float, int]] = []  # (occupation, -n° barre), trié
+
+    for i in ordre:
+        piece_L = longueurs[i]
+        best, min_perte = None, stocks[-1] + 1
+        for L in stocks:
+            pos = bisect_right(index, (L - piece_L + 1e-6, float('inf'))) - 1
+            while pos >= 0 and index[pos][0] + piece_L > L:
+                pos -= 1
+            if pos < 0:
+                continue
+            occ, b = index[pos][0], -index[pos][1]
+            Lp = stocks[bisect_left(stocks, occ + piece_L)]
+            perte = Lp - (occ + piece_L)
+            if perte < min_perte or (perte == min_perte and b < best):
+                min_perte, best = perte, b
+
+        if best is not None:
+            del index[bisect_left(index, (occupations[best], -best))]
+            barres[best].append(i)
+            sommes[best] += piece_L
+        else:
+            best = len(barres)
+            barres.append([i])
+            sommes.append(piece_L)
+            occupations.append(0.0)
+        occupations[best] = sommes[best] + len(barres[best]) * marge_coupe
+        insort(index, (occupations[best], -best))
+    return barres
+
+# =========================================================
+# Représentation compressée (lignes de demande × motifs)
+# =========================================================
+
+Motif = Tuple[Tuple[Tuple[float, int], ...], int]
+
+def lignes_demande(longueurs: Sequence[float]) -> List[Tuple[float, int]]:
+    """Lignes (longueur, quantité), longueurs décroissantes."""
+    comptes = {}
+    for L in longueurs:
+        comptes[L] = comptes.get(L, 0) + 1
+    return sorted(comptes.items(), reverse=True)
+
+def occupation_motif(composition, marge_coupe: float) -> float:
+    nb = sum(n for _, n in composition)
+    return sum(L * n for L, n in composition) + max(0, nb - 1) * marge_coupe
+
+def cout_motifs(motifs: Sequence[Motif], stocks_tries: Sequence[float], marge_coupe: float,
+                couts: dict = None) -> float:
+    """Coût d'achat d'un plan compressé (longueur totale commandée sans tarif)."""
+    return sum(m * cout_stock(longueur_stock(occupation_motif(c, marge_coupe), stocks_tries), couts) for c, m in motifs)
+
+def _fusionner_motifs(motifs: Sequence[Motif]) -> List[Motif]:
+    fusion = {}
+    for c, m in motifs:
+        c = tuple(sorted(c, reverse=True))
+        fusion[c] = fusion.get(c, 0) + m
+    return list(fusion.items())
+
+def motifs_depuis_plan(longueurs: Sequence[float], plan: Sequence[Sequence[int]]) -> List[Motif]:
+    """Compresse un plan indexé (les barres de même composition fusionnent)."""
+    motifs = []
+    for barre in plan:
+        comptes = {}
+        for i in barre:
+            comptes[longueurs[i]] = comptes.get(longueurs[i], 0) + 1
+        motifs.append((tuple(comptes.items()), 1))
+    return _fusionner_motifs(motifs)
+
+def developper_motifs(longueurs: Sequence[float], motifs: Sequence[Motif]) -> List[List[int]]:
+    """Attribue les indices des pièces aux barres des motifs (ordre des indices conservé par longueur)."""
+    disponibles = {}
+    for i in range(len(longueurs) - 1, -1, -1):
+        disponibles.setdefault(longueurs[i], []).append(i)
+    plan = []
+    for composition, mult in motifs:
+        for _ in range(mult):
+            plan.append([disponibles[L].pop() for L, n in composition for _ in range(n)])
+    return plan
+
+def heuristique_sequentielle(lignes: Sequence[Tuple[float, int]], longueurs_barres: Sequence[float],
+                             marge_coupe: float, couts: dict = None) -> List[Motif]:
+    """
+    Heuristique séquentielle : à chaque étape, le motif de plus faible coût par
+    mm de pièces (sac à dos par longueur de stock sur la demande restante ;
+    sans tarif, la plus faible chute relative) est appliqué autant de fois que
+    la demande le permet. Le nombre d'itérations dépend des longueurs
+    distinctes, pas du nombre de pièces.
+    """
+    stocks = sorted(set(longueurs_barres))
+    motifs: List[Motif] = [(((L, 1),), n) for L, n in lignes if L > stocks[-1]]
+    lig = [(L, n) for L, n in lignes if L <= stocks[-1]]
+    poids = [L + marge_coupe for L, _ in lig]
+    reste = [n for _, n in lig]
+    while any(reste):
+        # une table de sommes atteignables pour la plus grande longueur sert à toutes les autres
+        lots, etats = _sommes_atteignables(poids, reste, int(stocks[-1] + marge_coupe + 1e-6))
+        meilleur = None
+        for S in stocks:
+            somme = _plus_grande_somme(etats[-1], int(S + marge_coupe + 1e-6))
+            if somme <= 0:
+                continue
+            occ = somme - marge_coupe
+            L_finale = longueur_stock(occ, stocks)
+            cle = (cout_stock(L_finale, couts) / occ, -L_finale)
+            if meilleur is None or cle < meilleur[0]:
+                meilleur = (cle, somme)
+        a = _reconstruire(lots, etats, meilleur[1], len(lig))
+        mult = min(reste[j] // a[j] for j in range(len(a)) if a[j])
+        for j in range(len(a)):
+            reste[j] -= mult * a[j]
+        motifs.append((tuple((lig[j][0], a[j]) for j in range(len(a)) if a[j]), mult))
+    return motifs
+
+# =========================================================
+# Remplissage exact d'une barre (sac à dos en mm entiers)
+# =========================================================
+
+def _sommes_atteignables(poids: Sequence[float], bornes: Sequence[int], capacite: int, arret_plein: bool = False):
+    """
+    Sommes de poids (arrondis au mm supérieur) atteignables jusqu'à `capacite`
+    mm, bornes décomposées en lots 1, 2, 4, ... ; l'état après chaque lot est
+    conservé pour la reconstruction. Un état est un tableau booléen NumPy si
+    disponible, sinon un entier Python utilisé comme ensemble de bits.
+    Avec `arret_plein`, la construction s'arrête dès que `capacite` est atteinte.
+    Retourne (lots [(ligne, nombre, poids du lot)], états).
+    """
+    lots = []
+    for j, (p, n) in enumerate(zip(poids, bornes)):
+        w = math.ceil(p - 1e-6)
+        n = min(n, capacite // w) if 0 < w <= capacite else 0
+        k = 1
+        while n > 0:
+            c = min(k, n)
+            lots.append((j, c, c * w)); n -= c; k *= 2
+    if np is not None:
+        etats = [np.zeros(capacite + 1, dtype=bool)]
+        etats[0][0] = True
+        for _, _, w in lots:
+            etat = etats[-1].copy()
+            etat[w:] |= etats[-1][:capacite + 1 - w]
+            etats.append(etat)
+            if arret_plein and etat[capacite]:
+                break
+    else:
+        masque = (1 << (capacite + 1)) - 1
+        etats = [1]
+        for _, _, w in lots:
+            etats.append((etats[-1] | (etats[-1] << w)) & masque)
+            if arret_plein and etats[-1] >> capacite:
+                break
+    return lots[:len(etats) - 1], etats
+
+def _plus_grande_somme(etat, capacite: int) -> int:
+    if np is not None:
+        return int(np.flatnonzero(etat[:capacite + 1])[-1])
+    return (etat & ((1 << (capacite + 1)) - 1)).bit_length() - 1
+
+def _reconstruire(lots, etats, somme: int, nb_lignes: int) -> List[int]:
+    """Quantités par ligne d'une somme atteignable : un lot est pris si la somme n'était pas atteinte sans lui."""
+    a = [0] * nb_lignes
+    for t in range(len(lots), 0, -1):
+        etat = etats[t - 1]
+        if not (etat[somme] if np is not None else (etat >> somme) & 1):
+            j, c, w = lots[t - 1]
+            a[j] += c; somme -= w
+    return a
+
+def remplissage_exact(poids: Sequence[float], bornes: Sequence[int], capacite: float) -> Tuple[float, List[int]]:
+    """
+    Sac à dos borné dont la valeur est le poids : max poids.a, poids.a <= capacite,
+    a <= bornes, exact au mm près (poids arrondis au mm supérieur, jamais de
+    dépassement). Pour une barre S : poids = longueurs + marge, capacite = S + marge.
+    Retourne (poids.a, a).
+    """
+    cap = int(capacite + 1e-6)
+    if cap <= 0:
+        return 0.0, [0] * len(poids)
+    lots, etats = _sommes_atteignables(poids, bornes, cap, arret_plein=True)
+    a = _reconstruire(lots, etats, _plus_grande_somme(etats[-1], cap), len(poids))
+    return sum(a[j] * poids[j] for j in range(len(poids))), a
+
+def remplir_barres(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                   plan: Sequence[Sequence[int]], couts: dict = None) -> List[List[int]]:
+    """
+    Passe d'amélioration d'un plan : de la barre la plus remplie à la moins
+    remplie, chacune est remplie exactement (`remplissage_exact`) à sa longueur
+    de stock avec les pièces pas encore replacées ; le reliquat repasse en
+    Best Fit Decreasing. La chute se concentre sur les dernières barres.
+    Le nouveau plan n'est retenu que s'il coûte moins, ou autant avec des barres mieux remplies.
+    """
+    stocks = elaguer_stocks(longueurs_barres, couts)
+
+    def occ(b):
+        return longueur_occupee([longueurs[i] for i in b], marge_coupe)
+
+    def evaluer(p):
+        total, remplissage = 0.0, 0.0
+        for b in p:
+            o = occ(b); L = longueur_stock(o, stocks)
+            total += cout_stock(L, couts); remplissage += (o / L) ** 2
+        return round(total, 6), -remplissage
+
+    barres = sorted((b for b in plan if occ(b) <= stocks[-1]), key=occ, reverse=True)
+    nouveau = [list(b) for b in plan if occ(b) > stocks[-1]]  # pièces hors gabarit : barres inchangées
+    libres = sorted((i for b in barres for i in b), reverse=True)
+    lignes = lignes_demande([longueurs[i] for i in libres])
+    poids = [L + marge_coupe for L, _ in lignes]
+    reste = [n for _, n in lignes]
+    disponibles = {}
+    for i in libres:
+        disponibles.setdefault(longueurs[i], []).append(i)
+    for b in barres:
+        if not any(reste):
+            break
+        _, a = remplissage_exact(poids, reste, longueur_stock(occ(b), stocks) + marge_coupe)
+        if any(a):
+            nouveau.append([disponibles[lignes[j][0]].pop() for j in range(len(a)) for _ in range(a[j])])
+            for j in range(len(a)):
+                reste[j] -= a[j]
+    reliquat = [i for indices in disponibles.values() for i in indices]
+    if reliquat:
+        nouveau += [[reliquat[k] for k in b] for b in best_fit_decreasing([longueurs[i] for i in reliquat], stocks, marge_coupe)]
+    return nouveau if evaluer(nouveau) < evaluer(plan) else [list(b) for b in plan]
+
+SEUIL_REMPLISSAGE = 300  # longueurs distinctes : au-delà, le remplissage exact coûte ~50x BFD pour < 0,5 % de gain
+
+def best_fit_rempli(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                    couts: dict = None) -> List[List[int]]:
+    """Best Fit Decreasing suivi de `remplir_barres`, sauf au-delà de SEUIL_REMPLISSAGE longueurs distinctes (BFD seul)."""
+    plan = best_fit_decreasing(longueurs, longueurs_barres, marge_coupe)
+    if len(set(longueurs)) > SEUIL_REMPLISSAGE:
+        return plan
+    return remplir_barres(longueurs, longueurs_barres, marge_coupe, plan, couts)
+
+# =========================================================
+# Réduction du nombre de motifs (réglages de scie)
+# =========================================================
+
+def _sequentielle_aspiration(lignes: Sequence[Tuple[float, int]], stocks: List[float], marge_coupe: float,
+                             tolerance: float, couts: dict = None, limite: float = None, arret=None) -> List[Motif]:
+    """
+    Procédure séquentielle à niveau d'aspiration (Haessler) : à chaque étape,
+    la plus grande fréquence k pour laquelle un motif rempli exactement sur la
+    demande restante divisée par k garde une chute relative <= `tolerance` ;
+    le motif est appliqué autant de fois que la demande le permet. Sans motif
+    admissible, le motif de plus faible coût par mm est pris.
+    Retourne None si l'heure `limite` est passée ou si `arret()` renvoie True.
+    """
+    import time
+    motifs: List[Motif] = [(((L, 1),), n) for L, n in lignes if L > stocks[-1]]
+    lig = [(L, n) for L, n in lignes if L <= stocks[-1]]
+    poids = [L + marge_coupe for L, _ in lig]
+    reste = [n for _, n in lig]
+    capacite = int(stocks[-1] + marge_coupe + 1e-6)
+    while any(reste):
+        if (limite is not None and time.time() >= limite) or (arret is not None and arret()):
+            return None
+        k_max = max(reste)
+        frequences = sorted({max(1, int(k_max * 0.75 ** t)) for t in range(40)}, reverse=True)
+        choix = None
+        for k in frequences:
+            bornes = [r // k for r in reste]
+            if not any(bornes):
+                continue
+            lots, etats = _sommes_atteignables(poids, bornes, capacite)
+            for S in stocks:
+                somme = _plus_grande_somme(etats[-1], int(S + marge_coupe + 1e-6))
+                if somme <= 0:
+                    continue
+                occ = somme - marge_coupe
+                L_finale = longueur_stock(occ, stocks)
+                cle = (L_finale - occ > tolerance * L_finale, cout_stock(L_finale, couts) / occ)
+                if choix is None or cle < choix[0]:
+                    choix = (cle, lots, etats, somme, len(bornes))
+            if choix is not None and not choix[0][0]:
+                break
+        _, lots, etats, somme, nb = choix
+        a = _reconstruire(lots, etats, somme, nb)
+        mult = min(reste[j] // a[j] for j in range(len(a)) if a[j])
+        for j in range(len(a)):
+            reste[j] -= mult * a[j]
+        motifs.append((tuple((lig[j][0], a[j]) for j in range(len(a)) if a[j]), mult))
+    return _fusionner_motifs(motifs)
+
+def reduire_motifs(longueurs: Sequence[float], motifs: Sequence[Motif], longueurs_barres: Sequence[float],
+                   marge_coupe: float, couts: dict = None, evaluer=None, temps_max: float = 10.0,
+                   arret=None) -> List[Motif]:
+    """
+    Objectif secondaire : moins de motifs distincts sans barre ni coût
+    supplémentaires. La procédure à niveau d'aspiration est lancée pour des
+    tolérances de chute croissantes ; le plan admissible de moins de motifs
+    remplace `motifs`. `evaluer(motifs)` (coût du plan) vaut `cout_motifs` par défaut.
+    Au-delà de `temps_max` secondes ou dès que `arret()` renvoie True, le meilleur plan vu est retourné.
+    """
+    import time
+    limite = time.time() + temps_max
+    stocks = elaguer_stocks(longueurs_barres, couts)
+    if evaluer is None:
+        evaluer = lambda m: cout_motifs(m, stocks, marge_coupe, couts)
+    meilleur = _fusionner_motifs(motifs)
+    cout_ref, nb_ref = evaluer(meilleur), sum(mult for _, mult in meilleur)
+    lignes = lignes_demande(longueurs)
+    for tolerance in (0.005, 0.01, 0.02, 0.04, 0.08):
+        candidat = _sequentielle_aspiration(lignes, stocks, marge_coupe, tolerance, couts, limite, arret)
+        if candidat is None:
+            break
+        if (len(candidat) < len(meilleur) and sum(mult for _, mult in candidat) <= nb_ref
+                and evaluer(candidat) <= cout_ref + 1e-6):
+            meilleur = candidat
+    return meilleur
+
+# =========================================================
+# Génération de colonnes (cutting stock exact / quasi exact)
+# =========================================================
+
+EPS = 1e-7
+
+def _sac_a_dos(valeurs: Sequence[float], poids: Sequence[float], bornes: Sequence[int],
+               capacite: float, max_noeuds: int = 1000) -> Tuple[float, List[int]]:
+    """Sac à dos borné (séparation et évaluation) : max valeurs.a, poids.a <= capacite, a <= bornes."""
+    items = [i for i in range(len(valeurs)) if valeurs[i] > EPS and bornes[i] > 0 and poids[i] <= capacite + 1e-6]
+    items.sort(key=lambda i: valeurs[i] / poids[i], reverse=True)
+    meilleur = [0.0, [0] * len(valeurs)]
+    courant = [0] * len(valeurs)
+    noeuds = [0]
+
+    def borne_sup(t, cap, val):
+        for i in items[t:]:
+            n = min(bornes[i], cap / poids[i])
+            val += n * valeurs[i]; cap -= n * poids[i]
+            if cap <= 1e-9:
+                break
+        return val
+
+    def visiter(t, cap, val):
+        # noeud (t, cap, val) : mise à jour du meilleur, True s'il faut le développer
+        noeuds[0] += 1
+        if val > meilleur[0] + EPS:
+            meilleur[0], meilleur[1] = val, courant[:]
+        if t == len(items) or noeuds[0] > max_noeuds:
+            return False
+        return borne_sup(t, cap, val) > meilleur[0] + EPS
+
+    def nb_max(t, cap):
+        return min(bornes[items[t]], int((cap + 1e-6) // poids[items[t]]))
+
+    # parcours en profondeur à pile explicite (pas de limite de récursion sur le nombre de lignes)
+    pile = [[0, capacite, 0.0, nb_max(0, capacite)]] if visiter(0, capacite, 0.0) else []
+    while pile:
+        cadre = pile[-1]
+        t, cap, val, c = cadre
+        i = items[t]
+        if c < 0:
+            courant[i] = 0
+            pile.pop()
+            continue
+        cadre[3] = c - 1
+        courant[i] = c
+        cap, val = cap - c * poids[i], val + c * valeurs[i]
+        if visiter(t + 1, cap, val):
+            pile.append([t + 1, cap, val, nb_max(t + 1, cap)])
+    return meilleur[0], meilleur[1]
+
+def _programme_maitre(demandes, poids, stocks, couts, marge_coupe, limite_temps, arret=None):
+    """
+    Relaxation linéaire du problème de découpe par génération de colonnes
+    (simplexe révisé avec inverse explicite, colonnes tarifées par sac à dos).
+    Retourne la liste des motifs (vecteur de comptes, n° stock) et leurs valeurs x ;
+    interrompue par `limite_temps` ou `arret()`, la base courante (réalisable).
+    """
+    import time
+    m = len(demandes)
+    capacites = [L + marge_coupe for L in stocks]
+    colonnes: List[Tuple[List[int], int]] = []
+    connues = set()
+
+    # base initiale : motifs homogènes dans la plus grande longueur -> base diagonale
+    k_max = len(stocks) - 1
+    for i in range(m):
+        a = [0] * m
+        a[i] = max(1, min(demandes[i], int((capacites[k_max] + 1e-6) // poids[i])))
+        colonnes.append((a, k_max)); connues.add((k_max, tuple(a)))
+    base = list(range(m))
+    inv = [[(1.0 / colonnes[i][0][i]) if r == i else 0.0 for i in range(m)] for r in range(m)]
+    x_b = [demandes[r] / colonnes[r][0][r] for r in range(m)]
+
+    def cout_col(j):
+        return 0.0 if j < 0 else couts[colonnes[j][1]]
+
+    def vecteur(j):
+        if j < 0:
+            a = [0] * m; a[-j - 1] = -1
+            return a
+        return colonnes[j][0]
+
+    iterations, degeneres = 0, 0
+    while iterations < 20000 and time.time() < limite_temps:
+        if arret is not None and arret():
+            break
+        iterations += 1
+        c_b = [cout_col(j) for j in base]
+        duales = [sum(c_b[r] * inv[r][i] for r in range(m)) for i in range(m)]
+
+        entrant, rc_min = None, -EPS
+        en_base = set(base)
+        bland = degeneres > 50
+        for i in range(m):  # variables d'écart
+            if -(i + 1) not in en_base and duales[i] < rc_min:
+                entrant, rc_min = -(i + 1), duales[i]
+                if bland: break
+        if entrant is None or not bland:
+            for j, (a, k) in enumerate(colonnes):
+                if j in en_base:
+                    continue
+                rc = couts[k] - sum(duales[i] * a[i] for i in range(m) if a[i])
+                if rc < rc_min:
+                    entrant, rc_min = j, rc
+                    if bland: break
+
+        if entrant is None:  # tarification : nouvelles colonnes par sac à dos
+            z = sum(c_b[r] * x_b[r] for r in range(m))
+            ratio_max = max(duales[i] / poids[i] for i in range(m))
+            nouvelles, theta = [], 1.0
+            for k in sorted(range(len(stocks)), key=lambda k: couts[k] - ratio_max * capacites[k]):
+                if couts[k] - ratio_max * capacites[k] >= -EPS * couts[k]:
+                    break  # plus aucune longueur ne peut donner de coût réduit négatif
+                val, a = _sac_a_dos(duales, poids, demandes, capacites[k])
+                theta = max(theta, val / couts[k])
+                if couts[k] - val < -EPS * max(1.0, couts[k]) and (k, tuple(a)) not in connues:
+                    nouvelles.append((couts[k] - val, a, k))
+            # borne de Farley : z / theta minore l'optimum linéaire -> arrêt si l'écart est négligeable
+            if not nouvelles or z - z / theta <= 1e-3 * z:
+                break
+            nouvelles.sort(key=lambda t: t[0])
+            for _rc, a, k in nouvelles:
+                colonnes.append((a, k)); connues.add((k, tuple(a)))
+            entrant = len(colonnes) - len(nouvelles)
+
+        a = vecteur(entrant)
+        u = [sum(inv[r][i] * a[i] for i in range(m) if a[i]) for r in range(m)]
+        sortie, ratio = None, None
+        for r in range(m):
+            if u[r] > EPS:
+                q = x_b[r] / u[r]
+                if ratio is None or q < ratio - EPS or (abs(q - ratio) <= EPS and base[r] < base[sortie]):
+                    sortie, ratio = r, q
+        if sortie is None:
+            break
+        degeneres = degeneres + 1 if ratio <= EPS else 0
+
+        piv = u[sortie]
+        ligne = [v / piv for v in inv[sortie]]
+        inv[sortie] = ligne; x_b[sortie] /= piv
+        for r in range(m):
+            if r != sortie and abs(u[r]) > 0:
+                f = u[r]
+                inv[r] = [v - f * w for v, w in zip(inv[r], ligne)]
+                x_b[r] -= f * x_b[sortie]
+        base[sortie] = entrant
+
+    motifs = []
+    for r, j in enumerate(base):
+        if j >= 0 and x_b[r] > EPS:
+            motifs.append((colonnes[j][0], colonnes[j][1], x_b[r]))
+    return motifs
+
+def _generation_colonnes_motifs(lignes: Sequence[Tuple[float, int]], stocks: Sequence[float], marge_coupe: float,
+                                limite: float, tours_residuels: int, couts: dict = None, arret=None) -> List[Motif]:
+    """Génération de colonnes sur lignes de demande : motifs arrondis, reliquat en heuristique séquentielle."""
+    import time
+    motifs: List[Motif] = [(((L, 1),), n) for L, n in lignes if L > stocks[-1]]
+    reste = {L: n for L, n in lignes if L <= stocks[-1]}
+
+    for _ in range(tours_residuels):
+        lig = sorted(((L, n) for L, n in reste.items() if n > 0), reverse=True)
+        if not lig or time.time() >= limite or (arret is not None and arret()):
+            break
+        poids = [L + marge_coupe for L, _ in lig]
+        colonnes = _programme_maitre([n for _, n in lig], poids, stocks, [float(cout_stock(L, couts)) for L in stocks],
+                                     marge_coupe, limite, arret)
+        ajout = False
+        for a, _k, x in colonnes:
+            mult = int(x + 1e-6)
+            while mult > 0:
+                # la relaxation couvre la demande (>=) : on écrête le motif au reliquat
+                composition = tuple((lig[i][0], min(n, reste[lig[i][0]])) for i, n in enumerate(a)
+                                    if n and reste[lig[i][0]])
+                if not composition:
+                    break
+                k = min([mult] + [reste[L] // n for L, n in composition])
+                for L, n in composition:
+                    reste[L] -= k * n
+                motifs.append((composition, k)); mult -= k; ajout = True
+        if not ajout:
+            break
+
+    lig = sorted(((L, n) for L, n in reste.items() if n > 0), reverse=True)
+    if lig:
+        motifs.extend(heuristique_sequentielle(lig, stocks, marge_coupe, couts))
+    return _fusionner_motifs(motifs)
+
+def generation_colonnes(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                        temps_max: float = 10.0, tours_residuels: int = 3, couts: dict = None,
+                        arret=None) -> List[List[int]]:
+    """
+    Découpe par génération de colonnes : relaxation linéaire résolue exactement,
+    arrondi inférieur des motifs, demande résiduelle re-résolue (au plus
+    `tours_residuels` fois) puis terminée en heuristique séquentielle.
+    `arret()` est sondé à chaque itération, comme l'échéance `temps_max`.
+    Le plan retenu n'est jamais plus coûteux que le Best Fit Decreasing seul.
+    """
+    import time
+    stocks = elaguer_stocks(longueurs_barres, couts)
+    plan_bfd = best_fit_decreasing(longueurs, stocks, marge_coupe)
+    cout_bfd = cout_motifs(motifs_depuis_plan(longueurs, plan_bfd), stocks, marge_coupe, couts)
+    if cout_bfd <= borne_inferieure(longueurs, stocks, marge_coupe, couts) + 1e-6:
+        return plan_bfd  # déjà optimal
+    motifs = _generation_colonnes_motifs(lignes_demande(longueurs), stocks, marge_coupe,
+                                         time.time() + temps_max, tours_residuels, couts, arret)
+    if cout_motifs(motifs, stocks, marge_coupe, couts) < cout_bfd:
+        return developper_motifs(longueurs, motifs)
+    return plan_bfd
+
+# =========================================================
+# Borne inférieure
+# =========================================================
+
+def _cout_continu(W: float, marge_coupe: float, L_min: float, b_min: int, b_max: int) -> float:
+    """Coût minimal de W mm de poids (pièce + marge) sur b_min <= B <= b_max barres : max(W - B*marge, B*L_min)."""
+    if W <= 0:
+        return 0.0
+    b_opt = W / (marge_coupe + L_min)
+    candidats = {min(b_max, max(b_min, int(b_opt))), min(b_max, max(b_min, int(b_opt) + 1))}
+    return min(max(W - marge_coupe * b, b * L_min) for b in candidats)
+
+def borne_inferieure(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                     couts: dict = None) -> float:
+    """
+    Borne inférieure sur la longueur totale commandée, maximum de :
+    - la borne continue : avec B barres, total >= somme(pièces + marge) - B * marge
+      et total >= B * plus petite longueur ;
+    - une borne L2 (Martello-Toth) adaptée aux longueurs de stock : chaque
+      grande pièce (plus d'une demi-barre maxi) occupe sa propre barre d'au moins
+      sa longueur de stock ; pour un seuil alpha, les petites pièces >= alpha ne
+      logent gratuitement que dans la chute des grandes barres qui peuvent les
+      recevoir, l'excédent est compté au coût continu.
+    Les pièces plus longues que le stock maxi comptent chacune pour une barre maxi.
+    Avec un tarif `couts`, la borne est exprimée en coût : longueur minimale
+    × plus faible coût au mm des longueurs de stock.
+    """
+    stocks = sorted(set(longueurs_barres))
+    if couts:
+        return min(couts[L] / L for L in stocks) * borne_inferieure(longueurs, stocks, marge_coupe)
+    L_min, L_max = stocks[0], stocks[-1]
+    C = L_max + marge_coupe
+    hors_stock = sum(1 for p in longueurs if p > L_max)
+    retenues = [p for p in longueurs if p <= L_max]
+    if not retenues:
+        return hors_stock * L_max
+    W = sum(p + marge_coupe for p in retenues)
+    continu = _cout_continu(W, marge_coupe, L_min, max(1, -int(-W // C)), len(retenues))
+
+    grandes = sorted(p for p in retenues if p + marge_coupe > C / 2)
+    petites = sorted(p + marge_coupe for p in retenues if p + marge_coupe <= C / 2)
+    total_grandes = sum(longueur_stock(p, stocks) for p in grandes)
+    libres = [0.0]
+    for p in grandes:
+        libres.append(libres[-1] + longueur_stock(p, stocks) - p)
+    suffixes = [0.0] * (len(petites) + 1)
+    for k in range(len(petites) - 1, -1, -1):
+        suffixes[k] = suffixes[k + 1] + petites[k]
+    l2 = 0.0
+    for alpha in [0.0] + sorted(set(petites)):
+        k = bisect_left(petites, alpha)
+        W3 = suffixes[k]
+        # grandes barres pouvant encore recevoir une pièce >= alpha : p + marge <= C - alpha
+        F = libres[bisect_right(grandes, L_max - alpha)]
+        excedent = W3 - F
+        l2 = max(l2, total_grandes + (min(excedent, _cout_continu(excedent, marge_coupe, L_min, 1, len(petites) - k)) if excedent > 0 else 0.0))
+    return hors_stock * L_max + max(continu, l2)
+
+# =========================================================
+# Recherche locale ruine & reconstruction
+# =========================================================
+
+def _inserer_au_moindre_surcout(pieces, barres, longueurs, stocks, marge_coupe, couts=None):
+    """
+    Insère chaque pièce (dans l'ordre donné) dans la barre de plus petit surcoût
+    de stock, puis de plus petite chute, ou dans une nouvelle barre.
+    `barres` = [[indices, occupation]] ; les listes d'indices sont recopiées, jamais modifiées.
+    """
+    L_max = stocks[-1]
+    for i in pieces:
+        p = longueurs[i]
+        best, cle_best = None, (cout_stock(longueur_stock(p, stocks), couts), longueur_stock(p, stocks) - p)
+        for j, (b, o) in enumerate(barres):
+            nouvelle = o + marge_coupe + p
+            if nouvelle <= L_max:
+                L = longueur_stock(nouvelle, stocks)
+                cle = (cout_stock(L, couts) - cout_stock(longueur_stock(o, stocks), couts), L - nouvelle)
+                if cle < cle_best:
+                    best, cle_best = j, cle
+        if best is None:
+            barres.append([[i], p])
+        else:
+            barres[best] = [barres[best][0] + [i], barres[best][1] + marge_coupe + p]
+    return barres
+
+def reparer_plan(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                 barres_initiales: Sequence[Sequence[int]], couts: dict = None) -> List[List[int]]:
+    """
+    Plan réalisable au plus près d'un plan antérieur (démarrage à chaud) : indices
+    absents ignorés, barres devenues trop longues délestées de leurs plus grandes
+    pièces, pièces orphelines (nouvelles ou délestées) insérées au moindre surcoût.
+    """
+    stocks = elaguer_stocks(longueurs_barres, couts)
+    L_max = stocks[-1]
+    vues, barres = set(), []
+    for b in barres_initiales:
+        b = sorted((i for i in b if 0 <= i < len(longueurs) and i not in vues), key=lambda i: longueurs[i])
+        vues.update(b)
+        while len(b) > 1 and longueur_occupee([longueurs[i] for i in b], marge_coupe) > L_max:
+            vues.discard(b.pop())
+        if b:
+            barres.append([b, longueur_occupee([longueurs[i] for i in b], marge_coupe)])
+    orphelines = sorted((i for i in range(len(longueurs)) if i not in vues), key=lambda i: longueurs[i], reverse=True)
+    _inserer_au_moindre_surcout(orphelines, barres, longueurs, stocks, marge_coupe, couts)
+    return [sorted(b, key=lambda i: longueurs[i], reverse=True) for b, _ in barres]
+
+def ruine_reconstruction(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                         plan_initial: List[List[int]] = None, budget_temps: float = 10.0,
+                         arret=None, graine: int = 0, couts: dict = None) -> List[List[int]]:
+    """
+    Amélioration d'un plan (Best Fit Decreasing par défaut) par ruine et
+    reconstruction : quelques barres tirées au hasard (pondéré par la chute)
+    sont vidées puis leurs pièces réinsérées au plus petit surcoût.
+    S'arrête à l'échéance de `budget_temps`, quand la borne inférieure est
+    atteinte, ou dès que `arret()` renvoie True. Retourne le meilleur plan vu.
+    """
+    import random, time
+    stocks = elaguer_stocks(longueurs_barres, couts)
+    L_max = stocks[-1]
+    plan = [list(b) for b in (plan_initial if plan_initial is not None
+                              else best_fit_decreasing(longueurs, stocks, marge_coupe))]
+    if len(plan) < 2:
+        return plan
+    rnd = random.Random(graine)
+    limite = time.time() + budget_temps
+    borne = borne_inferieure(longueurs, stocks, marge_coupe, couts)
+    echelle = cout_stock(L_max, couts) / L_max  # bonus de remplissage exprimé dans l'unité du coût
+
+    def occ(b):
+        return longueur_occupee([longueurs[i] for i in b], marge_coupe)
+
+    def evaluer(barres):
+        # coût commandé, puis bonus de remplissage (favorise le vidage des barres peu remplies)
+        total, bonus = 0.0, 0.0
+        for _, o in barres:
+            L = longueur_stock(o, stocks)
+            total += cout_stock(L, couts); bonus += (o / L) ** 2
+        return total, total - 100.0 * echelle * bonus
+
+    courant = [(b, occ(b)) for b in plan]
+    cout_courant, f_courant = evaluer(courant)
+    meilleur, cout_meilleur = [list(b) for b, _ in courant], cout_courant
+    seuil0 = 0.002 * cout_courant
+
+    while cout_meilleur > borne + 1e-6:
+        if time.time() >= limite or (arret is not None and arret()):
+            break
+        # ruine : tirage pondéré par la chute de chaque barre
+        nb = min(len(courant), rnd.randint(2, 8))
+        poids_chute = [max(0.0, longueur_stock(o, stocks) - o) + 1.0 for _, o in courant]
+        choisies = set(rnd.choices(range(len(courant)), weights=poids_chute, k=nb))
+        gardees = [[b, o] for j, (b, o) in enumerate(courant) if j not in choisies]
+        pieces = [i for j in choisies for i in courant[j][0]]
+        pieces.sort(key=lambda i: longueurs[i] * (1.0 + 0.1 * rnd.random()), reverse=True)
+
+        _inserer_au_moindre_surcout(pieces, gardees, longueurs, stocks, marge_coupe, couts)
+
+        cout_nouveau, f_nouveau = evaluer(gardees)
+        seuil = seuil0 * max(0.0, limite - time.time()) / max(budget_temps, 1e-9)
+        if f_nouveau <= f_courant + seuil:
+            courant, cout_courant, f_courant = [(b, o) for b, o in gardees], cout_nouveau, f_nouveau
+            if cout_courant < cout_meilleur:
+                meilleur, cout_meilleur = [list(b) for b, _ in courant], cout_courant
+
+    return [sorted(b, key=lambda i: longueurs[i], reverse=True) for b in meilleur]
+
+# =========================================================
+# Consolidation des longueurs commandées
+# =========================================================
+
+def consolider_longueurs(occupations: Sequence[Tuple[float, int]], longueurs_barres: Sequence[float],
+                         k_max: int, couts: dict = None) -> List[float]:
+    """
+    Meilleur sous-ensemble d'au plus `k_max` longueurs de stock pour des barres
+    d'occupations données [(occupation, nombre)], chaque barre prenant la plus
+    petite longueur retenue qui la contient. Programmation dynamique sur les
+    longueurs triées, O(m² k) : dp[k][j] = coût minimal des barres admissibles
+    jusqu'à s_j avec k longueurs dont s_j est la plus grande.
+    """
+    stocks = elaguer_stocks(longueurs_barres, couts)
+    m = len(stocks)
+    if k_max <= 0 or m <= k_max:
+        return stocks
+    comptes = [0] * m
+    for occ, nb in occupations:
+        comptes[min(bisect_left(stocks, occ), m - 1)] += nb
+    cumul = [0]
+    for c in comptes:
+        cumul.append(cumul[-1] + c)
+    if cumul[-1] == 0:
+        return stocks[-1:]
+    haut = max(j for j in range(m) if comptes[j])
+
+    INF = float('inf')
+    prix = [cout_stock(L, couts) for L in stocks]
+    dp = [[prix[j] * cumul[j + 1] for j in range(m)]]
+    parent = [[-1] * m]
+    for k in range(1, k_max):
+        ligne, par = [INF] * m, [-1] * m
+        for j in range(m):
+            for i in range(j):
+                v = dp[k - 1][i] + prix[j] * (cumul[j + 1] - cumul[i + 1])
+                if v < ligne[j]:
+                    ligne[j], par[j] = v, i
+        dp.append(ligne); parent.append(par)
+    k, j = min(((k, j) for k in range(k_max) for j in range(haut, m)), key=lambda kj: (dp[kj[0]][kj[1]], kj[0]))
+    retenues = []
+    while j >= 0:
+        retenues.append(stocks[j]); j = parent[k][j]; k -= 1
+    return sorted(retenues)
+
+def _occupations_plan(longueurs, plan, marge_coupe):
+    return [(longueur_occupee([longueurs[i] for i in b], marge_coupe), 1) for b in plan]
+
+def _cout_consolide(occupations, longueurs_barres, k_max, couts=None) -> float:
+    retenues = consolider_longueurs(occupations, longueurs_barres, k_max, couts)
+    return sum(nb * cout_stock(longueur_stock(occ, retenues), couts) for occ, nb in occupations)
+
+# =========================================================
+# Disponibilités limitées par longueur
+# =========================================================
+
+def _attribuer_longueurs(sections: dict, plans: dict, stocks: List[float], marge_coupe: float, disponibles: dict,
+                         couts: dict = None):
+    """
+    Barres par occupation décroissante : longueur disponible la moins chère qui
+    les contient, sinon plus petite longueur qui les contient, comptée en manque.
+    Retourne {clé: ([longueur par barre], {longueur: manque})}.
+    """
+    restant = {L: disponibles.get(L, float('inf')) for L in stocks}
+    barres = sorted(((longueur_occupee([sections[cle][0][i] for i in b], marge_coupe), cle, k)
+                     for cle, plan in plans.items() for k, b in enumerate(plan)), key=lambda t: t[0], reverse=True)
+    resultat = {cle: ([0.0] * len(plan), {}) for cle, plan in plans.items()}
+    for o, cle, k in barres:
+        debut = bisect_left(stocks, min(o, stocks[-1]))
+        L = min((L for L in stocks[debut:] if restant[L] > 0), key=lambda L: cout_stock(L, couts), default=None)
+        if L is None:
+            L = stocks[debut]
+            resultat[cle][1][L] = resultat[cle][1].get(L, 0) + 1
+        else:
+            restant[L] -= 1
+        resultat[cle][0][k] = L
+    return resultat
+
+def _best_fit_borne(sections: dict, stocks: List[float], marge_coupe: float, disponibles: dict) -> dict:
+    """
+    Best Fit Decreasing commun à des sections partageant un stock limité :
+    pièces de toutes les sections par longueur décroissante, chacune dans la
+    barre ouverte de sa section où il reste le moins de place, sinon dans une
+    nouvelle barre de la plus grande longueur encore disponible (à défaut, de la
+    plus petite qui la contient). Les longueurs rares vont ainsi aux grandes pièces.
+    """
+    restant = {L: disponibles.get(L, float('inf')) for L in stocks}
+    ouvertes = {cle: [] for cle in sections}   # [indices, occupation, longueur]
+    pieces = sorted(((L, cle, i) for cle, (longueurs, _) in sections.items() for i, L in enumerate(longueurs)),
+                    key=lambda t: t[0], reverse=True)
+    for p, cle, i in pieces:
+        best, reste_min = None, None
+        for barre in ouvertes[cle]:
+            reste = barre[2] - (barre[1] + marge_coupe + p)
+            if reste >= 0 and (reste_min is None or reste < reste_min):
+                best, reste_min = barre, reste
+        if best is not None:
+            best[0].append(i); best[1] += marge_coupe + p
+            continue
+        disponibles_p = [L for L in stocks if restant[L] > 0 and L >= p]
+        L = disponibles_p[-1] if disponibles_p else longueur_stock(p, stocks)
+        if disponibles_p:
+            restant[L] -= 1
+        ouvertes[cle].append([[i], p, L])
+    return {cle: [b[0] for b in barres] for cle, barres in ouvertes.items()}
+
+def respecter_disponibilites(sections: dict, longueurs_barres: Sequence[float], marge_coupe: float, disponibles: dict,
+                             couts: dict = None) -> dict:
+    """
+    Longueurs commandées pour des sections partageant un stock limité
+    `disponibles` {longueur: nombre} (longueur absente = illimitée).
+    Les plans fournis sont conservés s'ils tiennent dans le stock ; sinon les
+    sections sont redécoupées ensemble (`_best_fit_borne`) et le plan de plus
+    faible manque (en mm) est retenu. `couts` départage les longueurs
+    disponibles (stock fixe moins cher que le sur mesure en mode mixte).
+    `sections` = {clé: (longueurs, plan)} ; retourne {clé: (plan, [longueur par barre], {longueur: manque})}.
+    """
+    stocks = sorted(set(longueurs_barres))
+    plans = {cle: [list(b) for b in plan] for cle, (_, plan) in sections.items()}
+    attribution = _attribuer_longueurs(sections, plans, stocks, marge_coupe, disponibles, couts)
+    manque = sum(L * n for _, m in attribution.values() for L, n in m.items())
+    if manque:
+        replan = _best_fit_borne(sections, stocks, marge_coupe, disponibles)
+        attribution_replan = _attribuer_longueurs(sections, replan, stocks, marge_coupe, disponibles, couts)
+        if sum(L * n for _, m in attribution_replan.values() for L, n in m.items()) < manque:
+            plans, attribution = replan, attribution_replan
+    return {cle: (plans[cle], attribution[cle][0], attribution[cle][1]) for cle in sections}
+
+# =========================================================
+# Refente (petites sections débitées dans une plus grande)
+# =========================================================
+
+def nb_refente(source: Tuple[float, float], cible: Tuple[float, float], marge_coupe: float = 0.0) -> int:
+    """
+    Sections `cible` (largeur, hauteur) tirées d'une section `source`, un trait
+    `marge_coupe` entre deux pièces sur chaque cote, meilleure orientation :
+    120x100 donne 2 x 60x100 sans trait, 1 seule avec un trait de 4 mm.
+    """
+    (L, H), (l, h) = source, cible
+
+    def n(cote, piece):
+        return int((cote + marge_coupe) / (piece + marge_coupe) + 1e-9)
+
+    return max(n(L, l) * n(H, h), n(L, h) * n(H, l))
+
+def composer_refente(longueurs: Sequence[float], k: int) -> List[Tuple[float, List[int]]]:
+    """
+    Débits de refente : pièces triées par longueur décroissante, groupées k par
+    k côte à côte ; un débit a la longueur de sa plus grande pièce (le groupage
+    consécutif minimise la longueur totale des débits).
+    Retourne [(longueur du débit, [indices])].
+    """
+    ordre = sorted(range(len(longueurs)), key=lambda i: longueurs[i], reverse=True)
+    return [(longueurs[ordre[j]], ordre[j:j + k]) for j in range(0, len(ordre), k)]
+
+# =========================================================
+# Chutes en stock
+# =========================================================
+
+def affecter_chutes(longueurs: Sequence[float], chutes: Sequence[float], marge_coupe: float) -> List[Tuple[int, List[int]]]:
+    """
+    Place des pièces dans des chutes en stock avant toute barre neuve : les
+    chutes sont prises de la plus courte à la plus longue et chacune est
+    remplie au mieux (sac à dos sur les lignes de demande restantes).
+    Retourne [(n° de chute, [indices des pièces])] ; les pièces non placées
+    restent pour les barres neuves.
+    """
+    lignes = lignes_demande(longueurs)
+    poids = [L + marge_coupe for L, _ in lignes]
+    reste = [n for _, n in lignes]
+    disponibles = {}
+    for i in range(len(longueurs) - 1, -1, -1):
+        disponibles.setdefault(longueurs[i], []).append(i)
+    affectations = []
+    for k in sorted(range(len(chutes)), key=lambda k: chutes[k]):
+        restantes = [lignes[j][0] for j in range(len(lignes)) if reste[j]]
+        if not restantes:
+            break
+        if chutes[k] < restantes[-1]:
+            continue
+        val, a = remplissage_exact(poids, reste, chutes[k] + marge_coupe)
+        if val <= 0:
+            continue
+        affectations.append((k, [disponibles[lignes[j][0]].pop() for j in range(len(a)) for _ in range(a[j])]))
+        for j in range(len(a)):
+            reste[j] -= a[j]
+    return affectations
+
+# =========================================================
+# Registre des algorithmes et sélection automatique
+# =========================================================
+
+ALGORITHMES = {
+    'premier': ("First Fit Decreasing",
+                lambda L, stocks, m, t, arret, couts: first_fit_decreasing(L, stocks, m)),
+    'glouton': ("Best Fit Decreasing + remplissage exact",
+                lambda L, stocks, m, t, arret, couts: best_fit_rempli(L, stocks, m, couts)),
+    'exact': ("Génération de colonnes",
+              lambda L, stocks, m, t, arret, couts: generation_colonnes(L, stocks, m, temps_max=t, couts=couts, arret=arret)),
+    'metaheuristique': ("Ruine & reconstruction",
+                        lambda L, stocks, m, t, arret, couts: ruine_reconstruction(L, stocks, m, budget_temps=t, arret=arret,
+                                                                                   couts=couts)),
+}
+
+def budget_cible(nb_elements: int) -> float:
+    """Durée totale visée (s) selon les objectifs de performance : <500 → 30 s, <=2000 → 2 min, au-delà 5 min."""
+    return 30.0 if nb_elements < 500 else 120.0 if nb_elements <= 2000 else 300.0
+
+def choisir_algorithme(nb_pieces: int, nb_distinctes: int, nb_stocks: int, budget: float) -> str:
+    """
+    Choix 'auto' pour une section : la génération de colonnes (tarification par
+    sac à dos, coût ~ longueurs distinctes² × stocks) si elle tient dans le
+    budget, sinon ruine & reconstruction si le budget le permet, sinon glouton.
+    """
+    if nb_pieces <= 2 or budget < 0.05:
+        return 'glouton'
+    if nb_distinctes ** 2 * nb_stocks <= 5e4 * budget:
+        return 'exact'
+    return 'metaheuristique' if budget >= 0.5 else 'glouton'
+
+def resoudre_section(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                     algorithme: str = 'glouton', temps_max: float = 10.0, arret=None,
+                     plan_initial: Sequence[Sequence[int]] = None, max_longueurs: int = 0,
+                     couts: dict = None, reduction_motifs: bool = False) -> List[List[int]]:
+    """
+    Plan de découpe d'une section selon l'algorithme configuré (clé de ALGORITHMES, ou 'auto').
+    Avec un tarif `couts` {longueur de stock: coût}, l'objectif est le coût
+    d'achat total (longueurs dominées écartées) ; sinon la longueur commandée.
+    Avec `plan_initial` (démarrage à chaud), le plan antérieur est réparé puis
+    amélioré par ruine et reconstruction dans `temps_max` ; il n'est modifié
+    que si le coût baisse strictement.
+    Avec `max_longueurs` = K, le plan libre fixe le meilleur jeu de K longueurs
+    (`consolider_longueurs`), la section est replanifiée sur ce jeu et le moins
+    coûteux des deux plans, une fois consolidés, est retenu.
+    Avec `reduction_motifs`, le nombre de motifs distincts est ensuite réduit
+    à coût et nombre de barres égaux ou moindres (`reduire_motifs`), dans le
+    temps restant ; au démarrage à chaud, le plan n'est réduit que s'il compte
+    plus de motifs que le plan antérieur.
+    """
+    if reduction_motifs:
+        import time
+        debut = time.time()
+        plan = resoudre_section(longueurs, longueurs_barres, marge_coupe, algorithme, temps_max, arret, plan_initial,
+                                max_longueurs, couts)
+        motifs = motifs_depuis_plan(longueurs, plan)
+        if _objectif_motifs_atteint(longueurs, motifs, plan_initial):
+            return plan
+        return developper_motifs(longueurs, _motifs_reduits(longueurs, motifs, longueurs_barres, marge_coupe, max_longueurs,
+                                                            couts, _temps_reduction(debut, temps_max), arret))
+    if max_longueurs and len(set(longueurs_barres)) > max_longueurs:
+        libre = resoudre_section(longueurs, longueurs_barres, marge_coupe, algorithme, temps_max / 2, arret, plan_initial,
+                                 couts=couts)
+        retenues = consolider_longueurs(_occupations_plan(longueurs, libre, marge_coupe), longueurs_barres, max_longueurs, couts)
+        replan = resoudre_section(longueurs, retenues, marge_coupe, algorithme, temps_max / 2, arret, couts=couts)
+        return min((libre, replan), key=lambda p: _cout_consolide(_occupations_plan(longueurs, p, marge_coupe),
+                                                                  longueurs_barres, max_longueurs, couts))
+    stocks = elaguer_stocks(longueurs_barres, couts)
+    if plan_initial is not None:
+        depart = reparer_plan(longueurs, stocks, marge_coupe, plan_initial, couts)
+        return ruine_reconstruction(longueurs, stocks, marge_coupe, plan_initial=depart,
+                                    budget_temps=temps_max, arret=arret, couts=couts)
+    if algorithme == 'auto':
+        algorithme = choisir_algorithme(len(longueurs), len(set(longueurs)), len(stocks), temps_max)
+    _, resoudre = ALGORITHMES.get(algorithme, ALGORITHMES['glouton'])
+    return resoudre(longueurs, stocks, marge_coupe, temps_max, arret, couts)
+
+def resoudre_section_motifs(longueurs: Sequence[float], longueurs_barres: Sequence[float], marge_coupe: float,
+                            algorithme: str = 'glouton', temps_max: float = 10.0, arret=None,
+                            plan_initial: Sequence[Sequence[int]] = None, max_longueurs: int = 0,
+                            couts: dict = None, reduction_motifs: bool = False) -> List[Motif]:
+    """Comme `resoudre_section`, en représentation compressée (motifs × multiplicités)."""
+    import time
+    if reduction_motifs:
+        debut = time.time()
+        motifs = resoudre_section_motifs(longueurs, longueurs_barres, marge_coupe, algorithme, temps_max, arret, plan_initial,
+                                         max_longueurs, couts)
+        if _objectif_motifs_atteint(longueurs, motifs, plan_initial):
+            return motifs
+        return _motifs_reduits(longueurs, motifs, longueurs_barres, marge_coupe, max_longueurs, couts,
+                               _temps_reduction(debut, temps_max), arret)
+    if max_longueurs and len(set(longueurs_barres)) > max_longueurs:
+        def occupations(motifs):
+            return [(occupation_motif(c, marge_coupe), mult) for c, mult in motifs]
+        libre = resoudre_section_motifs(longueurs, longueurs_barres, marge_coupe, algorithme, temps_max / 2, arret, plan_initial,
+                                        couts=couts)
+        retenues = consolider_longueurs(occupations(libre), longueurs_barres, max_longueurs, couts)
+        replan = resoudre_section_motifs(longueurs, retenues, marge_coupe, algorithme, temps_max / 2, arret, couts=couts)
+        return min((libre, replan), key=lambda p: _cout_consolide(occupations(p), longueurs_barres, max_longueurs, couts))
+    if plan_initial is not None:
+        return motifs_depuis_plan(longueurs, resoudre_section(longueurs, longueurs_barres, marge_coupe, temps_max=temps_max,
+                                                              arret=arret, plan_initial=plan_initial, couts=couts))
+    stocks = elaguer_stocks(longueurs_barres, couts)
+    lignes = lignes_demande(longueurs)
+    motifs = heuristique_sequentielle(lignes, stocks, marge_coupe, couts)
+    if cout_motifs(motifs, stocks, marge_coupe, couts) <= borne_inferieure(longueurs, stocks, marge_coupe, couts) + 1e-6:
+        return motifs  # déjà optimal : inutile de lancer un mode coûteux
+    if algorithme == 'auto':
+        algorithme = choisir_algorithme(len(longueurs), len(lignes), len(stocks), temps_max)
+    if algorithme == 'exact':
+        exacts = _generation_colonnes_motifs(lignes, stocks, marge_coupe, time.time() + temps_max, 3, couts, arret)
+        if cout_motifs(exacts, stocks, marge_coupe, couts) < cout_motifs(motifs, stocks, marge_coupe, couts):
+            motifs = exacts
+    elif algorithme == 'metaheuristique':
+        # recherche locale sur pièces : le plan séquentiel sert de point de départ
+        plan = ruine_reconstruction(longueurs, stocks, marge_coupe, plan_initial=developper_motifs(longueurs, motifs),
+                                    budget_temps=temps_max, arret=arret, couts=couts)
+        motifs = motifs_depuis_plan(longueurs, plan)
+    return motifs
+
+def _motifs_reduits(longueurs, motifs, longueurs_barres, marge_coupe, max_longueurs, couts, temps_max, arret):
+    # coût évalué comme celui retenu à la commande : après consolidation à K longueurs s'il y a lieu
+    evaluer = None
+    if max_longueurs and len(set(longueurs_barres)) > max_longueurs:
+        evaluer = lambda m: _cout_consolide([(occupation_motif(c, marge_coupe), mult) for c, mult in m],
+                                            longueurs_barres, max_longueurs, couts)
+    return reduire_motifs(longueurs, motifs, longueurs_barres, marge_coupe, couts, evaluer, temps_max, arret)
+
+def _temps_reduction(debut: float, temps_max: float) -> float:
+    # reste du budget de la section, au moins un quart (la métaheuristique consomme tout son budget)
+    import time
+    return max(temps_max - (time.time() - debut), temps_max / 4)
+
+def _objectif_motifs_atteint(longueurs, motifs, plan_initial) -> bool:
+    # démarrage à chaud : pas plus de motifs que le plan antérieur (déjà réduit) -> plan conservé tel quel
+    if plan_initial is None:
+        return False
+    anterieur = [[i for i in b if 0 <= i < len(longueurs)] for b in plan_initial]
+    return len(motifs) <= len(motifs_depuis_plan(longueurs, [b for b in anterieur if b]))
+
+# =========================================================
+# Exécution parallèle des sections
+# =========================================================
+
+class Tache(NamedTuple):
+    """Demande de calcul d'une section, transmissible aux processus de calcul."""
+    longueurs: List[float]
+    stocks: List[float]
+    marge_coupe: float
+    algorithme: str
+    temps_max: float
+    compresse: bool = False
+    plan_initial: List[List[int]] = None
+    max_longueurs: int = 0
+    couts: dict = None
+    reduction_motifs: bool = False
+    budget: float = 0.0  # budget configuré du matériau (s), dont `temps_max` est la part de la section
+
+_arret_worker = None
+
+def _initialiser_worker(evenement):
+    global _arret_worker
+    _arret_worker = evenement
+
+def _resoudre(tache, arret=None):
+    import time
+    resoudre = resoudre_section_motifs if tache.compresse else resoudre_section
+    debut = time.time()
+    plan = resoudre(tache.longueurs, tache.stocks, tache.marge_coupe, algorithme=tache.algorithme, temps_max=tache.temps_max,
+                    arret=arret, plan_initial=tache.plan_initial, max_longueurs=tache.max_longueurs, couts=tache.couts,
+                    reduction_motifs=tache.reduction_motifs)
+    return plan, time.time() - debut
+
+def _resoudre_tache(tache):
+    return _resoudre(tache, _arret_worker.is_set if _arret_worker is not None else None)
+
+def _estimation_duree(tache) -> float:
+    # FFD / BFD : quelques ms, sans rapport avec le budget ; les autres modes le consomment
+    return ((tache.temps_max if tache.algorithme not in ('premier', 'glouton') or tache.plan_initial is not None else 0.0)
+            + 1e-5 * len(tache.longueurs))
+
+def resoudre_sections(taches: dict, parallele: bool = True, max_workers: int = None, arret=None, log=None,
+                      durees: dict = None) -> dict:
+    """
+    Résout un lot de sections indépendantes {clé: Tache} et renvoie {clé: plan}
+    (liste de motifs pour les tâches compressées) ; la durée de calcul de
+    chaque section est reportée dans `durees` si fourni.
+    En mode parallèle, les sections sont soumises à un ProcessPoolExecutor par
+    durée estimée décroissante (plus longue d'abord).
+    `arret()` est sondé pendant l'attente et relayé aux processus ; les sections
+    non démarrées passent alors en glouton. Toute défaillance du pool bascule en série.
+    """
+    import os, sys, multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    log = log or (lambda msg: None)
+    ordre = sorted(taches, key=lambda c: _estimation_duree(taches[c]), reverse=True)
+    resultats = {}
+
+    def separer():
+        if durees is not None:
+            durees.update({c: d for c, (_, d) in resultats.items()})
+        return {c: plan for c, (plan, _) in resultats.items()}
+
+    def en_serie(cles):
+        for c in cles:
+            tache = taches[c]
+            if arret is not None and arret():
+                tache = tache._replace(algorithme='glouton')
+            resultats[c] = _resoudre(tache, arret)
+        return separer()
+
+    nb_workers = min(max_workers or os.cpu_count() or 1, len(ordre))
+    if not parallele or nb_workers < 2 or sum(_estimation_duree(taches[c]) for c in ordre) < 0.5:
+        return en_serie(ordre)
+
+    try:
+        # interpréteur embarqué (ex. cadwork.exe) : les processus fils doivent démarrer un vrai python
+        if not os.path.basename(sys.executable).lower().startswith('python'):
+            candidat = os.path.join(sys.exec_prefix, 'python.exe' if os.name == 'nt' else 'bin/python3')
+            if not os.path.isfile(candidat):
+                raise RuntimeError("interpréteur python introuvable")
+            multiprocessing.set_executable(candidat)
+        evenement = multiprocessing.Event()
+        with ProcessPoolExecutor(max_workers=nb_workers, initializer=_initialiser_worker,
+                                 initargs=(evenement,)) as pool:
+            futures = {pool.submit(_resoudre_tache, taches[c]): c for c in ordre}
+            en_cours = set(futures)
+            while en_cours:
+                finis, en_cours = wait(en_cours, timeout=0.2, return_when=FIRST_COMPLETED)
+                for f in finis:
+                    resultats[futures[f]] = f.result()
+                if arret is not None and not evenement.is_set() and arret():
+                    evenement.set()
+                    for f in list(en_cours):
+                        if f.cancel():
+                            en_cours.discard(f)
+                    restants = [c for c in ordre if c not in resultats and all(futures[f] != c for f in en_cours)]
+                    for c in restants:
+                        resultats[c] = _resoudre(taches[c]._replace(algorithme='glouton'))
+        log(f"{len(ordre)} sections résolues sur {nb_workers} processus")
+        return separer()
+    except Exception as e:
+        log(f"Pool de processus indisponible ({e}) : calcul en série")
+        return en_serie([c for c in ordre if c not in resultats])
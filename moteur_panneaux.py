@@ -0,0 +1,200 @@
+"""
+Moteur d'imbrication 2D (panneaux) — sans dépendance Cadwork.
+
+Les cotes sont en mm. Une pièce est un rectangle (longueur, largeur), un
+format de panneau aussi. Les découpes sont guillotine (chaque trait traverse
+de part en part le rectangle en cours), comme sur une scie à panneaux : les
+rectangles libres d'un panneau sont découpés à chaque pose, jamais recollés.
+
+Un plan est une liste de panneaux (format, [placements]), un placement étant
+(indice de la pièce, x, y, longueur posée, largeur posée, pivotée).
+Le trait de scie est compté sur chaque pièce (longueur + trait, largeur + trait)
+et le format agrandi d'un trait, comme la marge de coupe du moteur 1D.
+"""
+import random
+import time
+from typing import List, Sequence, Tuple
+
+Placement = Tuple[int, float, float, float, float, bool]
+Panneau = Tuple[Tuple[float, float], List[Placement]]
+
+# =========================================================
+# Outils
+# =========================================================
+
+def surface_plan(plan: Sequence[Panneau]) -> float:
+    """Surface de panneaux commandée (mm²)."""
+    return sum(f[0] * f[1] for f, _ in plan)
+
+def taux_remplissage(panneau: Panneau, pieces: Sequence[Tuple[float, float]]) -> float:
+    (L, l), placements = panneau
+    return sum(pieces[i][0] * pieces[i][1] for i, *_ in placements) / (L * l)
+
+def hors_format(pieces: Sequence[Tuple[float, float]], formats: Sequence[Tuple[float, float]], rotation: bool = True) -> List[int]:
+    """Pièces qui ne tiennent dans aucun format (dans aucune orientation permise), cotes ramenées comme dans `imbriquer`."""
+    pieces = [(max(p), min(p)) for p in pieces]
+    formats = [(max(f), min(f)) for f in formats]
+    def tient(p, f):
+        return (p[0] <= f[0] and p[1] <= f[1]) or (rotation and p[1] <= f[0] and p[0] <= f[1])
+    return [i for i, p in enumerate(pieces) if not any(tient(p, f) for f in formats)]
+
+# =========================================================
+# Étagères (niveaux guillotine)
+# =========================================================
+
+def etageres(pieces: Sequence[Tuple[float, float]], format_panneau: Tuple[float, float], trait: float,
+             rotation: bool = True) -> List[Panneau]:
+    """
+    First Fit Decreasing Height : pièces couchées (grand côté en longueur si la
+    rotation est permise), par largeur décroissante, posées sur la première
+    étagère de panneau où elles tiennent ; sinon nouvelle étagère, sinon nouveau panneau.
+    Les étagères sont des bandes guillotine.
+    """
+    L, l = format_panneau[0] + trait, format_panneau[1] + trait
+    couchees = []
+    for i, (a, b) in enumerate(pieces):
+        # couchée (grand côté en longueur) si possible, sinon l'orientation qui tient
+        orientations = [(a, b, False)] + ([(b, a, True)] if rotation else [])
+        tiennent = [o for o in orientations if o[0] + trait <= L and o[1] + trait <= l]
+        if not tiennent:
+            continue  # hors format : signalé par `hors_format`
+        w, h, piv = min(tiennent, key=lambda o: o[1])
+        couchees.append((i, w + trait, h + trait, piv))
+    couchees.sort(key=lambda c: (c[2], c[1]), reverse=True)
+    panneaux = []  # [placements, [[y, hauteur, x libre]], y libre]
+    for i, w, h, piv in couchees:
+        if w > L or h > l:
+            continue
+        for pan in panneaux:
+            etagere = next((e for e in pan[1] if h <= e[1] and e[2] + w <= L), None)
+            if etagere is None and pan[2] + h <= l:
+                etagere = [pan[2], h, 0.0]; pan[1].append(etagere); pan[2] += h
+            if etagere is not None:
+                break
+        else:
+            pan = [[], [], h]; etagere = [0.0, h, 0.0]; pan[1].append(etagere); panneaux.append(pan)
+        pan[0].append((i, etagere[2], etagere[0], w - trait, h - trait, piv))
+        etagere[2] += w
+    return [(tuple(format_panneau), placements) for placements, _, _ in panneaux]
+
+# =========================================================
+# Rectangles libres guillotine (meilleur ajustement en surface)
+# =========================================================
+
+def _poser(pieces, ordre, format_panneau, trait, rotation, panneaux=None):
+    """
+    Pose des pièces dans l'ordre donné : rectangle libre de plus petite
+    surface qui les contient, parmi tous les panneaux ouverts (à égalité, plus
+    petit reste sur le petit côté), sinon nouveau panneau. Le rectangle choisi est
+    coupé selon l'axe du plus petit reste (Shorter Leftover Axis).
+    `panneaux` = [[placements, libres]] existants, complétés en place et retournés.
+    """
+    L, l = format_panneau[0] + trait, format_panneau[1] + trait
+    panneaux = panneaux if panneaux is not None else []
+    for i in ordre:
+        a, b = pieces[i][0] + trait, pieces[i][1] + trait
+        orientations = [(a, b, False)] + ([(b, a, True)] if rotation and a != b else [])
+        meilleur = None
+        for p, (_, libres) in enumerate(panneaux):
+            for r, (x, y, w, h) in enumerate(libres):
+                for pw, ph, piv in orientations:
+                    if pw <= w and ph <= h:
+                        score = (w * h - pw * ph, min(w - pw, h - ph))
+                        if meilleur is None or score < meilleur[0]:
+                            meilleur = (score, p, r, pw, ph, piv)
+        if meilleur is None:
+            pw, ph, piv = next(((pw, ph, piv) for pw, ph, piv in orientations if pw <= L and ph <= l), (None, None, None))
+            if pw is None:
+                continue  # hors format : signalé par `hors_format`
+            panneaux.append([[], [(0.0, 0.0, L, l)]])
+            meilleur = (None, len(panneaux) - 1, 0, pw, ph, piv)
+        _, p, r, pw, ph, piv = meilleur
+        placements, libres = panneaux[p]
+        x, y, w, h = libres.pop(r)
+        placements.append((i, x, y, pw - trait, ph - trait, piv))
+        if w - pw < h - ph:   # reste court à droite : coupe horizontale pleine longueur
+            restes = [(x + pw, y, w - pw, ph), (x, y + ph, w, h - ph)]
+        else:                 # coupe verticale pleine largeur
+            restes = [(x + pw, y, w - pw, h), (x, y + ph, pw, h - ph)]
+        libres.extend(rr for rr in restes if rr[2] > trait and rr[3] > trait)
+    return panneaux
+
+def guillotine(pieces: Sequence[Tuple[float, float]], format_panneau: Tuple[float, float], trait: float,
+               rotation: bool = True, ordre: Sequence[int] = None) -> List[Panneau]:
+    """Imbrication guillotine par rectangles libres ; ordre par défaut : surface décroissante."""
+    if ordre is None:
+        ordre = sorted(range(len(pieces)), key=lambda i: pieces[i][0] * pieces[i][1], reverse=True)
+    return [(tuple(format_panneau), placements) for placements, _ in _poser(pieces, ordre, format_panneau, trait, rotation)]
+
+# =========================================================
+# Amélioration et choix du format
+# =========================================================
+
+def _evaluer(panneaux, pieces, format_panneau):
+    # nombre de panneaux, puis remplissage concentré (les derniers panneaux se vident)
+    S = format_panneau[0] * format_panneau[1]
+    return len(panneaux), -sum((sum(pieces[i][0] * pieces[i][1] for i, *_ in pl) / S) ** 2 for pl, _ in panneaux)
+
+def ameliorer(pieces: Sequence[Tuple[float, float]], format_panneau: Tuple[float, float], trait: float,
+              rotation: bool = True, budget_temps: float = 1.0, graine: int = 0) -> List[Panneau]:
+    """
+    Départ : meilleur des ordres usuels (surface, grand côté, périmètre) et des
+    étagères. Puis ruine et reconstruction : quelques panneaux tirés au hasard
+    (pondéré par leur vide) sont vidés, leurs pièces reposées dans les
+    rectangles libres des autres puis dans de nouveaux panneaux ; accepté si
+    le nombre de panneaux ne croît pas. S'arrête à l'échéance de `budget_temps`
+    ou quand la borne en surface est atteinte.
+    """
+    cles = (lambda i: pieces[i][0] * pieces[i][1], lambda i: max(pieces[i]), lambda i: pieces[i][0] + pieces[i][1])
+    departs = [_poser(pieces, sorted(range(len(pieces)), key=c, reverse=True), format_panneau, trait, rotation) for c in cles]
+    courant = min(departs, key=lambda p: _evaluer(p, pieces, format_panneau))
+    plan_etageres = etageres(pieces, format_panneau, trait, rotation)
+    posees = lambda plan: sum(len(pl) for _, pl in plan)
+    if len(plan_etageres) < len(courant) and posees(plan_etageres) >= sum(len(pl) for pl, _ in courant):
+        return plan_etageres
+    S = format_panneau[0] * format_panneau[1]
+    borne = -(-sum(pieces[i][0] * pieces[i][1] for pl, _ in courant for i, *_ in pl) // S)
+    rnd = random.Random(graine)
+    limite = time.time() + budget_temps
+    f_courant = _evaluer(courant, pieces, format_panneau)
+    while len(courant) > max(1, borne) and time.time() < limite:
+        vides = [1.0 + S - sum(pieces[i][0] * pieces[i][1] for i, *_ in pl) for pl, _ in courant]
+        choisis = set(rnd.choices(range(len(courant)), weights=vides, k=min(len(courant), rnd.randint(2, 4))))
+        gardes = [[list(pl), list(lib)] for k, (pl, lib) in enumerate(courant) if k not in choisis]
+        a_poser = [i for k in choisis for i, *_ in courant[k][0]]
+        a_poser.sort(key=lambda i: pieces[i][0] * pieces[i][1] * (1.0 + 0.2 * rnd.random()), reverse=True)
+        nouveau = _poser(pieces, a_poser, format_panneau, trait, rotation, gardes)
+        f_nouveau = _evaluer(nouveau, pieces, format_panneau)
+        if f_nouveau <= f_courant:
+            courant, f_courant = nouveau, f_nouveau
+    return [(tuple(format_panneau), placements) for placements, _ in courant]
+
+def imbriquer(pieces: Sequence[Tuple[float, float]], formats: Sequence[Tuple[float, float]], trait: float,
+              rotation: bool = True, budget_temps: float = 2.0) -> List[Panneau]:
+    """
+    Plan d'imbrication : chaque format est essayé seul (`ameliorer`, budget
+    partagé), celui de plus petite surface commandée est retenu ; le panneau le
+    moins rempli passe ensuite au plus petit format qui contient ses pièces.
+    Formats et pièces sont ramenés à (grand côté, petit côté) ; `pivotée` reste
+    relative à la pièce telle que fournie.
+    Les pièces hors format (`hors_format`) ne sont pas placées.
+    """
+    if not pieces:
+        return []
+    retournees = [p[1] > p[0] for p in pieces]
+    pieces = [(max(p), min(p)) for p in pieces]
+    formats = sorted({(max(f), min(f)) for f in formats}, key=lambda f: f[0] * f[1])
+    candidats = [ameliorer(pieces, f, trait, rotation, budget_temps / len(formats)) for f in formats]
+    plan = min(candidats, key=lambda p: (-sum(len(pl) for _, pl in p), surface_plan(p)))  # toutes les pièces posées d'abord
+    if len(formats) > 1 and plan:
+        k = min(range(len(plan)), key=lambda k: taux_remplissage(plan[k], pieces))
+        indices = [i for i, *_ in plan[k][1]]
+        sous_pieces = [pieces[i] for i in indices]
+        for f in formats:
+            if f[0] * f[1] >= plan[k][0][0] * plan[k][0][1]:
+                break
+            essai = guillotine(sous_pieces, f, trait, rotation)
+            if len(essai) == 1 and len(essai[0][1]) == len(indices):
+                plan[k] = (f, [(indices[j], x, y, w, h, piv) for j, x, y, w, h, piv in essai[0][1]])
+                break
+    return [(f, [(i, x, y, w, h, piv != retournees[i]) for i, x, y, w, h, piv in pl]) for f, pl in plan]
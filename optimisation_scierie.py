@@ -1,5 +1,5 @@
 
-import sys, os
+import sys, os, time, math
 sys.path.append(r"C:\cadwork\libs")
 from typing import Any, Tuple, List, Dict
 from datetime import datetime
@@ -24,6 +24,15 @@ from openpyxl.utils import get_column_letter
 import subprocess
 import json
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import moteur_decoupe as md
+import moteur_panneaux as mp
+from cache_plans import CachePlans
+from stock_chutes import StockChutes
+import instantane_elements as ie
+from catalogue_materiaux import CatalogueMateriaux, signature_projet
+import cache_elements
+
 # =========================================================
 # Utils
 # =========================================================
@@ -31,15 +40,7 @@ import json
 MARGE_COUPE_DEFAULT = 80
 
 def safe_float(val, default=0.0):
-    if val is None:
-        return default
-    if isinstance(val, (int, float)):
-        return float(val)
-    try:
-        s = str(val).strip().replace('\\u00A0','').replace(' ','').replace(',','.')
-        return float(s) if s else default
-    except Exception:
-        return default
+    return ie.nombre(val, default)  # règle commune aux scripts
 
 def log_message(message, level="INFO"):
     timestamp = datetime.now().strftime("%H:%M:%S")
@@ -71,20 +72,26 @@ def _get_list_width(eid: int) -> float:
 def _get_list_height(eid: int) -> float:
     return safe_float(gc.get_list_height(eid))
 
-def _two_largest_face_dims_mm(eid: int) -> Tuple[float,float,float]:
-    L = _get_list_length(eid)
-    W = _get_list_width(eid)
-    H = _get_list_height(eid)
-    dims = sorted([L,W,H], reverse=True)
-    return dims[0], dims[1], dims[2]  # (a_mm, b_mm, ep_mm)
+# matériaux résolus une fois par exécution (et conservés entre exécutions du projet)
+_catalogue = None
+
+def catalogue() -> CatalogueMateriaux:
+    global _catalogue
+    if _catalogue is None:
+        _catalogue = CatalogueMateriaux(mc, uc.get_project_number(), signature_projet(uc))
+    return _catalogue
+
+def prix_materiau(material_name: str) -> float:
+    try:
+        return catalogue().prix(material_name)
+    except Exception:
+        return 0.0
 
 # heuristique d’unité
 def get_material_unit(material_name: str) -> str:
     try:
-        mat_id = mc.get_material_id(material_name)
-        if hasattr(mc, 'get_unit'):
-            u = mc.get_unit(mat_id)
-            if u: return u.lower()
+        u = catalogue().unite(material_name)
+        if u: return u.lower()
     except Exception:
         pass
 
@@ -106,53 +113,94 @@ def calculate_quantity_by_unit(largeur_mm, hauteur_mm, longueur_mm, unit):
 # Calcul non optimisé
 # =========================================================
 
-def calculate_quantity_with_cadwork_method(eid, unit, method):
+def calculate_quantity_with_cadwork_method(eid, unit, method, mesures=None):
     """
     Non optimisé.
     m² : BRUT (2 plus grandes cotes) -> m²  [méthodes surface ignorées]
     m³ : respecte la méthode choisie
     ml : respecte la méthode choisie
+    `mesures` : valeurs déjà lues (instantané, `plan_geometrie`) ; une mesure absente est demandée à l'API.
     """
+    mesures = mesures or {}
+    def lire(nom, appel):
+        v = mesures.get(nom)
+        return safe_float(appel() if v is None else v)
+    L_liste = lambda: lire('longueur_liste', lambda: _get_list_length(eid))
+    W = lambda: lire('largeur', lambda: _get_list_width(eid))
+    H = lambda: lire('hauteur', lambda: _get_list_height(eid))
     try:
         u = (unit or '').lower()
         m = (method or 'manuel').lower()
 
         if u == 'm2':
-            a_mm, b_mm, _ = _two_largest_face_dims_mm(eid)
-            m2 = _mm2_to_m2(a_mm * b_mm)
+            dims = sorted([L_liste(), W(), H()], reverse=True)
+            m2 = _mm2_to_m2(dims[0] * dims[1])
             if m2 <= 0 and hasattr(gc, 'get_area_of_front_face'):
-                return _mm2_to_m2(gc.get_area_of_front_face(eid))
+                return _mm2_to_m2(lire('surface_face_avant', lambda: gc.get_area_of_front_face(eid)))
             return m2
 
         if u == 'm3':
             if m == 'volume_physique_reel' and hasattr(gc, 'get_actual_physical_volume'):
-                return _mm3_to_m3(gc.get_actual_physical_volume(eid))
+                return _mm3_to_m3(lire('volume_physique', lambda: gc.get_actual_physical_volume(eid)))
             if m == 'volume_standard' and hasattr(gc, 'get_volume'):
-                return _mm3_to_m3(gc.get_volume(eid))
+                return _mm3_to_m3(lire('volume', lambda: gc.get_volume(eid)))
             if m == 'volume_liste' and hasattr(gc, 'get_list_volume'):
-                return _mm3_to_m3(gc.get_list_volume(eid))
+                return _mm3_to_m3(lire('volume_liste', lambda: gc.get_list_volume(eid)))
             # Fallback manuel (enveloppe L×W×H)
-            L = _get_list_length(eid); W = _get_list_width(eid); H = _get_list_height(eid)
-            return _mm3_to_m3(L*W*H)
+            return _mm3_to_m3(L_liste()*W()*H())
 
         if u == 'ml':
             # Respect de la méthode
             if m == 'longueur_liste' and hasattr(gc, 'get_list_length'):
-                return _mm_to_m(gc.get_list_length(eid))
+                return _mm_to_m(lire('longueur_liste', lambda: gc.get_list_length(eid)))
             if m == 'longueur_avec_depassement' and hasattr(gc, 'get_length'):
-                return _mm_to_m(gc.get_length(eid))
+                return _mm_to_m(lire('longueur', lambda: gc.get_length(eid)))
             # Fallback "manuel" : on privilégie la longueur physique quand dispo
             if hasattr(gc, 'get_length'):
-                return _mm_to_m(gc.get_length(eid))
-            return _mm_to_m(_get_list_length(eid))
+                return _mm_to_m(lire('longueur', lambda: gc.get_length(eid)))
+            return _mm_to_m(L_liste())
 
         # fallback
-        return calculate_quantity_by_unit(_get_list_width(eid), _get_list_height(eid), _get_list_length(eid), unit)
+        return calculate_quantity_by_unit(W(), H(), L_liste(), unit)
 
     except Exception as e:
         log_message(f"Erreur calcul non optimisé eid={eid} unit={unit}: {e}", "WARNING")
         return calculate_quantity_by_unit(_get_list_width(eid), _get_list_height(eid), _get_list_length(eid), unit)
 
+def methode_non_optimisee(unite, config=None):
+    if unite == 'm3':
+        return (config.get('methode_m3') if config else None) or 'volume_physique_reel'
+    if unite == 'ml':
+        return (config.get('methode_ml') if config else None) or 'manuel'
+    return 'manuel'  # m² = BRUT imposé
+
+# mesures Cadwork lues par calculate_quantity_with_cadwork_method, hors cotes de l'instantané
+MESURES_METHODE = {('m3', 'volume_physique_reel'): ('volume_physique',), ('m3', 'volume_standard'): ('volume',),
+                   ('m3', 'volume_liste'): ('volume_liste',), ('ml', 'longueur_liste'): ('longueur_liste',)}
+
+def mesures_requises(unite, methode):
+    if (unite, methode) in MESURES_METHODE: return MESURES_METHODE[(unite, methode)]
+    if unite == 'ml': return ()  # longueur physique = instantané
+    return ('longueur_liste',)   # m² brut, m³ manuel : enveloppe de liste
+
+def plan_geometrie(materiaux_configs, elements_data):
+    """
+    Plan des mesures {mesure: [eids]} établi sur la seule configuration, avant
+    toute lecture : les matériaux optimisés n'utilisent que les cotes de
+    l'instantané, les autres la mesure de leur méthode (volume physique
+    uniquement si la méthode le demande).
+    """
+    requises = {}
+    for mat, cfg in materiaux_configs.items():
+        if cfg.get('optimiser', True): continue
+        unite = cfg.get('unite_detectee', 'm3')
+        requises[mat] = mesures_requises(unite, methode_non_optimisee(unite, cfg))
+    plan = defaultdict(list)
+    for e in elements_data:
+        for m in requises.get(e['materiau'], ()):
+            plan[m].append(e['eid'])
+    return plan
+
 def is_materiau_13m(material_name: str) -> bool:
     materiaux_13m = ["KVH", "BMR", "SJ-60*39*200_L", "LVL", "SJ-60*39*240_L",
                      "SJ-60*39*300_L", "SJ-60*39*360_L", "SJ-60*39*400_L",
@@ -175,6 +223,7 @@ class OptimizationConfigUI:
         self.materiaux_detectes: List[str] = []
         self.current_material: str = None
         self.elements_data: List[dict] = []
+        self.instantane = None
 
         self.setup_variables()
         self.create_interface()
@@ -187,13 +236,34 @@ class OptimizationConfigUI:
     def setup_variables(self):
         self.mode_var = tk.StringVar(value="variable")
         self.longueurs_fixes_str = tk.StringVar(value="13000")
+        self.disponibilites_str = tk.StringVar(value="")
         self.priorite_fixe_var = tk.StringVar(value="auto")
         self.longueur_min_var = tk.IntVar(value=2500)
         self.longueur_max_var = tk.IntVar(value=13000)
         self.pas_var = tk.IntVar(value=500)
+        self.majoration_variable_var = tk.DoubleVar(value=15.0)
         self.marge_coupe_var = tk.IntVar(value=MARGE_COUPE_DEFAULT)
         self.valorisation_chute_var = tk.DoubleVar(value=80.0)
         self.taux_chute_mini_var = tk.DoubleVar(value=1.0)
+        self.algorithme_var = tk.StringVar(value="auto")
+        self.budget_temps_var = tk.IntVar(value=10)
+        self.max_longueurs_var = tk.IntVar(value=0)
+        self.paliers_prix_str = tk.StringVar(value="")
+        self.refentes_str = tk.StringVar(value="")
+        self.formats_panneaux_str = tk.StringVar(value="2500x1250")
+        self.trait_panneau_var = tk.IntVar(value=4)
+        self.rotation_panneaux_var = tk.BooleanVar(value=True)
+        self.parallele_var = tk.BooleanVar(value=True)
+        self.compresse_var = tk.BooleanVar(value=False)
+        self.reduction_motifs_var = tk.BooleanVar(value=False)
+        self.export_motifs_var = tk.BooleanVar(value=False)
+        self.cache_var = tk.BooleanVar(value=True)
+        self.chutes_var = tk.BooleanVar(value=False)
+        self.longueur_chute_mini_var = tk.IntVar(value=1000)
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.demarrage_chaud_var = tk.BooleanVar(value=False)
+        self.should_stop = False
+        self._derniere_maj_ui = 0.0
 
         self.optimiser_var = tk.BooleanVar(value=True)
         self.unite_var = tk.StringVar(value="auto")
@@ -227,6 +297,15 @@ class OptimizationConfigUI:
         ttk.Button(left, text="🔄 Reset", command=self.reset_to_default).pack(side=tk.LEFT, padx=3)
         self.run_btn = ttk.Button(left, text="🎯 Lancer optimisation", command=self.run_full_optimization)
         self.run_btn.pack(side=tk.LEFT, padx=10)
+        self.stop_btn = ttk.Button(left, text="⏹️ Arrêter", command=self.demander_arret, state="disabled")
+        self.stop_btn.pack(side=tk.LEFT, padx=3)
+        ttk.Checkbutton(left, text="Calcul parallèle", variable=self.parallele_var).pack(side=tk.LEFT, padx=10)
+        ttk.Checkbutton(left, text="Cache des plans", variable=self.cache_var).pack(side=tk.LEFT, padx=3)
+        ttk.Checkbutton(left, text="Incrémental", variable=self.incremental_var).pack(side=tk.LEFT, padx=3)
+        ttk.Checkbutton(left, text="Démarrage à chaud", variable=self.demarrage_chaud_var).pack(side=tk.LEFT, padx=3)
+        ttk.Checkbutton(left, text="Stock de chutes", variable=self.chutes_var).pack(side=tk.LEFT, padx=3)
+        ttk.Checkbutton(left, text="Export par motifs", variable=self.export_motifs_var).pack(side=tk.LEFT, padx=3)
+        ttk.Button(left, text="🗑️ Vider cache", command=self.vider_cache_plans).pack(side=tk.LEFT, padx=3)
 
         self.update_project_info()
 
@@ -330,6 +409,9 @@ class OptimizationConfigUI:
                         command=self.on_mode_changed).pack(anchor=tk.W, pady=2)
         ttk.Radiobutton(f, text="Longueurs VARIABLES", variable=self.mode_var, value="variable",
                         command=self.on_mode_changed).pack(anchor=tk.W, pady=2)
+        ttk.Radiobutton(f, text="MIXTE (stock fixe + débit sur mesure)", variable=self.mode_var, value="mixte",
+                        command=self.on_mode_changed).pack(anchor=tk.W, pady=2)
+        ttk.Button(f, text="🔎 Balayage des longueurs", command=self.run_balayage).pack(anchor=tk.W, pady=2)
         self.mode_specific = ttk.Frame(f); self.mode_specific.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.update_mode_ui()
 
@@ -341,21 +423,31 @@ class OptimizationConfigUI:
     def update_mode_ui(self):
         for w in self.mode_specific.winfo_children():
             w.destroy()
-        if self.mode_var.get() == 'fixe':
+        mode = self.mode_var.get()
+        if mode in ('fixe', 'mixte'):
             fr = ttk.LabelFrame(self.mode_specific, text="Longueurs fixes", padding=5); fr.pack(fill=tk.BOTH, expand=True)
             r = ttk.Frame(fr); r.pack(fill=tk.X, pady=2)
             ttk.Label(r, text="Longueurs (mm):").pack(side=tk.LEFT)
             ttk.Entry(r, textvariable=self.longueurs_fixes_str, width=32).pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(10,0))
             ttk.Label(fr, text="ex: 4000, 6000, 13000", foreground="gray", font=("Arial",8)).pack(anchor=tk.W)
-            pr = ttk.LabelFrame(fr, text="Priorité", padding=4); pr.pack(fill=tk.X, pady=6)
-            for v,t in (("auto","Auto"),("petit","Petites d'abord"),("grand","Grandes d'abord")):
-                ttk.Radiobutton(pr, text=t, value=v, variable=self.priorite_fixe_var).pack(anchor=tk.W)
-        else:
+            r = ttk.Frame(fr); r.pack(fill=tk.X, pady=2)
+            ttk.Label(r, text="Stock disponible (mm:nb):").pack(side=tk.LEFT)
+            ttk.Entry(r, textvariable=self.disponibilites_str, width=32).pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(10,0))
+            ttk.Label(fr, text="ex: 13000:40, 6000:12 — longueur absente = illimitée", foreground="gray", font=("Arial",8)).pack(anchor=tk.W)
+            if mode == 'fixe':
+                pr = ttk.LabelFrame(fr, text="Priorité", padding=4); pr.pack(fill=tk.X, pady=6)
+                for v,t in (("auto","Auto"),("petit","Petites d'abord"),("grand","Grandes d'abord")):
+                    ttk.Radiobutton(pr, text=t, value=v, variable=self.priorite_fixe_var).pack(anchor=tk.W)
+        if mode in ('variable', 'mixte'):
             fr = ttk.LabelFrame(self.mode_specific, text="Longueurs variables", padding=5); fr.pack(fill=tk.BOTH, expand=True)
             p = ttk.Frame(fr); p.pack(fill=tk.X)
             ttk.Label(p, text="Longueur mini (mm):").grid(row=0,column=0,sticky=tk.W); ttk.Spinbox(p, from_=1000,to=10000, textvariable=self.longueur_min_var, width=10).grid(row=0,column=1,padx=8)
             ttk.Label(p, text="Longueur maxi (mm):").grid(row=1,column=0,sticky=tk.W); ttk.Spinbox(p, from_=5000,to=20000, textvariable=self.longueur_max_var, width=10).grid(row=1,column=1,padx=8)
             ttk.Label(p, text="Pas (mm):").grid(row=2,column=0,sticky=tk.W); ttk.Spinbox(p, from_=100,to=1000, textvariable=self.pas_var, width=10).grid(row=2,column=1,padx=8)
+            if mode == 'mixte':
+                ttk.Label(p, text="Majoration sur mesure (%):").grid(row=3,column=0,sticky=tk.W); ttk.Spinbox(p, from_=0.0,to=100.0, increment=1.0, textvariable=self.majoration_variable_var, width=10).grid(row=3,column=1,padx=8)
+                ttk.Label(fr, text="Le stock fixe est utilisé en priorité à son prix, le débit sur mesure au prix majoré pour le reste",
+                          foreground="gray", font=("Arial",8)).pack(anchor=tk.W)
 
     def create_params_tab(self, notebook):
         f = ttk.Frame(notebook); notebook.add(f, text="Paramètres")
@@ -363,6 +455,22 @@ class OptimizationConfigUI:
         r = ttk.Frame(cut); r.pack(fill=tk.X)
         ttk.Label(r, text="Marge de coupe (mm):").pack(side=tk.LEFT)
         ttk.Spinbox(r, from_=50,to=200, textvariable=self.marge_coupe_var, width=10).pack(side=tk.RIGHT)
+        rk = ttk.Frame(cut); rk.pack(fill=tk.X, pady=2)
+        ttk.Label(rk, text="Longueurs distinctes max / section (0 = libre):").pack(side=tk.LEFT)
+        ttk.Spinbox(rk, from_=0,to=10, textvariable=self.max_longueurs_var, width=10).pack(side=tk.RIGHT)
+        rr = ttk.Frame(cut); rr.pack(fill=tk.X, pady=2)
+        ttk.Label(rr, text="Refentes autorisées (source>débit):").pack(side=tk.LEFT)
+        ttk.Entry(rr, textvariable=self.refentes_str, width=24).pack(side=tk.RIGHT)
+        ttk.Label(cut, text="ex: 120x100>60x100 → pièces 60x100 débitées par 2 (trait de scie compris) dans du 120x100 si le coût matière baisse",
+                  foreground="gray", font=("Arial",8)).pack(anchor=tk.W)
+        pan = ttk.LabelFrame(f, text="Panneaux (matériaux au m²)", padding=5); pan.pack(fill=tk.X, padx=5, pady=5)
+        rp = ttk.Frame(pan); rp.pack(fill=tk.X, pady=2)
+        ttk.Label(rp, text="Formats (Lxl, mm):").pack(side=tk.LEFT)
+        ttk.Entry(rp, textvariable=self.formats_panneaux_str, width=24).pack(side=tk.RIGHT)
+        rq = ttk.Frame(pan); rq.pack(fill=tk.X, pady=2)
+        ttk.Label(rq, text="Trait de scie (mm):").pack(side=tk.LEFT)
+        ttk.Spinbox(rq, from_=0,to=20, textvariable=self.trait_panneau_var, width=10).pack(side=tk.RIGHT)
+        ttk.Checkbutton(pan, text="Rotation des pièces autorisée (sans sens de fil)", variable=self.rotation_panneaux_var).pack(anchor=tk.W, pady=2)
         eco = ttk.LabelFrame(f, text="Paramètres économiques", padding=5); eco.pack(fill=tk.X, padx=5, pady=5)
         r1 = ttk.Frame(eco); r1.pack(fill=tk.X, pady=2)
         ttk.Label(r1, text="Valorisation chute (€/unité):").pack(side=tk.LEFT)
@@ -370,6 +478,26 @@ class OptimizationConfigUI:
         r2 = ttk.Frame(eco); r2.pack(fill=tk.X, pady=2)
         ttk.Label(r2, text="Taux chute mini (%):").pack(side=tk.LEFT)
         ttk.Spinbox(r2, from_=0.0,to=20.0, increment=0.5, textvariable=self.taux_chute_mini_var, width=10).pack(side=tk.RIGHT)
+        r6 = ttk.Frame(eco); r6.pack(fill=tk.X, pady=2)
+        ttk.Label(r6, text="Chute réutilisable mini (mm):").pack(side=tk.LEFT)
+        ttk.Spinbox(r6, from_=0,to=6000, increment=100, textvariable=self.longueur_chute_mini_var, width=10).pack(side=tk.RIGHT)
+        r5 = ttk.Frame(eco); r5.pack(fill=tk.X, pady=2)
+        ttk.Label(r5, text="Majorations par longueur (mm:%):").pack(side=tk.LEFT)
+        ttk.Entry(r5, textvariable=self.paliers_prix_str, width=24).pack(side=tk.RIGHT)
+        ttk.Label(eco, text="ex: 8000:5, 12000:12 → +5 % dès 8 m, +12 % dès 12 m ; la découpe minimise alors le coût d'achat",
+                  foreground="gray", font=("Arial",8)).pack(anchor=tk.W)
+        algo = ttk.LabelFrame(f, text="Algorithme", padding=5); algo.pack(fill=tk.X, padx=5, pady=5)
+        r3 = ttk.Frame(algo); r3.pack(fill=tk.X, pady=2)
+        ttk.Label(r3, text="Algorithme de découpe:").pack(side=tk.LEFT)
+        ttk.Combobox(r3, textvariable=self.algorithme_var, state="readonly", width=12, values=list(md.ALGORITHMES) + ["auto"]).pack(side=tk.RIGHT)
+        r4 = ttk.Frame(algo); r4.pack(fill=tk.X, pady=2)
+        ttk.Label(r4, text="Budget temps (s):").pack(side=tk.LEFT)
+        ttk.Spinbox(r4, from_=1,to=600, textvariable=self.budget_temps_var, width=10).pack(side=tk.RIGHT)
+        ttk.Checkbutton(algo, text="Regrouper les pièces identiques (motifs × quantités)", variable=self.compresse_var).pack(anchor=tk.W, pady=2)
+        ttk.Checkbutton(algo, text="Réduire le nombre de motifs de coupe (à coût et nombre de barres égaux)",
+                        variable=self.reduction_motifs_var).pack(anchor=tk.W, pady=2)
+        aide = " • ".join(f"{cle} = {libelle}" for cle, (libelle, _) in md.ALGORITHMES.items())
+        ttk.Label(algo, text=f"{aide} • auto = choix par section selon la taille et l'objectif de durée (budget ignoré)", foreground="gray", font=("Arial",8), wraplength=520).pack(anchor=tk.W)
 
     def create_preview_tab(self, notebook):
         f = ttk.Frame(notebook); notebook.add(f, text="Aperçu")
@@ -385,18 +513,18 @@ class OptimizationConfigUI:
     def detect_materials(self):
         try:
             element_ids = ec.get_active_identifiable_element_ids()
+            erreurs = []
+            self.instantane = inst = ie.instantane(element_ids, ac, gc, attributs=(12, 13), projet=uc.get_project_number(), erreurs=erreurs)
+            for eid, e in erreurs:
+                log_message(f"Element {eid}: {e}", "WARNING")
             mats, elems = set(), []
-            for eid in element_ids:
-                try:
-                    mat = ac.get_element_material_name(eid).strip()
-                    if not mat: continue
-                    mats.add(mat)
-                    elems.append({'eid':eid, 'materiau':mat,
-                                  'longueur': safe_float(gc.get_length(eid)),
-                                  'largeur': round(_get_list_width(eid)),
-                                  'hauteur': round(_get_list_height(eid))})
-                except Exception as e:
-                    log_message(f"Element {eid}: {e}", "WARNING")
+            for k in range(len(inst)):
+                mat = inst.materiau(k)
+                if not mat: continue
+                mats.add(mat)
+                elems.append({'eid':inst.eids[k], 'materiau':mat,
+                              'longueur': inst.longueur[k], 'largeur': inst.largeur[k], 'hauteur': inst.hauteur[k],
+                              'barre': inst.attribut(12, k), 'taux_chute': inst.attribut(13, k)})
             self.materiaux_detectes = sorted(list(mats))
             self.elements_data = elems
             self.material_combo['values'] = self.materiaux_detectes
@@ -433,12 +561,15 @@ class OptimizationConfigUI:
 
         base = {
             'optimiser': True, 'unite': 'auto', 'unite_detectee': unite_auto,
-            'mode': 'variable', 'longueurs_fixes': [13000], 'priorite_fixe': 'auto',
-            'longueur_min': 2500, 'longueur_max': 13000, 'pas': 500,
-            'marge_coupe': MARGE_COUPE_DEFAULT, 'valorisation_chute': 80.0, 'taux_chute_mini': 1.0,
-            'methode_m3': methode_m3_defaut, 'methode_m2': methode_m2_defaut, 'methode_ml': "manuel"
+            'mode': 'variable', 'longueurs_fixes': [13000], 'priorite_fixe': 'auto', 'disponibilites': [],
+            'longueur_min': 2500, 'longueur_max': 13000, 'pas': 500, 'majoration_variable': 15.0,
+            'marge_coupe': MARGE_COUPE_DEFAULT, 'valorisation_chute': 80.0, 'taux_chute_mini': 1.0, 'longueur_chute_mini': 1000,
+            'methode_m3': methode_m3_defaut, 'methode_m2': methode_m2_defaut, 'methode_ml': "manuel",
+            'algorithme': 'auto', 'budget_temps': 10, 'compresse': False, 'max_longueurs': 0, 'paliers_prix': [],
+            'reduction_motifs': False, 'refentes': [],
+            'formats_panneaux': [[2500, 1250]], 'trait_panneau': 4, 'rotation_panneaux': True
         }
-        if is_materiau_13m(material): base['mode'] = 'fixe'
+        if is_materiau_13m(material): base['mode'] = 'fixe'; base['algorithme'] = 'exact'
         return base
 
     def save_current_material_config(self):
@@ -449,6 +580,22 @@ class OptimizationConfigUI:
                 for chunk in self.longueurs_fixes_str.get().split(','):
                     chunk = chunk.strip()
                     if chunk: liste_fixes.append(int(chunk))
+            disponibilites = []
+            for chunk in self.disponibilites_str.get().split(','):
+                if chunk.strip():
+                    L, nb = chunk.split(':'); disponibilites.append([int(L), int(nb)])
+            formats = []
+            for chunk in self.formats_panneaux_str.get().split(','):
+                if chunk.strip(): formats.append(sorted((int(x) for x in chunk.lower().split('x')), reverse=True))  # (long, large)
+            refentes = []
+            for chunk in self.refentes_str.get().split(','):
+                if chunk.strip():
+                    source, cible = chunk.split('>')
+                    refentes.append([int(x) for x in source.lower().split('x')] + [int(x) for x in cible.lower().split('x')])
+            paliers = []
+            for chunk in self.paliers_prix_str.get().split(','):
+                if chunk.strip():
+                    seuil, pct = chunk.split(':'); paliers.append([int(seuil), float(pct)])
             self.materiaux_configs[self.current_material] = {
                 'optimiser': self.optimiser_var.get(),
                 'unite': self.unite_var.get(),
@@ -456,15 +603,28 @@ class OptimizationConfigUI:
                 'mode': self.mode_var.get(),
                 'longueurs_fixes': liste_fixes,
                 'priorite_fixe': self.priorite_fixe_var.get(),
+                'disponibilites': sorted(disponibilites),
                 'longueur_min': self.longueur_min_var.get(),
                 'longueur_max': self.longueur_max_var.get(),
                 'pas': self.pas_var.get(),
+                'majoration_variable': self.majoration_variable_var.get(),
                 'marge_coupe': self.marge_coupe_var.get(),
                 'valorisation_chute': self.valorisation_chute_var.get(),
                 'taux_chute_mini': self.taux_chute_mini_var.get(),
+                'longueur_chute_mini': self.longueur_chute_mini_var.get(),
                 'methode_m3': self.methode_m3_var.get(),
                 'methode_m2': self.methode_m2_var.get(),
                 'methode_ml': self.methode_ml_var.get(),
+                'algorithme': self.algorithme_var.get(),
+                'budget_temps': self.budget_temps_var.get(),
+                'max_longueurs': self.max_longueurs_var.get(),
+                'compresse': self.compresse_var.get(),
+                'reduction_motifs': self.reduction_motifs_var.get(),
+                'refentes': refentes,
+                'formats_panneaux': formats,
+                'trait_panneau': self.trait_panneau_var.get(),
+                'rotation_panneaux': self.rotation_panneaux_var.get(),
+                'paliers_prix': sorted(paliers),
             }
         except ValueError as e:
             messagebox.showerror("Erreur", f"Valeurs invalides: {e}")
@@ -477,13 +637,26 @@ class OptimizationConfigUI:
         self.mode_var.set(cfg.get('mode','variable'))
         self.longueurs_fixes_str.set(", ".join(map(str, cfg.get('longueurs_fixes', [13000]))))
         self.priorite_fixe_var.set(cfg.get('priorite_fixe','auto'))
+        self.disponibilites_str.set(", ".join(f"{L}:{nb}" for L, nb in cfg.get('disponibilites', [])))
         self.longueur_min_var.set(cfg.get('longueur_min',2500)); self.longueur_max_var.set(cfg.get('longueur_max',13000)); self.pas_var.set(cfg.get('pas',500))
+        self.majoration_variable_var.set(cfg.get('majoration_variable',15.0))
         self.marge_coupe_var.set(cfg.get('marge_coupe',MARGE_COUPE_DEFAULT))
         self.valorisation_chute_var.set(cfg.get('valorisation_chute',80.0))
         self.taux_chute_mini_var.set(cfg.get('taux_chute_mini',1.0))
+        self.longueur_chute_mini_var.set(cfg.get('longueur_chute_mini',1000))
         self.methode_m3_var.set(cfg.get('methode_m3','manuel'))
         self.methode_m2_var.set(cfg.get('methode_m2','manuel'))
         self.methode_ml_var.set(cfg.get('methode_ml','manuel'))
+        self.algorithme_var.set(cfg.get('algorithme','auto'))
+        self.budget_temps_var.set(cfg.get('budget_temps',10))
+        self.max_longueurs_var.set(cfg.get('max_longueurs',0))
+        self.compresse_var.set(cfg.get('compresse',False))
+        self.reduction_motifs_var.set(cfg.get('reduction_motifs',False))
+        self.refentes_str.set(", ".join(f"{sl}x{sh}>{cl}x{ch}" for sl, sh, cl, ch in cfg.get('refentes', [])))
+        self.formats_panneaux_str.set(", ".join(f"{L}x{l}" for L, l in cfg.get('formats_panneaux', [[2500, 1250]])))
+        self.trait_panneau_var.set(cfg.get('trait_panneau',4))
+        self.rotation_panneaux_var.set(cfg.get('rotation_panneaux',True))
+        self.paliers_prix_str.set(", ".join(f"{seuil}:{pct:g}" for seuil, pct in cfg.get('paliers_prix', [])))
         self.update_mode_ui(); self.on_optimiser_changed()
 
     def load_default_configs(self):
@@ -531,6 +704,28 @@ Longueurs: {min(longueurs):.0f} - {max(longueurs):.0f} mm
             preview.append(f"Méthode volume: {cfg.get('methode_m3','manuel')}")
         if not optimiser and ueff=='ml':
             preview.append(f"Méthode longueur: {cfg.get('methode_ml','manuel')}")
+        if optimiser and ueff=='m2':
+            preview.append("Imbrication 2D guillotine: " + ", ".join(f"{L}x{l}" for L, l in cfg.get('formats_panneaux', [[2500, 1250]]))
+                           + f" mm, trait {cfg.get('trait_panneau',4)} mm, rotation {'oui' if cfg.get('rotation_panneaux',True) else 'non'}")
+        elif optimiser:
+            preview.append(f"Algorithme: {cfg.get('algorithme','auto')}")
+            if cfg.get('algorithme','auto') not in ('glouton','premier','auto'):
+                preview.append(f"Budget temps: {cfg.get('budget_temps',10)} s")
+            if cfg.get('compresse',False):
+                preview.append("Pièces identiques regroupées en motifs")
+            if cfg.get('reduction_motifs',False):
+                preview.append("Nombre de motifs de coupe réduit (objectif secondaire)")
+            if cfg.get('max_longueurs',0):
+                preview.append(f"Longueurs commandées: {cfg['max_longueurs']} max par section")
+            if cfg.get('mode') == 'mixte':
+                preview.append(f"Mixte: fixes {', '.join(map(str, cfg.get('longueurs_fixes', [])))} mm + sur mesure "
+                               f"{cfg.get('longueur_min')}-{cfg.get('longueur_max')} mm (+{cfg.get('majoration_variable',15.0):g} %)")
+            if cfg.get('disponibilites'):
+                preview.append("Stock disponible: " + ", ".join(f"{nb} x {L} mm" for L, nb in cfg['disponibilites']))
+            if cfg.get('refentes'):
+                preview.append("Refentes: " + ", ".join(f"{sl}x{sh} → {cl}x{ch}" for sl, sh, cl, ch in cfg['refentes']))
+            if cfg.get('paliers_prix'):
+                preview.append("Majorations: " + ", ".join(f"+{pct:g} % dès {seuil} mm" for seuil, pct in cfg['paliers_prix']))
         self.preview_text.delete(1.0, tk.END); self.preview_text.insert(tk.END, "\n".join(preview))
 
     # --- Fichiers config ---
@@ -580,15 +775,111 @@ Longueurs: {min(longueurs):.0f} - {max(longueurs):.0f} mm
         except Exception as e:
             messagebox.showerror("Erreur", f"Lancement: {e}")
 
+    def run_balayage(self):
+        if not self.current_material: return
+        self.save_current_material_config()
+        mat = self.current_material; cfg = self.materiaux_configs[mat]
+        if est_panneau(cfg):
+            messagebox.showinfo("Info", "Balayage des longueurs : matériaux en barres uniquement"); return
+        elements = [e for e in self.elements_data if e['materiau'] == mat]
+        if not elements:
+            messagebox.showwarning("Attention", "Aucun élément pour ce matériau"); return
+        prix_u = prix_materiau(mat)
+        debut = time.time()
+        resultats = balayer_longueurs(mat, elements, cfg, prix_u, parallele=self.parallele_var.get())
+        log_message(f"Balayage {mat}: {len(resultats)} configurations en {time.time()-debut:.1f} s", "INFO")
+
+        win = tk.Toplevel(self.root); win.title(f"Balayage des longueurs — {mat}")
+        cols = ("rang","config","barres","quantite","cout","chute")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=16)
+        for c, t, w in zip(cols, ("#","Configuration","Barres","Quantité","Coût (€)","Taux chute (%)"), (40,260,70,90,90,100)):
+            tree.heading(c, text=t); tree.column(c, width=w, anchor=(tk.W if c=="config" else tk.E))
+        for i, r in enumerate(resultats, 1):
+            tree.insert("", tk.END, iid=str(i-1), values=(i, libelle_config(r['config']), r['barres'], round(r['quantite'],4),
+                                                          round(r['cout'],2), round(r['taux_chute'],2)))
+        tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        tree.selection_set("0")
+
+        def appliquer():
+            sel = tree.selection()
+            if not sel: return
+            self.materiaux_configs[mat].update(resultats[int(sel[0])]['config'])
+            self.load_material_config(mat); self.update_preview()
+            log_message(f"Balayage {mat}: {libelle_config(resultats[int(sel[0])]['config'])} appliquée", "INFO")
+            win.destroy()
+
+        b = ttk.Frame(win); b.pack(fill=tk.X, padx=8, pady=(0,8))
+        ttk.Button(b, text="✅ Appliquer", command=appliquer).pack(side=tk.RIGHT, padx=3)
+        ttk.Button(b, text="Fermer", command=win.destroy).pack(side=tk.RIGHT, padx=3)
+
+    def vider_cache_plans(self):
+        try:
+            cache = CachePlans(); cache.vider(); cache.fermer()
+            cache = cache_elements.CacheElements(""); cache.vider(); cache.fermer()
+            messagebox.showinfo("Cache", "Caches des plans et des mesures d'éléments vidés.")
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Cache: {e}")
+
+    def demander_arret(self):
+        self.should_stop = True
+        log_message("Arrêt demandé : meilleur plan trouvé conservé", "INFO")
+
+    def arret_demande(self):
+        # appelé depuis la recherche : traite les clics (bouton Arrêter) au plus toutes les 0.2 s
+        maintenant = time.time()
+        if maintenant - self._derniere_maj_ui >= 0.2:
+            self._derniere_maj_ui = maintenant
+            try: self.root.update()
+            except tk.TclError: self.should_stop = True
+        return self.should_stop
+
+    def lire_mesures(self):
+        # un balayage pour les mesures exigées par les méthodes des matériaux non optimisés
+        erreurs = []
+        debut = time.time()
+        cache = cache_elements.ouvrir(uc)
+        try:
+            appels = self.instantane.lire_geometrie(gc, plan_geometrie(self.materiaux_configs, self.elements_data), erreurs, cache)
+        finally:
+            if cache is not None: cache.fermer()
+        for eid, e in erreurs:
+            log_message(f"Element {eid}: {e}", "WARNING")
+        for e in self.elements_data:
+            e['mesures'] = self.instantane.mesures(self.instantane.index(e['eid']))
+        log_message(f"Mesures Cadwork: {appels} appels ({time.time()-debut:.2f} s)", "INFO")
+
     def execute_optimization(self):
         log_message("Début optimisation...")
-        info_mats, table_cmd, table_barres, = optimiser_avec_unites(self.materiaux_configs, self.elements_data)
-        self.generer_excel(info_mats, table_cmd, table_barres)
+        self.should_stop = False
+        self.run_btn.config(state="disabled"); self.stop_btn.config(state="normal")
+        cache = chutes = None
+        if self.cache_var.get():
+            try: cache = CachePlans()
+            except Exception as e: log_message(f"Cache plans indisponible: {e}", "WARNING")
+        cle_stock = cle_stock_projet()
+        if self.chutes_var.get() and not cle_stock:
+            log_message("Stock de chutes ignoré: projet non enregistré (fichier .3d inconnu)", "WARNING")
+        elif self.chutes_var.get():
+            try: chutes = StockChutes()
+            except Exception as e: log_message(f"Stock de chutes indisponible: {e}", "WARNING")
+        self.lire_mesures()
+        try:
+            info_mats, table_cmd, table_barres, table_panneaux = optimiser_avec_unites(self.materiaux_configs, self.elements_data,
+                                                                        arret=self.arret_demande,
+                                                                        parallele=self.parallele_var.get(), cache=cache,
+                                                                        incremental=self.incremental_var.get(),
+                                                                        demarrage_chaud=self.demarrage_chaud_var.get(),
+                                                                        chutes=chutes, projet=cle_stock)
+        finally:
+            self.run_btn.config(state="normal"); self.stop_btn.config(state="disabled")
+            if cache is not None: cache.fermer()
+            if chutes is not None: chutes.fermer()
+        self.generer_excel(info_mats, table_cmd, table_barres, table_panneaux)
         messagebox.showinfo("Terminé", "Optimisation terminée et Excel généré.")
         self.root.destroy()
 
     # --- Excel ---
-    def generer_excel(self, info_materiaux, tableau_commandes, tableau_barres_detaille):
+    def generer_excel(self, info_materiaux, tableau_commandes, tableau_barres_detaille, tableau_panneaux=()):
         wb = Workbook()
         ws_recap = wb.active; ws_recap.title = "Récapitulatif"
         self.remplir_feuille_et_formater(
@@ -600,7 +891,7 @@ Longueurs: {min(longueurs):.0f} - {max(longueurs):.0f} mm
                 round(data.get('volume_barre',0.0),4),
                 round(data.get('volume_utilise',0.0),4),
                 round(data.get('prix_unitaire',0.0),2),
-                round(data.get('prix_unitaire',0.0)*data.get('volume_barre',0.0),2),
+                round(data.get('prix_total', data.get('prix_unitaire',0.0)*data.get('volume_barre',0.0)),2),
                 (round(100*(1 - (data.get('volume_utilise',0.0)/(data.get('volume_barre',1.0) or 1.0))),2) if data.get('optimise',True) else 0.0),
                 "Oui" if data.get('optimise',True) else "Non"
             ] for mat, data in info_materiaux.items()],
@@ -610,22 +901,39 @@ Longueurs: {min(longueurs):.0f} - {max(longueurs):.0f} mm
         ws_cmd = wb.create_sheet("Commandes")
         self.remplir_feuille_et_formater(
             ws_cmd,
-            ["Matériau","Largeur (mm)","Hauteur (mm)","Longueurs","Total barres","Taux chute (%)","Quantité","Prix U (€)","Prix total (€)"],
+            ["Matériau","Largeur (mm)","Hauteur (mm)","Provenance","Longueurs","Total barres","Taux chute (%)","Quantité","Prix U (€)","Prix total (€)","Borne (mm)","Écart borne (%)","Algorithme","Durée (s)","Manque stock"],
             tableau_commandes,
             "TableCommandes"
         )
 
-        ws_barres = wb.create_sheet("Barres détaillées")
-        self.remplir_feuille_et_formater(
-            ws_barres,
-            ["ID Barre","Matériau","Largeur (mm)","Hauteur (mm)","Longueur barre (mm)","Nb pièces","Pièces","Chute (mm)","Taux chute (%)","Quantité","Prix (€)"],
-            tableau_barres_detaille,
-            "TableBarres"
-        )
-
-        num_devis = uc.get_project_user_attribute(1).strip().replace(" ","_")
-        client = uc.get_project_number().strip().replace(" ","_")
-        nom_fichier = f"{num_devis}-{client}-optimisation_v5-2_brut_m2.xlsx"
+        if self.export_motifs_var.get():
+            # barres identiques regroupées : une ligne par motif, débit en série à la scie
+            ws_motifs = wb.create_sheet("Motifs de coupe")
+            self.remplir_feuille_et_formater(
+                ws_motifs,
+                ["Motif","Matériau","Largeur (mm)","Hauteur (mm)","Longueur barre (mm)","Nb pièces","Longueurs pièces (mm)","Répétitions","Chute (mm)","Taux chute (%)","Quantité","Prix (€)","ID Barres"],
+                motifs_de_coupe(tableau_barres_detaille, self.elements_data),
+                "TableMotifs"
+            )
+        else:
+            ws_barres = wb.create_sheet("Barres détaillées")
+            self.remplir_feuille_et_formater(
+                ws_barres,
+                ["ID Barre","Matériau","Largeur (mm)","Hauteur (mm)","Longueur barre (mm)","Nb pièces","Pièces","Chute (mm)","Taux chute (%)","Quantité","Prix (€)"],
+                tableau_barres_detaille,
+                "TableBarres"
+            )
+
+        if tableau_panneaux:
+            ws_panneaux = wb.create_sheet("Panneaux")
+            self.remplir_feuille_et_formater(
+                ws_panneaux,
+                ["ID Panneau","Matériau","Épaisseur (mm)","Format (mm)","Nb pièces","Pièces (x,y)","Surface pièces (m²)","Chute (m²)","Taux chute (%)","Quantité","Prix (€)"],
+                tableau_panneaux,
+                "TablePanneaux"
+            )
+
+        nom_fichier = f"{identifiant_projet()}-optimisation_v5-2_brut_m2.xlsx"
         output_path = os.path.join(os.path.expanduser("~"), "Desktop", nom_fichier)
         wb.save(output_path)
         try:
@@ -658,141 +966,599 @@ Longueurs: {min(longueurs):.0f} - {max(longueurs):.0f} mm
 # Optimisation
 # =========================================================
 
-def optimiser_avec_unites(materiaux_configs, elements_data):
+def identifiant_projet():
+    # n° de devis + n° de projet Cadwork (nom du fichier Excel)
+    num_devis = uc.get_project_user_attribute(1).strip().replace(" ","_")
+    client = uc.get_project_number().strip().replace(" ","_")
+    return f"{num_devis}-{client}"
+
+def cle_stock_projet():
+    # origine des chutes en stock : identifiant + fichier .3d (deux projets sans n° ne se confondent pas), "" si non enregistré
+    fichier = cache_elements.fichier_projet(uc)
+    return f"{identifiant_projet()}|{fichier}" if fichier else ""
+
+def grouper_sections(elements):
+    groupes_sections = defaultdict(list)
+    longueurs_eid = {}
+    for e in elements:
+        groupes_sections[(e['largeur'], e['hauteur'])].append(e['eid'])
+        longueurs_eid[e['eid']] = e['longueur']
+    return groupes_sections, longueurs_eid
+
+def est_panneau(cfg):
+    # matériau au m² optimisé : imbrication 2D (moteur_panneaux), hors des calculs de barres
+    return cfg.get('optimiser', True) and cfg.get('unite_detectee') == 'm2'
+
+def plan_precedent(elements, eids):
+    # barres du run précédent (attribut 12) en indices de la section ; pièces sans numéro omises
+    eid_barre = {e['eid']: e.get('barre', '') for e in elements}
+    barres = defaultdict(list)
+    for i, eid in enumerate(eids):
+        if eid_barre.get(eid, '').isdigit(): barres[int(eid_barre[eid])].append(i)
+    return [barres[n] for n in sorted(barres)] or None
+
+def motifs_de_coupe(tableau_barres_detaille, elements_data):
+    # lignes de « Barres détaillées » regroupées par motif : section, longueur de barre et longueurs des pièces dans l'ordre de coupe
+    longueurs_eid = {str(e['eid']): e['longueur'] for e in elements_data}
+    def piece(jeton):
+        # (longueur, libellé) ; "(eid+eid)" = débit de refente, pièces côte à côte
+        if jeton.startswith("("):
+            longueurs = sorted((longueurs_eid.get(eid, 0) for eid in jeton[1:-1].split("+")), reverse=True)
+            return longueurs[0], "(" + "+".join(f"{x:g}" for x in longueurs) + ")"
+        return longueurs_eid.get(jeton, 0), f"{longueurs_eid.get(jeton, 0):g}"
+    motifs = {}
+    for num, mat, largeur, hauteur, L, nb, pieces, chute, taux, quantite, prix in tableau_barres_detaille:
+        longueurs = tuple(sorted((piece(jeton) for jeton in str(pieces).split(" | ")), reverse=True))
+        m = motifs.setdefault((mat, largeur, hauteur, L, longueurs), {'nb': nb, 'chute': chute, 'taux': taux, 'quantite': 0.0, 'prix': 0.0, 'barres': []})
+        m['quantite'] += quantite; m['prix'] += prix; m['barres'].append(int(num))
+    lignes = []
+    for (mat, largeur, hauteur, L, longueurs), m in sorted(motifs.items(), key=lambda kv: (str(kv[0][0]), kv[0][1], kv[0][2], -len(kv[1]['barres']), -kv[0][3])):
+        lignes.append([f"M{len(lignes)+1}", mat, largeur, hauteur, L, m['nb'], " | ".join(libelle for _, libelle in longueurs),
+                       len(m['barres']), m['chute'], m['taux'], round(m['quantite'],4), round(m['prix'],2), plages_numeros(m['barres'])])
+    return lignes
+
+def plages_numeros(numeros):
+    # "1-4, 7, 9-10" : numéros de barres consécutifs regroupés
+    plages = []
+    for n in sorted(set(numeros)):
+        if plages and n == plages[-1][1] + 1: plages[-1][1] = n
+        else: plages.append([n, n])
+    return ", ".join(f"{a}-{b}" if b > a else str(a) for a, b in plages)
+
+def majoration_longueur(L, paliers):
+    # coefficient de prix de la longueur de stock L : palier [longueur mini, majoration %] le plus haut atteint
+    pct = 0.0
+    for seuil, p in sorted(paliers or []):
+        if L >= seuil: pct = p
+    return 1 + pct/100
+
+def facteur_prix(L, cfg):
+    # coefficient du prix matière pour une barre de longueur L : palier de longueur, débit sur mesure en mode mixte
+    facteur = majoration_longueur(L, cfg.get('paliers_prix'))
+    if cfg.get('mode') == 'mixte' and L not in cfg.get('longueurs_fixes', []):
+        facteur *= 1 + cfg.get('majoration_variable', 0.0)/100
+    return facteur
+
+def couts_stocks(stocks, cfg, largeur, hauteur, unite):
+    # tarif d'une section par longueur de stock, précalculé pour le moteur (prix unitaire omis : facteur commun)
+    if not cfg.get('paliers_prix') and cfg.get('mode') != 'mixte': return None
+    return {L: facteur_prix(L, cfg)*calculate_quantity_by_unit(largeur, hauteur, L, unite) for L in stocks}
+
+def preparer_taches(groupes, materiaux_configs, demarrage_chaud=False):
+    # instantané des sections à optimiser : données pures, transmissibles aux processus de calcul
+    taches = {}
+    nb_total = sum(len(elements) for elements in groupes.values())
+    budget_global = md.budget_cible(nb_total) * 0.5  # moitié de l'objectif pour le calcul, le reste pour Cadwork/Excel
+    for mat_name, elements in groupes.items():
+        cfg = materiaux_configs.get(mat_name, {})
+        if not cfg.get('optimiser', True) or est_panneau(cfg): continue
+        stocks = sorted(set(generer_longueurs_materiau(mat_name, cfg)))
+        marge = cfg.get('marge_coupe', MARGE_COUPE_DEFAULT); unite = cfg.get('unite_detectee', 'm3')
+        budget = float(cfg.get('budget_temps', 10))
+        groupes_sections, longueurs_eid = grouper_sections(elements)
+        for (largeur, hauteur), eids in groupes_sections.items():
+            longueurs = [longueurs_eid[eid] for eid in eids]
+            algorithme = cfg.get('algorithme', 'auto')
+            if algorithme == 'auto':
+                budget_config = budget_global
+                budget_section = budget_global * len(eids) / max(1, nb_total)
+                algorithme = md.choisir_algorithme(len(eids), len(set(longueurs)), len(stocks), budget_section)
+            else:
+                budget_config = budget
+                budget_section = budget * len(eids) / max(1, len(elements))
+            taches[(mat_name, largeur, hauteur)] = md.Tache(longueurs, stocks, marge, algorithme, budget_section,
+                                                            cfg.get('compresse', False),
+                                                            plan_precedent(elements, eids) if demarrage_chaud else None,
+                                                            int(cfg.get('max_longueurs', 0)),
+                                                            couts_stocks(stocks, cfg, largeur, hauteur, unite),
+                                                            cfg.get('reduction_motifs', False), budget_config)
+    return taches
+
+def affecter_stock_chutes(groupes, materiaux_configs, chutes, projet, exclues=()):
+    """
+    Place les pièces dans les chutes en stock, section par section, avant tout
+    calcul de barres neuves : les chutes retenues sont consommées par le projet
+    et les pièces placées retirées de `groupes`.
+    Retourne {(matériau, largeur, hauteur): [(longueur chute, [eids], [longueurs])]}.
+    """
+    barres_chutes = {}
+    for mat_name, elements in groupes.items():
+        cfg = materiaux_configs.get(mat_name, {})
+        if not cfg.get('optimiser', True) or est_panneau(cfg): continue
+        marge = cfg.get('marge_coupe', MARGE_COUPE_DEFAULT)
+        groupes_sections, longueurs_eid = grouper_sections(elements)
+        placees = set()
+        for (largeur, hauteur), eids in groupes_sections.items():
+            if (mat_name, largeur, hauteur) in exclues: continue
+            longueurs = [longueurs_eid[eid] for eid in eids]
+            dispo = chutes.disponibles(mat_name, largeur, hauteur, min(longueurs))
+            affectations = md.affecter_chutes(longueurs, [L for _, L in dispo], marge) if dispo else []
+            if not affectations: continue
+            chutes.consommer([dispo[k][0] for k, _ in affectations], projet)
+            barres_chutes[(mat_name, largeur, hauteur)] = [(dispo[k][1], [eids[i] for i in b], [longueurs[i] for i in b])
+                                                           for k, b in affectations]
+            placees.update(eids[i] for _, b in affectations for i in b)
+        groupes[mat_name] = [e for e in elements if e['eid'] not in placees]
+    return barres_chutes
+
+def cout_section(longueurs, stocks, marge, cfg, largeur, hauteur, unite, budget=0.5):
+    # coût matière d'une section hors prix unitaire, calcul court ('auto' dans `budget`) : arbitrage entre variantes de débit
+    couts = couts_stocks(stocks, cfg, largeur, hauteur, unite) or {L: calculate_quantity_by_unit(largeur, hauteur, L, unite) for L in stocks}
+    retenues = md.elaguer_stocks(stocks, couts)
+    plan = md.resoudre_section(longueurs, retenues, marge, 'auto', temps_max=budget, couts=couts)
+    return sum(couts[md.longueur_stock(md.longueur_occupee([longueurs[i] for i in b], marge), retenues)] for b in plan)
+
+def appliquer_refentes(groupes, materiaux_configs, exclues=()):
+    """
+    Refente : pour chaque dérivation autorisée (source -> débit) dont les deux
+    sections sont présentes, les pièces de la petite section sont groupées en
+    débits (`md.composer_refente`) placés comme des pièces de la section source.
+    Retenu si le coût matière de la source avec les débits est inférieur à celui
+    des deux sections commandées séparément ; les débits profitent ainsi des chutes de la source.
+    Modifie `groupes` et retourne {eid du débit: (largeur, hauteur, [eids], [longueurs])}.
+    """
+    refentes = {}
+    for mat_name, elements in groupes.items():
+        cfg = materiaux_configs.get(mat_name, {})
+        if not cfg.get('optimiser', True) or est_panneau(cfg) or not cfg.get('refentes'): continue
+        stocks = sorted(set(generer_longueurs_materiau(mat_name, cfg)))
+        marge = cfg.get('marge_coupe', MARGE_COUPE_DEFAULT); unite = cfg.get('unite_detectee', 'm3')
+        for sl, sh, cl, ch in cfg['refentes']:
+            groupes_sections, longueurs_eid = grouper_sections(elements)
+            source = next((s for s in groupes_sections if abs(s[0]-sl) < 0.5 and abs(s[1]-sh) < 0.5), None)
+            cible = next((s for s in groupes_sections if abs(s[0]-cl) < 0.5 and abs(s[1]-ch) < 0.5), None)
+            if source is None or cible is None or source == cible: continue
+            if (mat_name,)+source in exclues or (mat_name,)+cible in exclues: continue
+            if any(eid in refentes for eid in groupes_sections[cible]): continue  # pas de refente en cascade
+            k = md.nb_refente(source, cible, marge)
+            if k < 1:
+                log_message(f"{mat_name}: refente {sl}x{sh} -> {cl}x{ch} impossible", "WARNING"); continue
+            eids_cible = groupes_sections[cible]
+            longueurs_cible = [longueurs_eid[eid] for eid in eids_cible]
+            longueurs_source = [longueurs_eid[eid] for eid in groupes_sections[source]]
+            debits = md.composer_refente(longueurs_cible, k)
+            separe = (cout_section(longueurs_source, stocks, marge, cfg, source[0], source[1], unite)
+                      + cout_section(longueurs_cible, stocks, marge, cfg, cible[0], cible[1], unite))
+            commun = cout_section(longueurs_source + [L for L, _ in debits], stocks, marge, cfg, source[0], source[1], unite)
+            if commun >= separe:
+                log_message(f"{mat_name}: refente {sl}x{sh} -> {cl}x{ch} non rentable", "DEBUG"); continue
+            retirees = set(eids_cible)
+            elements[:] = [e for e in elements if e['eid'] not in retirees]
+            for L, indices in debits:
+                eid = f"R{len(refentes)+1}"
+                refentes[eid] = (cible[0], cible[1], [eids_cible[i] for i in indices], [longueurs_cible[i] for i in indices])
+                elements.append({'eid': eid, 'materiau': mat_name, 'longueur': L, 'largeur': source[0], 'hauteur': source[1],
+                                 'barre': '', 'taux_chute': ''})
+            log_message(f"{mat_name}: {len(eids_cible)} pièces {cl}x{ch} refendues dans du {sl}x{sh} "
+                        f"({len(debits)} débits de {k}, coût matière -{100*(separe-commun)/separe:.1f} %)", "INFO")
+    return refentes
+
+def appliquer_disponibilites(groupes, materiaux_configs, plans, conservees):
+    """
+    Matériaux en longueurs fixes à stock limité : les longueurs commandées par
+    toutes les sections du matériau sont prises sur le même stock (barres des
+    sections inchangées déduites d'abord), plans redécoupés si nécessaire.
+    Met à jour `plans` (plans indexés) et retourne {(matériau, largeur, hauteur): ([longueur par barre], {longueur: manque})}.
+    """
+    imposees = {}
+    for mat_name, elements in groupes.items():
+        cfg = materiaux_configs.get(mat_name, {})
+        disponibles = {int(L): int(nb) for L, nb in cfg.get('disponibilites') or []}
+        if not cfg.get('optimiser', True) or est_panneau(cfg) or cfg.get('mode') not in ('fixe', 'mixte') or not disponibles: continue
+        stocks = sorted(set(generer_longueurs_materiau(mat_name, cfg)))
+        marge = cfg.get('marge_coupe', MARGE_COUPE_DEFAULT)
+        groupes_sections, longueurs_eid = grouper_sections(elements)
+        for (m, _, _), barres in conservees.items():
+            if m != mat_name: continue
+            for _, eids in barres:
+                L = md.longueur_stock(md.longueur_occupee([longueurs_eid[eid] for eid in eids], marge), stocks)
+                if L in disponibles: disponibles[L] -= 1
+        sections = {}
+        for (largeur, hauteur), eids in groupes_sections.items():
+            cle = (mat_name, largeur, hauteur)
+            if cle not in plans: continue
+            longueurs = [longueurs_eid[eid] for eid in eids]
+            sections[cle] = (longueurs, md.developper_motifs(longueurs, plans[cle]) if cfg.get('compresse', False) else plans[cle])
+        debut = time.time()
+        # mode mixte : seules les longueurs fixes sont limitées, le tarif fait préférer le stock au sur mesure
+        couts = {L: facteur_prix(L, cfg)*L for L in stocks} if cfg.get('mode') == 'mixte' else None
+        for cle, (plan, longueurs_commandees, manque) in md.respecter_disponibilites(sections, stocks, marge, disponibles, couts).items():
+            plans[cle] = plan; imposees[cle] = (longueurs_commandees, manque)
+            if manque:
+                log_message(f"{cle[0]} {cle[1]}x{cle[2]}: stock insuffisant, manque "
+                            + ", ".join(f"{nb} x {L} mm" for L, nb in sorted(manque.items())), "WARNING")
+        log_message(f"{mat_name}: stock limité appliqué à {len(sections)} sections en {time.time()-debut:.2f} s", "INFO")
+    return imposees
+
+def sections_inchangees(groupes, materiaux_configs):
+    """
+    Mode incrémental : reconstitue les barres du run précédent (attribut 12) et
+    retient les sections dont chaque barre redonne, avec les longueurs actuelles,
+    le taux de chute enregistré (attribut 13). Une pièce sans numéro, une barre
+    partagée entre sections ou un écart de taux invalident la section.
+    Retourne {(matériau, largeur, hauteur): [(n° barre, [eids])]}.
+    """
+    usages = defaultdict(set)
+    par_section = defaultdict(lambda: defaultdict(list))
+    invalides = set()
+    for mat_name, elements in groupes.items():
+        cfg = materiaux_configs.get(mat_name, {})
+        if not cfg.get('optimiser', True) or est_panneau(cfg): continue
+        for e in elements:
+            cle = (mat_name, e['largeur'], e['hauteur'])
+            num = e.get('barre', '')
+            if not num.isdigit(): invalides.add(cle); continue
+            usages[int(num)].add(cle); par_section[cle][int(num)].append(e)
+
+    conservees = {}
+    for cle, barres in par_section.items():
+        if cle in invalides or any(len(usages[n]) > 1 for n in barres): continue
+        mat_name, largeur, hauteur = cle
+        cfg = materiaux_configs.get(mat_name, {})
+        stocks = sorted(set(generer_longueurs_materiau(mat_name, cfg)))
+        marge = cfg.get('marge_coupe', MARGE_COUPE_DEFAULT); unite = cfg.get('unite_detectee', 'm3')
+        intacte = True
+        couts = couts_stocks(stocks, cfg, largeur, hauteur, unite)
+        if cfg.get('max_longueurs', 0):
+            occupations = [(md.longueur_occupee([e['longueur'] for e in elems], marge), 1) for elems in barres.values()]
+            stocks = md.consolider_longueurs(occupations, stocks, int(cfg['max_longueurs']), couts)
+        else:
+            stocks = md.elaguer_stocks(stocks, couts)
+        for elems in barres.values():
+            occ = md.longueur_occupee([e['longueur'] for e in elems], marge)
+            if occ > stocks[-1] and len(elems) > 1: intacte = False; break
+            quantite_barre = calculate_quantity_by_unit(largeur, hauteur, md.longueur_stock(occ, stocks), unite)
+            somme_q = sum(calculate_quantity_by_unit(largeur, hauteur, e['longueur'], unite) for e in elems)
+            taux = (quantite_barre - somme_q)/quantite_barre if quantite_barre>0 else 0
+            if any(e.get('taux_chute') != f"{round(taux*100,2)} %" for e in elems): intacte = False; break
+        if intacte:
+            conservees[cle] = sorted((n, [e['eid'] for e in elems]) for n, elems in barres.items())
+    return conservees
+
+def optimiser_avec_unites(materiaux_configs, elements_data, arret=None, parallele=True, cache=None, incremental=False,
+                          demarrage_chaud=False, chutes=None, projet=""):
     info_materiaux: Dict[str,dict] = {}
     tableau_commandes: List[list] = []
     tableau_barres_detaille: List[list] = []
+    tableau_panneaux: List[list] = []
     barre_global_id = 1
 
     groupes = defaultdict(list)
     for e in elements_data:
         groupes[e['materiau']].append(e)
 
+    # plans en cache, calcul (éventuellement parallèle) du reste, puis écriture Cadwork dans l'ordre
+    conservees = sections_inchangees(groupes, materiaux_configs) if incremental else {}
+    barres_chutes = {}
+    if chutes is not None and not projet:
+        log_message("Stock de chutes ignoré: projet sans identifiant", "WARNING"); chutes = None
+    if chutes is not None:
+        # chutes d'abord : reprise du projet (calcul précédent annulé), puis pièces placées dans le stock disponible
+        conflits = chutes.annuler_projet(projet)
+        if conflits:
+            log_message(f"Stock chutes: {conflits} chutes de ce projet déjà réemployées par d'autres projets (conservées)", "WARNING")
+        barres_chutes = affecter_stock_chutes(groupes, materiaux_configs, chutes, projet, exclues=conservees)
+        log_message(f"Stock chutes: {sum(map(len, barres_chutes.values()))} chutes réemployées "
+                    f"({chutes.nb_disponibles()} disponibles)", "INFO")
+    refentes = appliquer_refentes(groupes, materiaux_configs, exclues=conservees)
+    taches = {c: t for c, t in preparer_taches(groupes, materiaux_configs, demarrage_chaud).items() if c not in conservees}
+    if incremental:
+        # numéros des sections inchangées conservés, nouvelles barres numérotées à la suite
+        barre_global_id = 1 + max([n for barres in conservees.values() for n, _ in barres], default=0)
+        log_message(f"Mode incrémental: {len(conservees)} sections inchangées, {len(taches)} à recalculer", "INFO")
+    plans = {}
+    infos_sections = {c: ("inchangée", 0.0) for c in conservees}  # (algorithme, durée de calcul) par section
+    if cache is not None:
+        for cle, tache in taches.items():
+            plan = cache.lire(tache) if tache.plan_initial is None else None  # démarrage à chaud : résultat propre au plan antérieur
+            if plan is not None: plans[cle] = plan; infos_sections[cle] = (f"{tache.algorithme} (cache)", 0.0)
+        log_message(f"Cache plans: {len(plans)}/{len(taches)} sections réutilisées", "INFO")
+    durees = {}
+    nouveaux = md.resoudre_sections({c: t for c, t in taches.items() if c not in plans}, parallele=parallele,
+                                    arret=arret, log=lambda msg: log_message(msg, "INFO"), durees=durees)
+    plans.update(nouveaux)
+    infos_sections.update({c: (taches[c].algorithme, durees.get(c, 0.0)) for c in nouveaux})
+    if cache is not None and not (arret is not None and arret()):  # plans interrompus non mémorisés
+        for cle, plan in nouveaux.items():
+            if taches[cle].plan_initial is None: cache.ecrire(taches[cle], plan)
+    longueurs_imposees = appliquer_disponibilites(groupes, materiaux_configs, plans, conservees)
+
     for mat_name, elements in groupes.items():
         cfg = materiaux_configs.get(mat_name, {})
         if not cfg.get('optimiser', True):
             traiter_materiau_non_optimise(mat_name, elements, info_materiaux, tableau_commandes, tableau_barres_detaille, cfg)
             continue
+        if est_panneau(cfg):
+            barre_global_id = optimiser_materiau_panneaux(elements, mat_name, cfg, info_materiaux, tableau_commandes,
+                                                          tableau_panneaux, barre_global_id)
+            continue
 
         unite = cfg.get('unite_detectee', 'm3')
         longueurs_barres = generer_longueurs_materiau(mat_name, cfg)
         marge = cfg.get('marge_coupe', MARGE_COUPE_DEFAULT)
+        imposees = {(l, h): v for (m, l, h), v in longueurs_imposees.items() if m == mat_name}
         barre_global_id = optimiser_materiau_avec_unite(elements, mat_name, unite, longueurs_barres, marge,
-                                                        info_materiaux, tableau_commandes, tableau_barres_detaille, barre_global_id)
-    return info_materiaux, tableau_commandes, tableau_barres_detaille
+                                                        info_materiaux, tableau_commandes, tableau_barres_detaille, barre_global_id,
+                                                        algorithme=cfg.get('algorithme', 'auto'),
+                                                        budget_temps=float(cfg.get('budget_temps', 10)), arret=arret, plans=plans,
+                                                        compresse=cfg.get('compresse', False) and not imposees,
+                                                        barres_conservees={(l, h): b for (m, l, h), b in conservees.items() if m == mat_name},
+                                                        infos_sections=infos_sections,
+                                                        max_longueurs=int(cfg.get('max_longueurs', 0)),
+                                                        reduction_motifs=cfg.get('reduction_motifs', False),
+                                                        tarif=cfg,
+                                                        barres_chutes={(l, h): b for (m, l, h), b in barres_chutes.items() if m == mat_name},
+                                                        chutes=chutes, projet=projet,
+                                                        longueur_chute_mini=cfg.get('longueur_chute_mini', 1000),
+                                                        valorisation_chute=cfg.get('valorisation_chute', 80.0),
+                                                        longueurs_imposees=imposees, refentes=refentes)
+    return info_materiaux, tableau_commandes, tableau_barres_detaille, tableau_panneaux
 
 def traiter_materiau_non_optimise(mat_name, elements, info_materiaux, tableau_commandes, tableau_barres_detaille, config=None):
     # init fiche matériau
     if mat_name not in info_materiaux:
-        try:
-            mat_id = mc.get_material_id(mat_name); prix_u = safe_float(mc.get_price(mat_id))
-        except Exception:
-            prix_u = 0.0
         info_materiaux[mat_name] = {
-            'volume_utilise': 0.0, 'volume_barre': 0.0, 'prix_unitaire': prix_u,
+            'volume_utilise': 0.0, 'volume_barre': 0.0, 'prix_unitaire': prix_materiau(mat_name),
             'unite': (config.get('unite_detectee') if config else get_material_unit(mat_name)),
             'optimise': False
         }
 
     unite_eff = info_materiaux[mat_name]['unite']  # m3 | m2 | ml
-    # méthode selon unité effective
-    if unite_eff == 'm3':
-        method = (config.get('methode_m3') if config else None) or 'volume_physique_reel'
-    elif unite_eff == 'ml':
-        method = (config.get('methode_ml') if config else None) or 'manuel'
-    else:
-        method = 'manuel'  # m² = BRUT imposé
+    method = methode_non_optimisee(unite_eff, config)  # méthode selon unité effective
 
     log_message(f"Non optimisé {mat_name} (unite={unite_eff}) method={method}", "DEBUG")
 
     for element in elements:
         eid = element['eid']
-        q = calculate_quantity_with_cadwork_method(eid, unite_eff, method)
+        q = calculate_quantity_with_cadwork_method(eid, unite_eff, method,
+                                                   {'longueur': element['longueur'], 'largeur': element['largeur'],
+                                                    'hauteur': element['hauteur'], **element.get('mesures', {})})
         info_materiaux[mat_name]['volume_utilise'] += q
         info_materiaux[mat_name]['volume_barre'] += q
-        ac.set_user_attribute([eid], 12, "NON_OPTIMISE")
-        ac.set_user_attribute([eid], 13, "0.0 %")
+        if element.get('barre') != "NON_OPTIMISE":
+            ac.set_user_attribute([eid], 12, "NON_OPTIMISE")
+            ac.set_user_attribute([eid], 13, "0.0 %")
 
     qtot = info_materiaux[mat_name]['volume_barre']; prix_u = info_materiaux[mat_name]['prix_unitaire']
-    tableau_commandes.append([mat_name,"N/A","N/A","NON OPTIMISE",len(elements),0.0,round(qtot,4),prix_u,round(qtot*prix_u,2)])
+    tableau_commandes.append([mat_name,"N/A","N/A","Achat","NON OPTIMISE",len(elements),0.0,round(qtot,4),prix_u,round(qtot*prix_u,2),"N/A","N/A","N/A",0.0,""])
 
 def optimiser_materiau_avec_unite(elements, mat_name, unite, longueurs_barres, marge_coupe,
-                                  info_materiaux, tableau_commandes, tableau_barres_detaille, barre_global_id):
+                                  info_materiaux, tableau_commandes, tableau_barres_detaille, barre_global_id,
+                                  algorithme='auto', budget_temps=10.0, arret=None, plans=None, compresse=False,
+                                  barres_conservees=None, infos_sections=None, max_longueurs=0, reduction_motifs=False, tarif=None,
+                                  barres_chutes=None, chutes=None, projet="", longueur_chute_mini=1000, valorisation_chute=0.0,
+                                  longueurs_imposees=None, refentes=None):
     if mat_name not in info_materiaux:
-        try:
-            mat_id = mc.get_material_id(mat_name); prix_u = safe_float(mc.get_price(mat_id))
-        except Exception:
-            prix_u = 0.0
-        info_materiaux[mat_name] = {'volume_utilise':0.0,'volume_barre':0.0,'prix_unitaire':prix_u,'unite':unite,'optimise':True}
-
-    groupes_sections = defaultdict(list)
-    for e in elements:
-        groupes_sections[(e['largeur'], e['hauteur'])].append(e['eid'])
-
-    regroup_cmd = defaultdict(lambda: {'longueurs': defaultdict(int),'taux_chute':[],'quantite_total':0,'prix_total':0})
+        info_materiaux[mat_name] = {'volume_utilise':0.0,'volume_barre':0.0,'prix_unitaire':prix_materiau(mat_name),'prix_total':0.0,'unite':unite,'optimise':True}
+
+    groupes_sections, longueurs_eid = grouper_sections(elements)
+
+    regroup_cmd = defaultdict(lambda: {'longueurs': defaultdict(int),'taux_chute':[],'quantite_total':0,'prix_total':0,'borne':0.0,
+                                       'borne_cout':0.0,'cout':0.0,'manque':{}})
+    stocks = sorted(set(longueurs_barres))
+    nouvelles_chutes = defaultdict(list)  # (largeur, hauteur) -> longueurs des chutes réutilisables produites
+    refentes = refentes or {}
+    debits_refente = defaultdict(list)  # (section débit, section source) -> [(n° barre, nb pièces)]
+
+    def quantite_piece(x, largeur, hauteur):
+        # un débit de refente compte pour les pièces qu'il contient : les traits et le surplus de largeur sont de la chute
+        if x in refentes:
+            l, h, _, longueurs_debit = refentes[x]
+            return sum(calculate_quantity_by_unit(l, h, L, unite) for L in longueurs_debit)
+        return calculate_quantity_by_unit(largeur, hauteur, longueurs_eid[x], unite)
+
+    # barres taillées dans le stock de chutes : réemploi valorisé au coût de traitement des chutes
+    for (largeur, hauteur), barres in (barres_chutes or {}).items():
+        reemploi = {'longueurs': defaultdict(int), 'taux_chute': [], 'quantite_total': 0.0, 'prix_total': 0.0}
+        for L_chute, barre, longueurs_pieces in barres:
+            occ = md.longueur_occupee(longueurs_pieces, marge_coupe)
+            chute = max(L_chute - occ, 0)
+            quantite_barre = calculate_quantity_by_unit(largeur, hauteur, L_chute, unite)
+            prix_barre = valorisation_chute * quantite_barre
+            somme_q = sum(calculate_quantity_by_unit(largeur, hauteur, L, unite) for L in longueurs_pieces)
+            taux = (quantite_barre - somme_q)/quantite_barre if quantite_barre>0 else 0
+            reemploi['longueurs'][int(L_chute)] += 1; reemploi['taux_chute'].append(taux*100)
+            reemploi['quantite_total'] += quantite_barre; reemploi['prix_total'] += prix_barre
+            info_materiaux[mat_name]['volume_barre'] += quantite_barre
+            info_materiaux[mat_name]['volume_utilise'] += somme_q
+            info_materiaux[mat_name]['prix_total'] += prix_barre
+            if chute - marge_coupe >= max(longueur_chute_mini, 1): nouvelles_chutes[(largeur, hauteur)].append(chute - marge_coupe)
+            tableau_barres_detaille.append([barre_global_id, mat_name, largeur, hauteur, int(L_chute), len(barre),
+                                            " | ".join(map(str,barre)), int(chute), round(taux*100,2),
+                                            round(quantite_barre,4), round(prix_barre,2)])
+            ac.set_user_attribute(barre, 12, str(barre_global_id))
+            ac.set_user_attribute(barre, 13, f"{round(taux*100,2)} %")
+            barre_global_id += 1
+        longueurs_str = " | ".join([f"{L}mm x{qty}" for L,qty in sorted(reemploi['longueurs'].items())])
+        tableau_commandes.append([mat_name, largeur, hauteur, "Stock chutes", longueurs_str, len(barres),
+                                  round(sum(reemploi['taux_chute'])/len(barres),2), round(reemploi['quantite_total'],4),
+                                  round(valorisation_chute,2), round(reemploi['prix_total'],2), "N/A", "N/A", "chutes", 0.0, ""])
+        log_message(f"{mat_name} {largeur}x{hauteur}: {sum(len(b) for _, b, _ in barres)} pièces dans {len(barres)} chutes", "INFO")
 
     for (largeur, hauteur), eids in groupes_sections.items():
-        eids.sort(key=lambda eid: gc.get_length(eid), reverse=True)
-        barres: List[List[int]] = []
-        for eid in eids:
-            piece_L = safe_float(gc.get_length(eid))
-            best, min_perte = None, max(longueurs_barres)+1
-            for barre in barres:
-                nb = len(barre)
-                L_sans_marge = sum(gc.get_length(x) for x in barre)
-                marge_tot = nb * marge_coupe
-                occ = L_sans_marge + marge_tot
-                cand = [l for l in longueurs_barres if l >= occ + piece_L]
-                if cand:
-                    Lp = min(cand)
-                    perte = Lp - (occ + piece_L)
-                    if perte < min_perte:
-                        min_perte, best = perte, barre
-            if best is not None: best.append(eid)
-            else: barres.append([eid])
-
-        for barre in barres:
-            nb = len(barre)
-            L_sans_marge = sum(gc.get_length(x) for x in barre)
-            marge_tot = (nb-1)*marge_coupe if nb>1 else 0
-            occ = L_sans_marge + marge_tot
-            possibles = [l for l in longueurs_barres if l >= occ]
-            L_finale = min(possibles) if possibles else max(longueurs_barres)
+        conservees = (barres_conservees or {}).get((largeur, hauteur))
+        longueurs = [longueurs_eid[eid] for eid in eids]
+        couts = couts_stocks(stocks, tarif or {}, largeur, hauteur, unite)
+        regroup_cmd[(mat_name, largeur, hauteur)]['borne'] = md.borne_inferieure(longueurs, stocks, marge_coupe)
+        if couts: regroup_cmd[(mat_name, largeur, hauteur)]['borne_cout'] = md.borne_inferieure(longueurs, stocks, marge_coupe, couts)
+        plan = (plans or {}).get((mat_name, largeur, hauteur))
+        algo_section, duree = (infos_sections or {}).get((mat_name, largeur, hauteur), (algorithme, 0.0))
+        if plan is None and conservees is None:
+            # budget du matériau réparti au prorata du nombre de pièces de chaque section
+            budget_section = budget_temps * len(eids) / max(1, len(elements))
+            resoudre = md.resoudre_section_motifs if compresse else md.resoudre_section
+            debut = time.time()
+            plan = resoudre(longueurs, stocks, marge_coupe, algorithme=algorithme,
+                            temps_max=budget_section, arret=arret, max_longueurs=max_longueurs, couts=couts,
+                            reduction_motifs=reduction_motifs)
+            duree = time.time() - debut
+        regroup_cmd[(mat_name, largeur, hauteur)]['algorithme'] = algo_section
+        regroup_cmd[(mat_name, largeur, hauteur)]['duree'] = duree
+
+        # lots de barres identiques : chiffrage une fois par motif, eids développés à l'écriture
+        if conservees is not None:
+            # section inchangée (mode incrémental) : barres et numéros du run précédent, sans réécriture
+            lots = [[barre] for _, barre in conservees]; numeros = iter(n for n, _ in conservees)
+        elif compresse:
+            developpe, lots, k = md.developper_motifs(longueurs, plan), [], 0
+            for _, mult in plan:
+                lots.append([[eids[i] for i in b] for b in developpe[k:k+mult]]); k += mult
+        else:
+            lots = [[[eids[i] for i in barre]] for barre in plan]
+        log_message(f"{mat_name} {largeur}x{hauteur}: {len(eids)} pièces -> {sum(map(len, lots))} barres"
+                    f"{f' / {len(lots)} motifs' if compresse else ''} ({algo_section}, {duree:.2f} s)", "INFO")
+
+        # stock limité : longueur de chaque barre imposée ; sinon longueurs non dominées en coût,
+        # au plus K commandées : mêmes longueurs que celles retenues par le moteur
+        imposees = (longueurs_imposees or {}).get((largeur, hauteur)) if conservees is None else None
+        if imposees is not None:
+            longueurs_lots = iter(imposees[0]); regroup_cmd[(mat_name, largeur, hauteur)]['manque'] = imposees[1]
+        stocks_section = md.elaguer_stocks(stocks, couts)
+        if max_longueurs and imposees is None:
+            stocks_section = md.consolider_longueurs([(md.longueur_occupee([longueurs_eid[x] for x in lot[0]], marge_coupe), len(lot))
+                                                      for lot in lots], stocks, max_longueurs, couts)
+
+        for lot in lots:
+            modele = lot[0]; nb = len(modele)
+            occ = md.longueur_occupee([longueurs_eid[x] for x in modele], marge_coupe)
+            L_finale = next(longueurs_lots) if imposees is not None else md.longueur_stock(occ, stocks_section)
             chute = max(L_finale - occ, 0)
+            if chutes is not None and chute - marge_coupe >= max(longueur_chute_mini, 1):
+                nouvelles_chutes[(largeur, hauteur)].extend([chute - marge_coupe] * len(lot))
 
             quantite_barre = calculate_quantity_by_unit(largeur, hauteur, L_finale, unite)
-            info_materiaux[mat_name]['volume_barre'] += quantite_barre
-            prix_u = info_materiaux[mat_name]['prix_unitaire']; prix_barre = prix_u * quantite_barre
+            prix_u = info_materiaux[mat_name]['prix_unitaire']
+            prix_barre = prix_u * facteur_prix(L_finale, tarif or {}) * quantite_barre
 
-            q_pieces = [calculate_quantity_by_unit(largeur, hauteur, gc.get_length(x), unite) for x in barre]
-            somme_q = sum(q_pieces)
+            somme_q = sum(quantite_piece(x, largeur, hauteur) for x in modele)
             taux = (quantite_barre - somme_q)/quantite_barre if quantite_barre>0 else 0
 
-            tableau_barres_detaille.append([barre_global_id, mat_name, largeur, hauteur, int(L_finale), nb,
-                                            " | ".join(map(str,barre)), int(chute), round(taux*100,2),
-                                            round(quantite_barre,4), round(prix_barre,2)])
-
-            regroup_cmd[(mat_name, largeur, hauteur)]['longueurs'][int(L_finale)] += 1
-            regroup_cmd[(mat_name, largeur, hauteur)]['taux_chute'].append(taux*100)
-            regroup_cmd[(mat_name, largeur, hauteur)]['quantite_total'] += quantite_barre
-            regroup_cmd[(mat_name, largeur, hauteur)]['prix_total'] += prix_barre
-
-            for eid, qp in zip(barre, q_pieces):
-                ac.set_user_attribute([eid], 12, str(barre_global_id))
-                ac.set_user_attribute([eid], 13, f"{round(taux*100,2)} %")
-                info_materiaux[mat_name]['volume_utilise'] += qp
-
-            barre_global_id += 1
+            regroup_cmd[(mat_name, largeur, hauteur)]['longueurs'][int(L_finale)] += len(lot)
+            regroup_cmd[(mat_name, largeur, hauteur)]['taux_chute'].extend([taux*100] * len(lot))
+            regroup_cmd[(mat_name, largeur, hauteur)]['quantite_total'] += quantite_barre * len(lot)
+            regroup_cmd[(mat_name, largeur, hauteur)]['prix_total'] += prix_barre * len(lot)
+            if couts: regroup_cmd[(mat_name, largeur, hauteur)]['cout'] += couts[L_finale] * len(lot)
+            info_materiaux[mat_name]['volume_barre'] += quantite_barre * len(lot)
+            info_materiaux[mat_name]['prix_total'] += prix_barre * len(lot)
+            info_materiaux[mat_name]['volume_utilise'] += somme_q * len(lot)
+
+            for barre in lot:
+                num = next(numeros) if conservees is not None else barre_global_id
+                # débit de refente : "(eid+eid)" = tronçon à refendre dans la barre
+                tableau_barres_detaille.append([num, mat_name, largeur, hauteur, int(L_finale), nb,
+                                                " | ".join(f"({'+'.join(map(str, refentes[x][2]))})" if x in refentes else str(x)
+                                                           for x in barre),
+                                                int(chute), round(taux*100,2), round(quantite_barre,4), round(prix_barre,2)])
+                for x in barre:
+                    if x in refentes: debits_refente[(refentes[x][:2], (largeur, hauteur))].append((num, len(refentes[x][2])))
+                if conservees is None:
+                    pieces = [p for x in barre for p in (refentes[x][2] if x in refentes else [x])]
+                    ac.set_user_attribute(pieces, 12, str(num))
+                    ac.set_user_attribute(pieces, 13, f"{round(taux*100,2)} %")
+                    barre_global_id += 1
 
     for (mat_key, largeur, hauteur), data in regroup_cmd.items():
         taux_moy = (sum(data['taux_chute'])/len(data['taux_chute'])) if data['taux_chute'] else 0
-        prix_u = info_materiaux[mat_name]['prix_unitaire']
+        # prix unitaire moyen effectif (majorations de longueur comprises)
+        prix_u = data['prix_total']/data['quantite_total'] if data['quantite_total']>0 else info_materiaux[mat_name]['prix_unitaire']
         longueurs_str = " | ".join([f"{L}mm x{qty}" for L,qty in sorted(data['longueurs'].items())])
-        tableau_commandes.append([mat_key, largeur, hauteur, longueurs_str, sum(data['longueurs'].values()),
+        # écart à la borne inférieure : 0 % = plan optimal prouvé (en coût d'achat si des majorations s'appliquent)
+        total_mm = sum(L*qty for L,qty in data['longueurs'].items())
+        if data['borne_cout'] > 0:
+            ecart = (data['cout'] - data['borne_cout'])/data['borne_cout']*100
+        else:
+            ecart = (total_mm - data['borne'])/data['borne']*100 if data['borne']>0 else 0
+        tableau_commandes.append([mat_key, largeur, hauteur, "Achat", longueurs_str, sum(data['longueurs'].values()),
                                   round(taux_moy,2), round(data['quantite_total'],4), round(prix_u,2),
-                                  round(data['prix_total'],2)])
+                                  round(data['prix_total'],2), int(math.ceil(data['borne'])), round(max(ecart,0),2),
+                                  data['algorithme'], round(data['duree'],2),
+                                  " | ".join(f"{L}mm x{nb}" for L, nb in sorted(data['manque'].items()))])
+
+    for ((l, h), (largeur, hauteur)), debits in debits_refente.items():
+        # instructions de refente : pièces de la petite section tirées des barres de la section source
+        tableau_commandes.append([mat_name, l, h, f"Refente {largeur}x{hauteur}",
+                                  f"{sum(nb for _, nb in debits)} pièces en {len(debits)} débits (barres {plages_numeros([n for n, _ in debits])})",
+                                  0, 0.0, 0.0, 0.0, 0.0, "N/A", "N/A", "refente", 0.0, ""])
+
+    if chutes is not None and nouvelles_chutes:
+        for (largeur, hauteur), longueurs_chutes in nouvelles_chutes.items():
+            chutes.ajouter(mat_name, largeur, hauteur, longueurs_chutes, projet)
+        log_message(f"{mat_name}: {sum(map(len, nouvelles_chutes.values()))} chutes >= {longueur_chute_mini} mm mises en stock", "INFO")
     return barre_global_id
 
+def optimiser_materiau_panneaux(elements, mat_name, config, info_materiaux, tableau_commandes, tableau_panneaux, panneau_global_id):
+    """
+    Matériau au m² : pièces réduites à leurs 2 plus grandes cotes, imbriquées
+    par épaisseur dans les formats de panneaux (découpe guillotine).
+    Attributs 12/13 = n° de panneau et taux de chute, une ligne « Panneaux » par panneau.
+    """
+    prix_u = prix_materiau(mat_name)
+    info_materiaux[mat_name] = {'volume_utilise':0.0,'volume_barre':0.0,'prix_unitaire':prix_u,'prix_total':0.0,'unite':'m2','optimise':True}
+    formats = [tuple(f) for f in config.get('formats_panneaux') or [[2500, 1250]]]
+    trait = config.get('trait_panneau', 4); rotation = config.get('rotation_panneaux', True)
+    budget = float(config.get('budget_temps', 10))
+    par_epaisseur = defaultdict(list)
+    for e in elements:
+        a, b, ep = sorted((safe_float(e['longueur']), safe_float(e['largeur']), safe_float(e['hauteur'])), reverse=True)
+        par_epaisseur[round(ep)].append((e['eid'], (a, b)))
+
+    for ep, pieces_ep in sorted(par_epaisseur.items()):
+        eids = [eid for eid, _ in pieces_ep]; pieces = [p for _, p in pieces_ep]
+        debut = time.time()
+        plan = mp.imbriquer(pieces, formats, trait, rotation, budget_temps=budget*len(pieces)/max(1, len(elements)))
+        duree = time.time() - debut
+        formats_cmd = defaultdict(int); taux_chute = []; surface_tot = prix_tot = 0.0
+        for (L, l), placements in plan:
+            s_panneau = _mm2_to_m2(L*l)
+            s_pieces = _mm2_to_m2(sum(pieces[i][0]*pieces[i][1] for i, *_ in placements))
+            taux = (s_panneau - s_pieces)/s_panneau if s_panneau > 0 else 0
+            prix = prix_u * s_panneau
+            formats_cmd[f"{L:g}x{l:g}"] += 1; taux_chute.append(taux*100); surface_tot += s_panneau; prix_tot += prix
+            info_materiaux[mat_name]['volume_barre'] += s_panneau; info_materiaux[mat_name]['volume_utilise'] += s_pieces
+            info_materiaux[mat_name]['prix_total'] += prix
+            # position de chaque pièce (coin, mm) ; R = pivotée
+            tableau_panneaux.append([panneau_global_id, mat_name, ep, f"{L:g}x{l:g}", len(placements),
+                                     " | ".join(f"{eids[i]} ({x:.0f},{y:.0f}{' R' if piv else ''})" for i, x, y, _, _, piv in placements),
+                                     round(s_pieces,4), round(s_panneau - s_pieces,4), round(taux*100,2), round(s_panneau,4), round(prix,2)])
+            ac.set_user_attribute([eids[i] for i, *_ in placements], 12, str(panneau_global_id))
+            ac.set_user_attribute([eids[i] for i, *_ in placements], 13, f"{round(taux*100,2)} %")
+            panneau_global_id += 1
+        if plan:
+            tableau_commandes.append([mat_name, ep, "N/A", "Achat panneaux", " | ".join(f"{f} x{n}" for f, n in sorted(formats_cmd.items())),
+                                      len(plan), round(sum(taux_chute)/len(plan),2), round(surface_tot,4), round(prix_u,2),
+                                      round(prix_tot,2), "N/A", "N/A", "guillotine", round(duree,2), ""])
+        hors = mp.hors_format(pieces, formats, rotation)
+        if hors:
+            # pièce plus grande que tout format : commandée à sa surface brute
+            s_hors = sum(_mm2_to_m2(pieces[i][0]*pieces[i][1]) for i in hors)
+            info_materiaux[mat_name]['volume_barre'] += s_hors; info_materiaux[mat_name]['volume_utilise'] += s_hors
+            info_materiaux[mat_name]['prix_total'] += prix_u * s_hors
+            tableau_commandes.append([mat_name, ep, "N/A", "Hors format", " | ".join(f"{pieces[i][0]:g}x{pieces[i][1]:g}" for i in hors),
+                                      len(hors), 0.0, round(s_hors,4), round(prix_u,2), round(prix_u*s_hors,2), "N/A", "N/A", "N/A", 0.0, ""])
+            log_message(f"{mat_name} ép. {ep}: {len(hors)} pièces plus grandes que les formats, comptées en surface brute", "WARNING")
+        log_message(f"{mat_name} ép. {ep}: {len(pieces)} pièces -> {len(plan)} panneaux ({duree:.2f} s)", "INFO")
+    return panneau_global_id
+
 def generer_longueurs_materiau(material_name, config):
     mode = config.get('mode','variable')
     if mode == 'fixe':
@@ -802,8 +1568,69 @@ def generer_longueurs_materiau(material_name, config):
     min_l = config.get('longueur_min',2500); max_l = config.get('longueur_max',13000); pas = config.get('pas',500)
     lengths = [l for l in range(min_l, max_l+1, pas)]
     if 7000 not in lengths and min_l <= 7000 <= max_l: lengths.insert(0,7000)
+    if mode == 'mixte':
+        # stock fixe + débit sur mesure : le tarif (facteur_prix) départage les deux
+        return sorted(set(lengths) | set(config.get('longueurs_fixes',[13000])))
     return lengths
 
+# =========================================================
+# Balayage des longueurs de stock
+# =========================================================
+
+def grille_balayage(config):
+    # ~30 configurations candidates : variables (mini x maxi x pas) + jeux fixes usuels + config courante
+    configs = [{'mode':'variable','longueur_min':mini,'longueur_max':maxi,'pas':pas}
+               for mini in (2000,2500,3000,4000) for maxi in (6000,10000,13000) for pas in (500,1000)]
+    configs += [{'mode':'fixe','longueurs_fixes':fixes,'priorite_fixe':'auto'}
+                for fixes in ([13000],[6000],[6000,13000],[4000,6000,13000],[5000,7000,13000],[4000,8000,13000])]
+    courante = {k: config[k] for k in ('mode','longueur_min','longueur_max','pas','longueurs_fixes','priorite_fixe','majoration_variable') if k in config}
+    if courante and courante not in configs: configs.insert(0, courante)
+    return configs
+
+def libelle_config(c):
+    if c.get('mode') == 'mixte':
+        return f"Mixte {', '.join(map(str, c.get('longueurs_fixes',[])))} + {c.get('longueur_min')}-{c.get('longueur_max')} pas {c.get('pas')}"
+    if c.get('mode') == 'fixe':
+        return "Fixes " + ", ".join(map(str, c.get('longueurs_fixes',[])))
+    return f"Variables {c.get('longueur_min')}-{c.get('longueur_max')} pas {c.get('pas')}"
+
+def balayer_longueurs(mat_name, elements, config, prix_u, parallele=True, arret=None):
+    """
+    Évalue la grille de configurations de longueurs sur un instantané des pièces
+    du matériau (Best Fit Decreasing par section, sections x configurations
+    réparties sur les processus) et les classe par coût d'achat (majorations de
+    longueur comprises) puis taux de chute.
+    """
+    configs = grille_balayage(config)
+    groupes_sections, longueurs_eid = grouper_sections(elements)
+    marge = config.get('marge_coupe', MARGE_COUPE_DEFAULT); unite = config.get('unite_detectee', 'm3')
+    taches = {}
+    for k, c in enumerate(configs):
+        stocks = sorted(set(generer_longueurs_materiau(mat_name, {**config, **c})))
+        for (largeur, hauteur), eids in groupes_sections.items():
+            taches[(k, largeur, hauteur)] = md.Tache([longueurs_eid[eid] for eid in eids], stocks, marge, 'glouton', 0.0,
+                                                     max_longueurs=int(config.get('max_longueurs', 0)),
+                                                     couts=couts_stocks(stocks, {**config, **c}, largeur, hauteur, unite))
+    plans = md.resoudre_sections(taches, parallele=parallele, arret=arret, log=lambda msg: log_message(msg, "INFO"))
+
+    resultats = []
+    for k, c in enumerate(configs):
+        quantite = quantite_pieces = cout = 0.0; nb_barres = 0
+        for (largeur, hauteur) in groupes_sections:
+            tache = taches[(k, largeur, hauteur)]; longueurs = tache.longueurs
+            occupations = [md.longueur_occupee([longueurs[i] for i in barre], marge) for barre in plans[(k, largeur, hauteur)]]
+            stocks = md.consolider_longueurs([(o, 1) for o in occupations], tache.stocks, tache.max_longueurs, tache.couts)
+            for occ in occupations:
+                L_finale = md.longueur_stock(occ, stocks)
+                q = calculate_quantity_by_unit(largeur, hauteur, L_finale, unite)
+                quantite += q; cout += q*prix_u*facteur_prix(L_finale, {**config, **c})
+            quantite_pieces += sum(calculate_quantity_by_unit(largeur, hauteur, L, unite) for L in longueurs)
+            nb_barres += len(plans[(k, largeur, hauteur)])
+        taux = (quantite - quantite_pieces)/quantite*100 if quantite>0 else 0
+        resultats.append({'config': c, 'barres': nb_barres, 'quantite': quantite, 'cout': cout, 'taux_chute': taux})
+    resultats.sort(key=lambda r: (round(r['cout'],2), r['quantite'], r['taux_chute']))
+    return resultats
+
 # =========================================================
 # Main
 # =========================================================
@@ -0,0 +1,68 @@
+"""
+Stock de chutes réutilisables — sqlite (stdlib), sans dépendance Cadwork.
+
+Une chute est identifiée par sa section (matériau, largeur, hauteur), sa
+longueur, le projet qui l'a produite et sa date. Une chute consommée reste
+en base, marquée du projet consommateur : relancer l'optimisation d'un même
+projet (`annuler_projet`) libère ses consommations et retire ses chutes
+encore libres, de sorte qu'un nouveau calcul repart de l'état antérieur au
+précédent ; celles déjà consommées par un autre projet sont conservées.
+Les chutes disponibles sont indexées par section et longueur.
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+CHEMIN_DEFAUT = os.path.join(os.path.expanduser("~"), ".optimisation_scierie", "stock_chutes.sqlite")
+
+class StockChutes:
+    """Inventaire persistant des chutes, partagé entre projets."""
+
+    def __init__(self, chemin: str = CHEMIN_DEFAUT):
+        self.chemin = chemin
+        os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+        self.cnx = sqlite3.connect(chemin)
+        self.cnx.execute("""CREATE TABLE IF NOT EXISTS chutes (
+            id INTEGER PRIMARY KEY, materiau TEXT NOT NULL, largeur REAL NOT NULL, hauteur REAL NOT NULL,
+            longueur REAL NOT NULL, projet TEXT NOT NULL, date TEXT NOT NULL, consommee_par TEXT)""")
+        self.cnx.execute("""CREATE INDEX IF NOT EXISTS chutes_disponibles ON chutes (materiau, largeur, hauteur, longueur)
+            WHERE consommee_par IS NULL""")
+        self.cnx.execute("CREATE INDEX IF NOT EXISTS chutes_projet ON chutes (projet)")
+        self.cnx.commit()
+
+    def disponibles(self, materiau, largeur, hauteur, longueur_min: float = 0.0):
+        """Chutes libres de la section d'au moins `longueur_min` mm : [(id, longueur)], longueurs croissantes."""
+        return self.cnx.execute("""SELECT id, longueur FROM chutes WHERE materiau = ? AND largeur = ? AND hauteur = ?
+            AND longueur >= ? AND consommee_par IS NULL ORDER BY longueur""",
+                                (materiau, largeur, hauteur, longueur_min)).fetchall()
+
+    def consommer(self, ids, projet: str):
+        self.cnx.executemany("UPDATE chutes SET consommee_par = ? WHERE id = ?", [(projet, i) for i in ids])
+        self.cnx.commit()
+
+    def ajouter(self, materiau, largeur, hauteur, longueurs, projet: str):
+        date = datetime.now().isoformat(timespec='seconds')
+        self.cnx.executemany("INSERT INTO chutes (materiau, largeur, hauteur, longueur, projet, date) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(materiau, largeur, hauteur, L, projet, date) for L in longueurs])
+        self.cnx.commit()
+
+    def annuler_projet(self, projet: str) -> int:
+        """
+        Reprise d'un projet : ses chutes consommées redeviennent libres, celles qu'il a produites
+        et encore libres sont retirées. Retourne le nombre de ses chutes déjà consommées par un
+        autre projet (conservées, le nouveau calcul ne peut plus les reprendre).
+        """
+        self.cnx.execute("UPDATE chutes SET consommee_par = NULL WHERE consommee_par = ?", (projet,))
+        self.cnx.execute("DELETE FROM chutes WHERE projet = ? AND consommee_par IS NULL", (projet,))
+        conflits = self.cnx.execute("SELECT COUNT(*) FROM chutes WHERE projet = ?", (projet,)).fetchone()[0]
+        self.cnx.commit()
+        return conflits
+
+    def nb_disponibles(self) -> int:
+        return self.cnx.execute("SELECT COUNT(*) FROM chutes WHERE consommee_par IS NULL").fetchone()[0]
+
+    def vider(self):
+        self.cnx.execute("DELETE FROM chutes"); self.cnx.commit()
+
+    def fermer(self):
+        self.cnx.close()
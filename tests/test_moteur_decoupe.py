@@ -0,0 +1,42 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import moteur_decoupe as md
+
+
+def _pieces_placees(longueurs, plan):
+    return sorted(i for b in plan for i in b) == list(range(len(longueurs)))
+
+
+def test_sac_a_dos_plus_de_1000_lignes():
+    # une ligne par niveau de l'exploration : plus de lignes que la limite de récursion
+    n = 1500
+    valeurs, poids = [1.0 + i * 1e-4 for i in range(n)], [200.0 + i for i in range(n)]
+    val, a = md._sac_a_dos(valeurs, poids, [1] * n, 12000.0, max_noeuds=5000)
+    assert val > 0
+    assert sum(a[i] * poids[i] for i in range(n)) <= 12000.0
+
+
+def test_exact_plus_de_1000_longueurs_distinctes():
+    rng = random.Random(7)
+    distinctes = rng.sample(range(200, 6000), 1200)
+    longueurs = distinctes + [rng.choice(distinctes) for _ in range(300)]
+    stocks = list(range(3000, 14001, 500))
+    plan = md.resoudre_section(longueurs, stocks, 4, 'exact', temps_max=1.0)
+    assert _pieces_placees(longueurs, plan)
+
+
+def test_nb_refente_sans_trait():
+    assert md.nb_refente((120, 100), (60, 100)) == 2
+    assert md.nb_refente((100, 120), (60, 100)) == 2  # orientation tournée
+
+
+def test_nb_refente_trait_deduit():
+    # 2 x 60 + un trait de 4 mm dépasse 120 : une seule pièce
+    assert md.nb_refente((120, 100), (60, 100), 4) == 1
+    assert md.nb_refente((100, 120), (60, 100), 4) == 1
+    assert md.nb_refente((124, 100), (60, 100), 4) == 2
+    assert md.nb_refente((200, 124), (60, 100), 4) == 3  # 3 x 60 sur 200 plutôt que 2 x 60 sur 124